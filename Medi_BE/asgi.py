@@ -5,6 +5,13 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Serve it with uvicorn workers under gunicorn, e.g.
+
+    gunicorn Medi_BE.asgi:application -k uvicorn.workers.UvicornWorker
+
+The endpoints under async/ (myapp.async_views) then run on the event loop;
+the DRF views run in a thread, as under WSGI.
 """
 
 import os
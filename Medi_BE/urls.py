@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from django.conf import settings
-from django.conf.urls.static import static
+from myapp.serving import file_pattern, serve_media, serve_static
 
 
 
@@ -26,4 +26,7 @@ urlpatterns = [
     path('', include('myapp.urls')),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+urlpatterns += [
+    file_pattern(settings.MEDIA_URL, serve_media),
+    file_pattern(settings.STATIC_URL, serve_static),
+]
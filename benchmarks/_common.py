@@ -0,0 +1,56 @@
+"""
+Shared setup for the scripts in this directory.
+
+Run a benchmark from the repository root, e.g.::
+
+    python -m benchmarks.bench_categories
+
+Each script runs against a throwaway test database, never db.sqlite3.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(test_database_name=None, keepdb=False):
+    """
+    Configure Django against a fresh test database. Pass a file name as
+    ``test_database_name`` for benchmarks that need several connections to
+    see the same SQLite database (the default one is in memory), and
+    ``keepdb=True`` to reuse that file as it is, e.g. one filled by
+    benchmarks.datagen.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Medi_BE.settings')
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    if test_database_name:
+        from django.conf import settings
+
+        settings.DATABASES['default']['TEST']['NAME'] = test_database_name
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+
+
+def measure(func, duration=2.0):
+    """Call ``func`` repeatedly for ``duration`` seconds; return calls/sec."""
+    func()  # warm up
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        func()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def report(rows):
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f'{name:<{width}}  {value:>12,.0f} req/s')
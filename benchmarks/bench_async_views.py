@@ -0,0 +1,180 @@
+"""
+Load test: one sync gunicorn worker serving the DRF views against one
+uvicorn worker serving the async views, at increasing numbers of
+concurrent connections.
+
+    python -m benchmarks.bench_async_views
+
+Needs gunicorn and uvicorn installed. Both servers share a seeded SQLite
+file database.
+"""
+import asyncio
+import datetime
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._common import ROOT, setup_django
+
+DATABASE_FILE = os.path.join(tempfile.gettempdir(), 'bench_async_views.sqlite3')
+CONCURRENCY = (1, 16, 64, 256)
+DURATION = 5.0
+DOCTORS = 200
+POSTS_PER_DOCTOR = 10
+APPOINTMENTS_PER_DOCTOR = 20
+
+setup_django(DATABASE_FILE)
+
+from django.db import connection  # noqa: E402
+
+from myapp.models import (  # noqa: E402
+    Appointment, BlogPost, Category, CustomUser, Doctor, Profile, normalize_location, truncate_words,
+)
+
+
+def seed():
+    categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(8)])
+    users = CustomUser.objects.bulk_create(
+        [CustomUser(username=f'doctor{i}', first_name='Doc', last_name=str(i), is_doctor=True) for i in range(DOCTORS)]
+        + [CustomUser(username='patient', first_name='Pat', is_patient=True)]
+    )
+    patient = users.pop()
+    profiles = Profile.objects.bulk_create([
+        Profile(user=user, address=f'{i} MG Road', city='Pune', state='Maharashtra', pincode=411001,
+                city_normalized=normalize_location('Pune'), state_normalized=normalize_location('Maharashtra'))
+        for i, user in enumerate([*users, patient])
+    ])
+    profiles.pop()
+    doctors = Doctor.objects.bulk_create([Doctor(profile=profile, establishment_name='Clinic') for profile in profiles])
+    Doctor.categories.through.objects.bulk_create([
+        Doctor.categories.through(doctor=doctor, category=categories[i % len(categories)])
+        for i, doctor in enumerate(doctors)
+    ])
+    summary = 'A short summary of the post that goes on for a while. ' * 4
+    BlogPost.objects.bulk_create([
+        BlogPost(author=doctor, title=f'Post {n}', summary=summary, content=summary * 10,
+                 truncated_summary=truncate_words(summary, 15), author_display_name=f'Doc {i}',
+                 category_names=[categories[i % len(categories)].name])
+        for i, doctor in enumerate(doctors) for n in range(POSTS_PER_DOCTOR)
+    ])
+    day = datetime.date(2024, 1, 1)
+    Appointment.objects.bulk_create([
+        Appointment(patient=patient, doctor=user, date=day + datetime.timedelta(days=n), start_time=datetime.time(10))
+        for user in users for n in range(APPOINTMENTS_PER_DOCTOR)
+    ])
+    return patient.pk
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port):
+    env = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{DATABASE_FILE}',
+        'DJANGO_SETTINGS_MODULE': 'Medi_BE.settings',
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *args, '--workers', '1', '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+async def fetch(port, path, stream=None):
+    """One GET over ``stream`` (reader, writer), reconnecting when the server closed it."""
+    if stream is None:
+        stream = await asyncio.open_connection('127.0.0.1', port)
+    reader, writer = stream
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    headers = dict(
+        line.split(': ', 1) for line in head.decode('latin-1').split('\r\n')[1:] if ': ' in line
+    )
+    headers = {name.lower(): value for name, value in headers.items()}
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    status = int(head.split(b' ', 2)[1])
+    if headers.get('connection', '').lower() == 'close':
+        writer.close()
+        stream = None
+    return status, stream
+
+
+async def load(port, paths, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        stream = None
+        n = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status, stream = await fetch(port, paths[n % len(paths)], stream)
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                stream = None
+                continue
+            if status != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+            n += 1
+        if stream is not None:
+            stream[1].close()
+
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    patient_id = seed()
+    connection.close()
+
+    sync_paths = ['/blogposts/?limit=6', '/doctors/?limit=6', f'/appointments/?user_id={patient_id}&limit=20']
+    async_paths = ['/async' + path for path in sync_paths]
+    setups = [
+        ('gunicorn sync worker, DRF views', ['Medi_BE.wsgi'], sync_paths),
+        ('uvicorn worker, DRF views', ['Medi_BE.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'], sync_paths),
+        ('uvicorn worker, async views', ['Medi_BE.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'], async_paths),
+    ]
+
+    print(f'{"setup":<34} {"conns":>5} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>6}')
+    for name, args, paths in setups:
+        port = free_port()
+        server = start_server(args, port)
+        try:
+            asyncio.run(load(port, paths, 1, 1.0))  # warm up
+            for concurrency in CONCURRENCY:
+                latencies, errors = asyncio.run(load(port, paths, concurrency, DURATION))
+                latencies.sort()
+                p50 = statistics.median(latencies) * 1000 if latencies else 0
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+                print(f'{name:<34} {concurrency:>5} {len(latencies) / DURATION:>8,.0f} {p50:>8.1f} {p95:>8.1f} {errors:>6}')
+        finally:
+            server.terminate()
+            server.wait()
+
+    connection.creation.destroy_test_db(DATABASE_FILE, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
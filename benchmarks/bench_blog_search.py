@@ -0,0 +1,77 @@
+"""Latency of blogposts/search/ over a synthetic corpus (100k posts by default)."""
+import itertools
+import random
+import sys
+import time
+
+from benchmarks._common import setup_django
+
+setup_django()
+
+from django.db import transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from myapp.models import BlogPost, Category, CustomUser, Doctor, Profile  # noqa: E402
+from myapp.search import BLOGPOST_INDEX  # noqa: E402
+from myapp.views import search_blogposts  # noqa: E402
+
+TOPICS = ('heart cardiology diabetes insulin stroke recovery robotic joint replacement knee hip '
+          'nutrition diet exercise sleep stress anxiety vaccine fever infection kidney liver lung '
+          'asthma allergy skin cancer screening therapy surgery pregnancy child elderly pain').split()
+QUERIES = ['heart', 'robot joint', 'diab', 'sleep stress anxiety', 'cancer screening', 'xyzzy']
+
+
+def populate(count):
+    rng = random.Random(1)
+    with transaction.atomic():
+        categories = Category.objects.bulk_create(Category(name=f'Category {i}') for i in range(10))
+        user = CustomUser.objects.create(username='author', is_doctor=True)
+        profile = Profile.objects.create(user=user, address='1 MG Road', city='Pune', state='MH', pincode=411001)
+        doctor = Doctor.objects.create(profile=profile)
+
+        # Zipf-distributed filler vocabulary with topic words sprinkled in,
+        # so a topic term matches a few percent of posts rather than all.
+        filler = [''.join(rng.choice('bcdfghklmnprstvz') + rng.choice('aeiou') for _ in range(3))
+                  for _ in range(20000)]
+        cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(filler) + 1)))
+
+        def text(words):
+            chosen = rng.choices(filler, cum_weights=cum_weights, k=words)
+            for _ in range(rng.randint(0, 3)):
+                chosen[rng.randrange(words)] = rng.choice(TOPICS)
+            return ' '.join(chosen)
+
+        BlogPost.objects.bulk_create(
+            (BlogPost(author=doctor, title=text(6), summary=text(40), content=text(300)) for _ in range(count)),
+            batch_size=2000,
+        )
+        through = BlogPost.categories.through
+        through.objects.bulk_create(
+            (through(blogpost_id=pk, category_id=rng.choice(categories).pk)
+             for pk in BlogPost.objects.values_list('pk', flat=True).iterator()),
+            batch_size=5000,
+        )
+        start = time.perf_counter()
+        BLOGPOST_INDEX.rebuild()
+        print(f'indexed {count:,} posts in {time.perf_counter() - start:.1f}s')
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    populate(count)
+    factory = RequestFactory()
+    print(f"{'query':<22}{'all ms':>10}{'1 category ms':>16}")
+    for query in QUERIES:
+        timings = []
+        for params in ({'q': query}, {'q': query, 'categories[]': ['3']}):
+            best = float('inf')
+            for _ in range(5):
+                start = time.perf_counter()
+                search_blogposts(factory.get('/blogposts/search/', params)).render()
+                best = min(best, time.perf_counter() - start)
+            timings.append(best * 1000)
+        print(f'{query:<22}{timings[0]:>10.1f}{timings[1]:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Concurrent bookings against one doctor: every thread races for the same
+slots, and exactly one booking per slot may win.
+
+    python -m benchmarks.bench_booking_contention
+"""
+import datetime
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks._common import setup_django
+
+DATABASE_FILE = os.path.join(tempfile.gettempdir(), 'bench_booking_contention.sqlite3')
+
+setup_django(DATABASE_FILE)
+
+from django.db import OperationalError, connection  # noqa: E402
+
+from myapp.availability import SlotUnavailable, book_appointment  # noqa: E402
+from myapp.models import Appointment, CustomUser  # noqa: E402
+
+THREADS = 8
+SLOTS = 16
+DAY = datetime.date(2024, 1, 1)
+
+doctor = CustomUser.objects.create(username='doctor', first_name='Doc', is_doctor=True)
+patients = [
+    CustomUser.objects.create(username=f'patient{i}', is_patient=True) for i in range(THREADS)
+]
+slots = [
+    (datetime.time(9 + minute // 60, minute % 60), datetime.time(9 + (minute + 30) // 60, (minute + 30) % 60))
+    for minute in range(0, SLOTS * 30, 30)
+]
+outcomes = {'booked': 0, 'unavailable': 0, 'locked': 0}
+outcomes_lock = threading.Lock()
+
+
+def race(patient, barrier):
+    barrier.wait()
+    try:
+        for start, end in slots:
+            try:
+                book_appointment(patient, doctor, DAY, start, end)
+                outcome = 'booked'
+            except SlotUnavailable:
+                outcome = 'unavailable'
+            except OperationalError:
+                # "database is locked" after the SQLite busy timeout
+                outcome = 'locked'
+            with outcomes_lock:
+                outcomes[outcome] += 1
+    finally:
+        connection.close()
+
+
+barrier = threading.Barrier(THREADS)
+threads = [threading.Thread(target=race, args=(patient, barrier)) for patient in patients]
+started = time.perf_counter()
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+elapsed = time.perf_counter() - started
+
+per_slot = Appointment.objects.filter(doctor=doctor, date=DAY).values_list('start_time', flat=True)
+double_booked = len(per_slot) - len(set(per_slot))
+attempts = THREADS * SLOTS
+print(f'{THREADS} threads x {SLOTS} slots: {attempts} attempts in {elapsed:.2f}s '
+      f'({attempts / elapsed:,.0f} bookings/s)')
+print(f"booked {outcomes['booked']}, rejected {outcomes['unavailable']}, lock timeouts {outcomes['locked']}")
+print(f'double-booked slots: {double_booked}')
+
+connection.creation.destroy_test_db(DATABASE_FILE, verbosity=0)
@@ -0,0 +1,129 @@
+"""
+Rows per second through the bulk_import command, into a SQLite file, for
+about a million rows at the default --scale: doctors, patients, their posts
+and appointments, written to JSON Lines files first.
+
+    python -m benchmarks.bench_bulk_import [--scale 0.1]
+
+Rows counts every row inserted: users, profiles, doctors, posts,
+appointments and the category through rows. The resident set high-water
+mark is printed after each import; it should stay flat as --scale grows.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+from benchmarks.datagen import CITIES, FIRST_NAMES, LAST_NAMES, SPECIALTIES, STREETS, WORDS
+
+DATABASE_FILE = os.path.join(tempfile.gettempdir(), 'bench_bulk_import.sqlite3')
+# At --scale 1: about 1.1 million rows
+DOCTORS = 10_000
+PATIENTS = 250_000
+POSTS = 100_000
+APPOINTMENTS = 250_000
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def person(rng, username):
+    city, state, pin = rng.choice(CITIES)
+    return {
+        'username': username, 'email': f'{username}@example.com',
+        'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+        'address': f'{rng.randint(1, 300)}, {rng.choice(STREETS)}', 'city': city, 'state': state,
+        'pincode': pin * 1000 + rng.randint(0, 999),
+    }
+
+
+def appointment(number, doctors, patients):
+    # Consecutive half-hour slots of each doctor's days, so none overlap
+    day, slot = divmod(number // doctors, 16)
+    start = datetime.datetime(2030, 1, 1, 9) + datetime.timedelta(days=day, minutes=30 * slot)
+    return {
+        'patient': f'patient{number % patients}', 'doctor': f'doctor{number % doctors}',
+        'date': start.date().isoformat(), 'start_time': start.strftime('%H:%M'),
+    }
+
+
+def write_files(directory, scale):
+    """Write the four input files; returns {kind: (path, rows)}."""
+    rng = random.Random(0)
+    doctors, patients = int(DOCTORS * scale), int(PATIENTS * scale)
+    generators = {
+        'doctors': (
+            {**person(rng, f'doctor{i}'), 'establishment_name': 'Clinic', 'categories': rng.sample(SPECIALTIES, 2)}
+            for i in range(doctors)
+        ),
+        'patients': (person(rng, f'patient{i}') for i in range(patients)),
+        'posts': (
+            {'author': f'doctor{rng.randrange(doctors)}', 'title': words(rng, 5), 'summary': words(rng, 30),
+             'content': words(rng, 200), 'categories': rng.sample(SPECIALTIES, 2)}
+            for _ in range(int(POSTS * scale))
+        ),
+        'appointments': (
+            appointment(i, doctors, patients) for i in range(int(APPOINTMENTS * scale))
+        ),
+    }
+    files = {}
+    for kind, rows in generators.items():
+        path = os.path.join(directory, f'{kind}.jsonl')
+        count = 0
+        with open(path, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+                count += 1
+        files[kind] = (path, count)
+    return files
+
+
+def rows_inserted():
+    from myapp.models import Appointment, BlogPost, Category, CustomUser, Doctor, Profile
+
+    models = [CustomUser, Profile, Doctor, Doctor.categories.through, BlogPost, BlogPost.categories.through,
+              Appointment, Category]
+    return sum(model.objects.count() for model in models)
+
+
+def main():
+    from benchmarks._common import setup_django
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0)
+    options = parser.parse_args()
+
+    setup_django(DATABASE_FILE)
+    from django.core.management import call_command
+
+    directory = tempfile.mkdtemp()
+    try:
+        files = write_files(directory, options.scale)
+        print(f'{"import":<14} {"records":>9} {"rows":>10} {"seconds":>8} {"rows/s":>9} {"peak RSS MB":>12}')
+        total_rows, total_seconds = 0, 0.0
+        for kind, (path, records) in files.items():
+            before = rows_inserted()
+            start = time.perf_counter()
+            # One shared password, hashed once, as for any test data
+            passwords = {'password': 'benchmark'} if kind in ('doctors', 'patients') else {}
+            call_command('bulk_import', kind, path, stdout=io.StringIO(), **passwords)
+            seconds = time.perf_counter() - start
+            rows = rows_inserted() - before
+            total_rows += rows
+            total_seconds += seconds
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f'{kind:<14} {records:>9,} {rows:>10,} {seconds:>8.1f} {rows / seconds:>9,.0f} {peak:>12.0f}')
+        print(f'{"total":<14} {"":>9} {total_rows:>10,} {total_seconds:>8.1f} {total_rows / total_seconds:>9,.0f}')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
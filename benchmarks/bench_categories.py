@@ -0,0 +1,43 @@
+"""Requests/sec for categories/ before and after the rendered category cache."""
+from benchmarks._common import measure, report, setup_django
+
+setup_django()
+
+from django.test import RequestFactory  # noqa: E402
+from rest_framework.decorators import api_view  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+
+from myapp.models import Category  # noqa: E402
+from myapp.serializers import CategorySerializer  # noqa: E402
+from myapp.views import get_all_categories  # noqa: E402
+
+
+@api_view(['GET'])
+def uncached_categories(request):
+    # The view as it was before the cache: query and serialize every time
+    categories = Category.objects.all()
+    serializer = CategorySerializer(categories, many=True)
+    return Response(serializer.data)
+
+
+def main():
+    Category.objects.bulk_create(Category(name=f'Category {i}') for i in range(40))
+    factory = RequestFactory()
+    etag = get_all_categories(factory.get('/categories/'))['ETag']
+
+    def run(view, **headers):
+        def call():
+            response = view(factory.get('/categories/', **headers))
+            if hasattr(response, 'render'):
+                response.render()
+        return call
+
+    report([
+        ('before (query + serialize)', measure(run(uncached_categories))),
+        ('after (cached body)', measure(run(get_all_categories))),
+        ('after (If-None-Match -> 304)', measure(run(get_all_categories, HTTP_IF_NONE_MATCH=etag))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
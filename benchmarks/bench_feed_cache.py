@@ -0,0 +1,81 @@
+"""Requests/sec for the public feeds with and without the generation-keyed response cache."""
+from benchmarks._common import measure, report, setup_django
+
+setup_django()
+
+from django.test import RequestFactory  # noqa: E402
+
+from myapp.cache import bump_generation  # noqa: E402
+from myapp.models import (  # noqa: E402
+    BlogPost, Category, CustomUser, Doctor, Profile, normalize_location, truncate_words,
+)
+from myapp.views import get_all_blogposts, get_filtered_blogposts, get_filtered_doctors  # noqa: E402
+
+DOCTORS = 200
+POSTS_PER_DOCTOR = 10
+
+
+def seed():
+    categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(8)])
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'doctor{i}', first_name='Doc', last_name=str(i), is_doctor=True) for i in range(DOCTORS)
+    ])
+    profiles = Profile.objects.bulk_create([
+        Profile(user=user, address=f'{i} MG Road', city=city, state='Maharashtra', pincode=411001,
+                city_normalized=normalize_location(city), state_normalized=normalize_location('Maharashtra'))
+        for i, user in enumerate(users) for city in [('Pune', 'Mumbai')[i % 2]]
+    ])
+    doctors = Doctor.objects.bulk_create([Doctor(profile=profile, establishment_name='Clinic') for profile in profiles])
+    Doctor.categories.through.objects.bulk_create([
+        Doctor.categories.through(doctor=doctor, category=categories[i % len(categories)])
+        for i, doctor in enumerate(doctors)
+    ])
+    summary = 'A short summary of the post that goes on for a while. ' * 4
+    posts = BlogPost.objects.bulk_create([
+        BlogPost(author=doctor, title=f'Post {n}', summary=summary, content=summary * 10,
+                 truncated_summary=truncate_words(summary, 15), author_display_name=f'Doc {i}',
+                 category_names=[categories[i % len(categories)].name])
+        for i, doctor in enumerate(doctors) for n in range(POSTS_PER_DOCTOR)
+    ])
+    BlogPost.categories.through.objects.bulk_create([
+        BlogPost.categories.through(blogpost=post, category=categories[i % len(categories)])
+        for i, post in enumerate(posts)
+    ])
+    return [category.pk for category in categories[:2]]
+
+
+def main():
+    category_ids = seed()
+    factory = RequestFactory()
+    feeds = [
+        ('blogposts/', get_all_blogposts, '/blogposts/', {'limit': 6}, ('blogpost',)),
+        ('filtered_blogposts/', get_filtered_blogposts, '/filtered_blogposts/',
+         {'categories[]': category_ids}, ('blogpost',)),
+        ('doctors/', get_filtered_doctors, '/doctors/',
+         {'location': 'pune', 'categories[]': category_ids}, ('doctor',)),
+    ]
+
+    def run(view, path, params, bump=(), **headers):
+        def call():
+            for name in bump:
+                bump_generation(name)
+            response = view(factory.get(path, params, **headers))
+            if hasattr(response, 'render'):
+                response.render()
+        return call
+
+    rows = []
+    for name, view, path, params, generations in feeds:
+        etag = view(factory.get(path, params))['ETag']
+        rows += [
+            (f'{name} uncached', measure(run(view.__wrapped__, path, params))),
+            (f'{name} cached', measure(run(view, path, params))),
+            (f'{name} If-None-Match -> 304', measure(run(view, path, params, HTTP_IF_NONE_MATCH=etag))),
+            # A write before every request: each one misses and rebuilds
+            (f'{name} miss after every write', measure(run(view, path, params, bump=generations))),
+        ]
+    report(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Per-request cost of constructing Google clients, before and after the shared factory."""
+import os
+
+from benchmarks._common import measure, setup_django
+
+setup_django()
+
+from google.oauth2.credentials import Credentials  # noqa: E402
+from google_auth_oauthlib.flow import Flow  # noqa: E402
+from googleapiclient.discovery import build  # noqa: E402
+
+from myapp import google_clients  # noqa: E402
+
+os.environ.setdefault('GOOGLE_CLIENT_ID', 'bench-client-id')
+os.environ.setdefault('GOOGLE_CLIENT_SECRET', 'bench-client-secret')
+
+
+def old_calendar_service():
+    # What AppointmentBookingView did on every booking
+    return build('calendar', 'v3', credentials=Credentials(token='token'))
+
+
+def old_flow():
+    # What LoginView and GoogleCalendarCallbackView did on every call
+    return Flow.from_client_config(
+        {
+            "web": {
+                "client_id": os.environ["GOOGLE_CLIENT_ID"],
+                "client_secret": os.environ["GOOGLE_CLIENT_SECRET"],
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": "https://oauth2.googleapis.com/token",
+                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                "redirect_uris": [google_clients.GOOGLE_REDIRECT_URI]
+            }
+        },
+        scopes=google_clients.GOOGLE_SCOPES,
+        redirect_uri=google_clients.GOOGLE_REDIRECT_URI,
+    )
+
+
+def main():
+    rows = [
+        ('calendar client, build()', measure(old_calendar_service)),
+        ('calendar client, factory', measure(lambda: google_clients.calendar_service('token'))),
+        ('oauth flow, inline config', measure(lambda: old_flow().authorization_url(prompt='consent'))),
+        ('oauth flow, cached config', measure(lambda: google_clients.oauth_flow().authorization_url(prompt='consent'))),
+    ]
+    width = max(len(name) for name, _ in rows)
+    for name, rate in rows:
+        print(f'{name:<{width}}  {1e6 / rate:>10,.0f} us/call')
+
+
+if __name__ == '__main__':
+    main()
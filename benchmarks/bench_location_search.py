@@ -0,0 +1,81 @@
+"""Doctor location search at 100k profiles: icontains scans vs the indexed lookup."""
+import random
+import sys
+import time
+
+from benchmarks._common import setup_django
+
+setup_django()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from myapp.models import CustomUser, Doctor, Profile, normalize_location  # noqa: E402
+from myapp.search import PROFILE_ADDRESS_INDEX  # noqa: E402
+
+CITIES = [('Pune', 'Maharashtra', 411), ('Mumbai', 'Maharashtra', 400), ('Bengaluru', 'Karnataka', 560),
+          ('Chennai', 'Tamil Nadu', 600), ('Jaipur', 'Rajasthan', 302), ('Kolkata', 'West Bengal', 700)]
+STREETS = ['MG Road', 'Park Street', 'Linking Road', 'Anna Salai', 'Koramangala', 'FC Road', 'Civil Lines']
+QUERIES = ['pune', 'karna', 'koramangala', 'park street', '5600', 'nowhere']
+
+
+def populate(count):
+    rng = random.Random(1)
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(
+            CustomUser(username=f'user{i}', is_doctor=True) for i in range(count)
+        )
+        user_ids = list(CustomUser.objects.order_by('id').values_list('id', flat=True))
+        profiles = []
+        for user_id in user_ids:
+            city, state, pin = rng.choice(CITIES)
+            profiles.append(Profile(
+                user_id=user_id,
+                address=f'{rng.randint(1, 300)}, {rng.choice(STREETS)}',
+                city=city, state=state, pincode=pin * 1000 + rng.randint(0, 999),
+                city_normalized=normalize_location(city), state_normalized=normalize_location(state),
+            ))
+        Profile.objects.bulk_create(profiles, batch_size=2000)
+        profile_ids = Profile.objects.values_list('id', flat=True)
+        Doctor.objects.bulk_create((Doctor(profile_id=pk) for pk in profile_ids), batch_size=2000)
+        PROFILE_ADDRESS_INDEX.rebuild()
+
+
+def icontains(query):
+    return Doctor.objects.filter(
+        Q(profile__city__icontains=query) |
+        Q(profile__state__icontains=query) |
+        Q(profile__address__icontains=query)
+    )
+
+
+def indexed(query):
+    return Doctor.objects.filter(profile__in=Profile.objects.in_location(query).values('id'))
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    populate(count)
+    print(f'{count:,} profiles')
+    print(f"{'query':<14}{'icontains ms':>14}{'indexed ms':>12}{'matches':>10}")
+    for query in QUERIES:
+        def old():
+            return icontains(query).count(), list(icontains(query).order_by('id')[:6])
+
+        def new():
+            return indexed(query).count(), list(indexed(query).order_by('id')[:6])
+
+        print(f'{query:<14}{timed(old):>14.1f}{timed(new):>12.1f}{indexed(query).count():>10,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Logins per second per core through LoginView for each password hasher
+profile, sequentially, with the login throttle off.
+
+    python -m benchmarks.bench_login
+
+Logins/sec/core is successful logins divided by the process's CPU time, so
+it is what one fully busy worker process can sustain.
+"""
+import os
+import time
+
+from benchmarks._common import setup_django
+
+setup_django()
+os.environ.setdefault('GOOGLE_CLIENT_ID', 'benchmark')
+os.environ.setdefault('GOOGLE_CLIENT_SECRET', 'benchmark')
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+
+from myapp.models import CustomUser, Profile  # noqa: E402
+
+DURATION = 3.0
+PASSWORD = 'correct horse battery staple'
+PROFILES = [
+    ("PBKDF2 (Django's default)", ['django.contrib.auth.hashers.PBKDF2PasswordHasher']),
+    ('scrypt (N=2^14, r=8, p=1)', ['myapp.hashers.ScryptPasswordHasher']),
+    ('Argon2id (m=19 MiB, t=2, p=1)', ['myapp.hashers.Argon2PasswordHasher']),
+    ('MD5, for the cost outside hashing', ['django.contrib.auth.hashers.MD5PasswordHasher']),
+]
+
+
+def main():
+    user = CustomUser.objects.create(username='patient', first_name='Pat', last_name='Ient', is_patient=True)
+    Profile.objects.create(user=user, address='1 MG Road', city='Pune', state='Maharashtra', pincode=411001)
+    client = Client()
+
+    print(f'{"hasher":<36} {"ms/login":>9} {"logins/s/core":>14}')
+    for name, hashers in PROFILES:
+        with override_settings(PASSWORD_HASHERS=hashers, LOGIN_THROTTLE_RATE=None,
+                               LOGIN_USERNAME_THROTTLE_RATE=None):
+            CustomUser.objects.filter(pk=user.pk).update(password=make_password(PASSWORD))
+            client.post('/login/', {'username': 'patient', 'password': PASSWORD})  # warm up
+            logins = 0
+            cpu = time.process_time()
+            deadline = time.perf_counter() + DURATION
+            while time.perf_counter() < deadline:
+                response = client.post('/login/', {'username': 'patient', 'password': PASSWORD})
+                assert response.status_code == 200, response.content
+                logins += 1
+            cpu = time.process_time() - cpu
+        print(f'{name:<36} {cpu * 1000 / logins:>9.1f} {logins / cpu:>14,.1f}')
+
+
+if __name__ == '__main__':
+    main()
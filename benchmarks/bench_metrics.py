@@ -0,0 +1,128 @@
+"""
+Per-request cost of myapp.metrics, checked against a fixed budget of
+BUDGET_US per request plus QUERY_BUDGET_US per SQL statement.
+
+    python -m benchmarks.bench_metrics
+
+The first table times the pieces directly: MetricsMiddleware around a view
+that returns at once, and a ``SELECT 1`` with and without the execute
+wrapper; the budget is checked against these. The second runs whole routes
+through the test client with the middleware in MIDDLEWARE and without it,
+as a sanity check: there the difference should stay within the spread
+between rounds of the request itself.
+
+Without the middleware the execute wrapper and serializer_data() are
+still called but pass straight through; the "passthrough" row is the
+wrapper's part.
+"""
+import statistics
+import timeit
+
+from benchmarks._common import measure, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, RequestFactory, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from django.urls import resolve  # noqa: E402
+
+from myapp import metrics  # noqa: E402
+from myapp.models import Appointment, Category, CustomUser, Doctor, Profile  # noqa: E402
+
+BUDGET_US = 20
+QUERY_BUDGET_US = 5
+ROUNDS = 5
+DURATION = 1.0
+
+
+def seed():
+    Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(20)])
+    doctor = CustomUser.objects.create(username='doctor', first_name='Doc', last_name='Tor', is_doctor=True)
+    patient = CustomUser.objects.create(username='patient', first_name='Pat', last_name='Ient', is_patient=True)
+    for user in (doctor, patient):
+        Profile.objects.create(user=user, address='1 MG Road', city='Pune', state='Maharashtra', pincode=411001)
+    Doctor.objects.create(profile=doctor.profile, establishment_name='Clinic')
+    Appointment.objects.bulk_create([
+        Appointment(patient=patient, doctor=doctor, date=f'2024-01-{day:02}', start_time='10:00', end_time='10:45')
+        for day in range(1, 29)
+    ])
+    return patient
+
+
+def per_call_us(func, number=20000):
+    """Best of five runs, in µs per call, as timeit reports it."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def check(cost, budget):
+    return 'ok' if cost <= budget else 'OVER'
+
+
+def pieces():
+    request = RequestFactory().get('/categories/')
+    request.resolver_match = resolve('/categories/')
+    response = HttpResponse(b'{}', content_type='application/json')
+
+    def view(request):
+        return response
+
+    middleware = metrics.MetricsMiddleware(view)
+    bare, wrapped = per_call_us(lambda: view(request)), per_call_us(lambda: middleware(request))
+
+    cursor = connection.cursor()
+    select = lambda: cursor.execute('SELECT 1')  # noqa: E731
+    connection.execute_wrappers.remove(metrics.record_query)
+    unwrapped = per_call_us(select)
+    connection.execute_wrappers.append(metrics.record_query)
+    passthrough = per_call_us(select)
+    token = metrics._current.set(metrics.RequestStats(trace=False))
+    recorded = per_call_us(select)
+    metrics._current.reset(token)
+
+    print(f'{"piece":<34} {"µs":>8} {"overhead":>9}  budget')
+    print(f'{"view, bare":<34} {bare:>8.2f}')
+    print(f'{"view under MetricsMiddleware":<34} {wrapped:>8.2f} {wrapped - bare:>8.2f}µ  '
+          f'{BUDGET_US} µs {check(wrapped - bare, BUDGET_US)}')
+    print(f'{"SELECT 1, no wrapper":<34} {unwrapped:>8.2f}')
+    print(f'{"SELECT 1, wrapper passthrough":<34} {passthrough:>8.2f} {passthrough - unwrapped:>8.2f}µ')
+    print(f'{"SELECT 1, recorded":<34} {recorded:>8.2f} {recorded - unwrapped:>8.2f}µ  '
+          f'{QUERY_BUDGET_US} µs {check(recorded - unwrapped, QUERY_BUDGET_US)}')
+
+
+def routes(patient):
+    without = [name for name in settings.MIDDLEWARE if name != 'myapp.metrics.MetricsMiddleware']
+    print(f'\n{"route":<26} {"queries":>7} {"off µs":>8} {"on µs":>8} {"difference":>10} {"spread":>8}')
+    for name, path in [
+        ('categories/', '/categories/'),
+        ('appointments/ (28 rows)', f'/appointments/?user_id={patient.pk}'),
+    ]:
+        # Middleware chains are built on a client's first request, so each
+        # setting gets its own client
+        with override_settings(MIDDLEWARE=without):
+            off = Client()
+            off.get(path)
+        on = Client()
+        with CaptureQueriesContext(connection) as captured:
+            assert on.get(path).status_code == 200
+        queries = len(captured)  # connection.queries is reset by every request
+        # Alternate the two so drift affects both alike
+        off_us, on_us = [], []
+        for _ in range(ROUNDS):
+            off_us.append(1e6 / measure(lambda: off.get(path), DURATION))
+            on_us.append(1e6 / measure(lambda: on.get(path), DURATION))
+        spread = max(max(off_us) - min(off_us), max(on_us) - min(on_us))
+        off_us, on_us = statistics.median(off_us), statistics.median(on_us)
+        print(f'{name:<26} {queries:>7} {off_us:>8.0f} {on_us:>8.0f} {on_us - off_us:>9.0f}µ {spread:>7.0f}µ')
+
+
+def main():
+    patient = seed()
+    pieces()
+    routes(patient)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Static files and media served by one sync gunicorn worker: myapp.serving
+against django.views.static.serve (what django.conf.urls.static mounted
+before), reporting throughput and the worker's CPU time per request.
+
+    python -m benchmarks.bench_serving
+
+Needs gunicorn installed. The worker runs this module as its WSGI app
+(``benchmarks.bench_serving:application()``), with both views mounted.
+"""
+import http.client
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.urls import re_path
+from django.views.static import serve
+
+from benchmarks._common import ROOT
+
+CLIENTS = 4
+DURATION = 5.0
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def application():
+    """gunicorn app factory: the project's settings with this module's URLs and the benchmark's directories."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Medi_BE.settings')
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    global urlpatterns
+    settings.ROOT_URLCONF = __name__
+    settings.STATIC_ROOT = os.environ['BENCH_STATIC_ROOT']
+    settings.MEDIA_ROOT = os.environ['BENCH_MEDIA_ROOT']
+    wsgi = get_wsgi_application()
+    urlpatterns = url_patterns()
+    return wsgi
+
+
+def url_patterns():
+    from django.conf import settings
+
+    from myapp.serving import file_pattern, serve_media, serve_static
+
+    return [
+        file_pattern(settings.MEDIA_URL, serve_media),
+        file_pattern(settings.STATIC_URL, serve_static),
+        re_path(r'^legacy-media/(?P<path>.+)$', serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^legacy-static/(?P<path>.+)$', serve, {'document_root': settings.STATIC_ROOT}),
+    ]
+
+
+def prepare(static_root, media_root):
+    """collectstatic into ``static_root``; a 2 MB photo into ``media_root``. Returns the hashed base.css."""
+    from django.conf import settings
+    from django.core.management import call_command
+    from PIL import Image
+
+    settings.STATIC_ROOT = static_root
+    call_command('collectstatic', interactive=False, verbosity=0)
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    photo = io.BytesIO()
+    Image.effect_noise((1400, 1200), 60).convert('RGB').save(photo, 'JPEG', quality=95)
+    os.makedirs(os.path.join(media_root, 'blog_images'))
+    with open(os.path.join(media_root, 'blog_images', 'a' * 64 + '.jpg'), 'wb') as f:
+        f.write(photo.getvalue())
+    return staticfiles_storage.stored_name('admin/css/base.css')
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def worker_pid(master):
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            with open(f'/proc/{master}/task/{master}/children') as f:
+                children = f.read().split()
+        except OSError:
+            children = []
+        if children:
+            return int(children[0])
+        time.sleep(0.1)
+    raise RuntimeError('gunicorn worker did not start')
+
+
+def load(port, path, headers, duration=DURATION):
+    counts = {'requests': 0, 'bytes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        requests = received = errors = 0
+        while time.perf_counter() < deadline:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                received += len(response.read())
+                if response.status not in (200, 304):
+                    errors += 1
+            except OSError:
+                errors += 1
+            finally:
+                connection.close()
+            requests += 1
+        with lock:
+            counts['requests'] += requests
+            counts['bytes'] += received
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    from benchmarks._common import setup_django
+
+    setup_django()
+    workdir = tempfile.mkdtemp()
+    static_root, media_root = os.path.join(workdir, 'static'), os.path.join(workdir, 'media')
+    hashed_css = prepare(static_root, media_root)
+    photo = 'blog_images/' + 'a' * 64 + '.jpg'
+
+    # A browser's headers; the revalidation rows send what a cached copy would
+    browser = {'Accept-Encoding': 'gzip, deflate, br'}
+    cached = {**browser, 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT', 'If-None-Match': '*'}
+    scenarios = [
+        ('2 MB photo', f'/legacy-media/{photo}', f'/media/{photo}', browser),
+        ('base.css', '/legacy-static/admin/css/base.css', f'/static/{hashed_css}', browser),
+        ('base.css, revalidated', '/legacy-static/admin/css/base.css', f'/static/{hashed_css}', cached),
+    ]
+
+    port = 18000 + os.getpid() % 1000
+    env = {
+        **os.environ, 'DJANGO_SETTINGS_MODULE': 'Medi_BE.settings',
+        'BENCH_STATIC_ROOT': static_root, 'BENCH_MEDIA_ROOT': media_root,
+    }
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'benchmarks.bench_serving:application()', '--workers', '1',
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        worker = worker_pid(master.pid)
+        load(port, '/static/admin/css/base.css', {}, duration=1.0)  # wait for the app to load
+        print(f'{"file":<24} {"path":<16} {"req/s":>8} {"MB/s":>8} {"CPU ms/req":>11} {"errors":>6}')
+        for name, legacy, current, headers in scenarios:
+            for label, path in (('static.serve', legacy), ('myapp.serving', current)):
+                load(port, path, headers, duration=0.5)  # warm up
+                cpu = cpu_seconds(worker)
+                counts = load(port, path, headers)
+                cpu = cpu_seconds(worker) - cpu
+                print(f"{name:<24} {label:<16} {counts['requests'] / DURATION:>8,.0f} "
+                      f"{counts['bytes'] / DURATION / 1e6:>8.1f} {cpu * 1000 / max(counts['requests'], 1):>11.2f} "
+                      f"{counts['errors']:>6}")
+    finally:
+        master.terminate()
+        master.wait()
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
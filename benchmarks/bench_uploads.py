@@ -0,0 +1,95 @@
+"""
+Peak memory of one image upload through CreateBlogPostView, with the upload
+limits (streaming handler, byte cap, header check) and without them (Django's
+default handlers, limits raised out of the way).
+
+    python -m benchmarks.bench_uploads
+
+Each upload runs in a fresh process and reports how far it raised the
+process's resident set high-water mark. Image variants are generated
+inline, as the background thread would, so a decoded bitmap shows up.
+"""
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS = {
+    # name: (format, size, noise)
+    '4 MB photo': ('JPEG', (2400, 2000), True),
+    '20 MB photo': ('JPEG', (5400, 4300), True),
+    '81 MP flat PNG (small file)': ('PNG', (9000, 9000), False),
+}
+
+
+def make_image(image_format, size, noise):
+    from PIL import Image
+
+    image = Image.effect_noise(size, 80).convert('RGB') if noise else Image.new('RGB', size, 'white')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, quality=95)
+    buffer.name = f'upload.{image_format.lower()}'
+    buffer.seek(0)
+    return buffer
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, scenario):
+    from benchmarks._common import setup_django
+
+    setup_django()
+    from django.test import Client, override_settings
+
+    from myapp.models import CustomUser, Doctor, Profile
+
+    overrides = {'MEDIA_ROOT': tempfile.mkdtemp(), 'IMAGE_VARIANTS_IN_BACKGROUND': False}
+    if mode == 'without limits':
+        overrides.update(
+            FILE_UPLOAD_HANDLERS=[
+                'django.core.files.uploadhandler.MemoryFileUploadHandler',
+                'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+            ],
+            UPLOAD_MAX_BYTES=1 << 40, IMAGE_MAX_DIMENSION=1 << 20, IMAGE_MAX_PIXELS=1 << 40,
+        )
+
+    with override_settings(**overrides):
+        user = CustomUser.objects.create(username='doctor', is_doctor=True)
+        Doctor.objects.create(profile=Profile.objects.create(user=user, address='x', city='x', state='x', pincode=1))
+        upload = make_image(*SCENARIOS[scenario])
+        size = len(upload.getvalue())
+        client = Client()
+        client.get('/categories/')  # warm up imports and the request path
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        response = client.post(f'/create-blog/?userId={user.pk}', {'title': 'bench', 'image': upload})
+        elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'status': response.status_code, 'bytes': size, 'seconds': elapsed,
+        'peak_mb': peak_rss_mb() - baseline,
+    }))
+
+
+def main():
+    print(f'{"upload":<30} {"mode":<15} {"size":>8} {"status":>6} {"time":>8} {"peak RSS":>10}')
+    for scenario in SCENARIOS:
+        for mode in ('without limits', 'with limits'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_uploads', '--child', mode, scenario],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{scenario:<30} {mode:<15} {result['bytes'] / 1e6:>6.1f}MB {result['status']:>6} "
+                  f"{result['seconds'] * 1000:>6.0f}ms {result['peak_mb']:>8.1f}MB")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
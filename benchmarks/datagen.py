@@ -0,0 +1,280 @@
+"""
+Synthetic data for the benchmarks: categories, doctors (user, profile and
+Doctor rows), patients, blog posts and appointments, written in batches
+through bulk_create so that millions of rows never sit in memory at once.
+
+    python -m benchmarks.datagen --doctors 100000 --patients 1000000 --database /tmp/bench.sqlite3
+
+bulk_create skips save() and the signal handlers, so the rows are filled
+the way those would have filled them: the normalized city/state, the
+feeds' display fields (truncated summary, author name, category names)
+and image variant records. The search indexes are rebuilt and the cache
+generations bumped at the end. The same seed gives the same data.
+"""
+import argparse
+import dataclasses
+import datetime
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+
+CITIES = [('Pune', 'Maharashtra', 411), ('Mumbai', 'Maharashtra', 400), ('Bengaluru', 'Karnataka', 560),
+          ('Chennai', 'Tamil Nadu', 600), ('Jaipur', 'Rajasthan', 302), ('Kolkata', 'West Bengal', 700)]
+STREETS = ['MG Road', 'Park Street', 'Linking Road', 'Anna Salai', 'Koramangala', 'FC Road', 'Civil Lines']
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Anaya', 'Rohan', 'Saanvi', 'Vihaan', 'Tara']
+LAST_NAMES = ['Sharma', 'Iyer', 'Patel', 'Reddy', 'Gupta', 'Nair', 'Kulkarni', 'Das', 'Singh', 'Menon']
+SPECIALTIES = ['Cardiology', 'Dermatology', 'Pediatrics', 'Orthopedics', 'Neurology', 'Oncology',
+               'Psychiatry', 'Radiology', 'Gynecology', 'Ophthalmology', 'Urology', 'Endocrinology']
+WORDS = ('health care patient doctor treatment sleep heart diet exercise symptom therapy clinic recovery '
+         'vaccine allergy fever blood pressure sugar stress skin bone joint vision hearing lungs').split()
+
+# The one user whose password is known, for the login endpoint
+LOGIN_USERNAME = 'bench-patient'
+LOGIN_PASSWORD = 'correct horse battery staple'
+
+
+@dataclass(frozen=True)
+class Sizes:
+    categories: int = 12
+    doctors: int = 200
+    patients: int = 1000
+    posts_per_doctor: int = 5
+    appointments_per_patient: int = 3
+    categories_per_doctor: int = 2
+    categories_per_post: int = 2
+    draft_share: float = 0.1
+    # Share of profiles and posts with an image and its variant record
+    image_share: float = 0.5
+    batch_size: int = 5000
+    seed: int = 0
+
+
+def variant_record(name, widths):
+    """A variant record for ``name`` as myapp.images would store it; the files themselves are not written."""
+    from myapp.images import VARIANT_FORMATS, target_widths, variant_name
+
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    record = {'source': name, 'width': 1600}
+    for extension in VARIANT_FORMATS:
+        record[extension] = {str(width): variant_name(digest, width, extension) for width in target_widths(1600, widths)}
+    return record
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def batches(count, size):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+class Generator:
+    def __init__(self, sizes):
+        from django.contrib.auth.hashers import make_password
+
+        self.sizes = sizes
+        self.rng = random.Random(sizes.seed)
+        # One unusable password shared by every generated user; hashing a
+        # million real ones would take longer than the rest put together
+        self.unusable_password = make_password(None)
+        self.category_ids = []
+        self.category_names = {}
+        self.doctor_user_ids = []
+        self.patient_user_ids = []
+
+    def run(self):
+        from myapp.cache import bump_generation
+        from myapp.facets import refresh_counters
+        from myapp.search import SEARCH_INDEXES
+
+        steps = [
+            ('categories', self.categories),
+            ('doctors', self.doctors),
+            ('patients', self.patients),
+            ('appointments', self.appointments),
+        ]
+        counts = {}
+        for name, step in steps:
+            start = time.perf_counter()
+            counts[name] = step()
+            counts[f'{name}_seconds'] = round(time.perf_counter() - start, 2)
+        start = time.perf_counter()
+        for index in SEARCH_INDEXES.values():
+            index.rebuild()
+        counts['search_index_seconds'] = round(time.perf_counter() - start, 2)
+        # bulk_create sends no m2m_changed
+        refresh_counters(None)
+        for name in ('category', 'user', 'profile', 'doctor', 'blogpost'):
+            bump_generation(name)
+        return counts
+
+    def profile(self, user, picture_prefix):
+        from myapp.models import Profile, normalize_location
+
+        rng = self.rng
+        city, state, pin = rng.choice(CITIES)
+        profile = Profile(
+            user=user,
+            address=f'{rng.randint(1, 300)}, {rng.choice(STREETS)}',
+            city=city, state=state, pincode=pin * 1000 + rng.randint(0, 999),
+            city_normalized=normalize_location(city), state_normalized=normalize_location(state),
+        )
+        if rng.random() < self.sizes.image_share:
+            profile.profile_picture = f'profile_pictures/{picture_prefix}{user.pk}.jpg'
+            profile.profile_picture_variants = variant_record(profile.profile_picture.name, Profile.VARIANT_WIDTHS)
+        return profile
+
+    def user(self, username, **kwargs):
+        from myapp.models import CustomUser
+
+        return CustomUser(
+            username=username, email=f'{username}@example.com', password=self.unusable_password,
+            first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES), **kwargs,
+        )
+
+    def categories(self):
+        from myapp.models import Category
+
+        names = [SPECIALTIES[i % len(SPECIALTIES)] + (f' {i // len(SPECIALTIES) + 1}' if i >= len(SPECIALTIES) else '')
+                 for i in range(self.sizes.categories)]
+        categories = Category.objects.bulk_create([Category(name=name) for name in names])
+        self.category_ids = [category.pk for category in categories]
+        self.category_names = {category.pk: category.name for category in categories}
+        return len(categories)
+
+    def doctors(self):
+        from django.db import transaction
+
+        from myapp.models import SUMMARY_PREVIEW_WORDS, BlogPost, CustomUser, Doctor, Profile, truncate_words
+
+        sizes, rng = self.sizes, self.rng
+        for numbers in batches(sizes.doctors, max(1, sizes.batch_size // max(1, sizes.posts_per_doctor))):
+            with transaction.atomic():
+                users = CustomUser.objects.bulk_create(
+                    [self.user(f'doctor{number}', is_doctor=True) for number in numbers]
+                )
+                profiles = Profile.objects.bulk_create([self.profile(user, 'doctor') for user in users])
+                doctors = Doctor.objects.bulk_create([
+                    Doctor(profile=profile, establishment_name=f'{profile.city} {rng.choice(STREETS)} Clinic',
+                           license_number=f'MC-{profile.user_id:08}')
+                    for profile in profiles
+                ])
+                Doctor.categories.through.objects.bulk_create([
+                    Doctor.categories.through(doctor=doctor, category_id=category_id)
+                    for doctor in doctors
+                    for category_id in rng.sample(self.category_ids, min(sizes.categories_per_doctor, len(self.category_ids)))
+                ])
+                self.doctor_user_ids += [user.pk for user in users]
+
+                posts, post_categories = [], []
+                for user, doctor in zip(users, doctors):
+                    for _ in range(sizes.posts_per_doctor):
+                        summary = ' '.join(sentence(rng, 12) for _ in range(2))
+                        category_ids = sorted(rng.sample(self.category_ids, min(sizes.categories_per_post, len(self.category_ids))))
+                        post = BlogPost(
+                            author=doctor, title=sentence(rng, 5)[:-1], summary=summary,
+                            content=' '.join(sentence(rng, 15) for _ in range(20)),
+                            draft=rng.random() < sizes.draft_share,
+                            truncated_summary=truncate_words(summary, SUMMARY_PREVIEW_WORDS),
+                            author_display_name=user.get_full_name(),
+                            category_names=[self.category_names[pk] for pk in category_ids],
+                        )
+                        if rng.random() < sizes.image_share:
+                            post.image = f'blog_images/post-{user.pk}-{len(posts)}.jpg'
+                            post.image_variants = variant_record(post.image.name, BlogPost.VARIANT_WIDTHS)
+                        posts.append(post)
+                        post_categories.append(category_ids)
+                posts = BlogPost.objects.bulk_create(posts)
+                BlogPost.categories.through.objects.bulk_create([
+                    BlogPost.categories.through(blogpost=post, category_id=category_id)
+                    for post, category_ids in zip(posts, post_categories) for category_id in category_ids
+                ])
+        return len(self.doctor_user_ids)
+
+    def patients(self):
+        from django.contrib.auth.hashers import make_password
+        from django.db import transaction
+
+        from myapp.models import CustomUser, Profile
+
+        login_user = self.user(LOGIN_USERNAME, is_patient=True)
+        login_user.password = make_password(LOGIN_PASSWORD)
+        for numbers in batches(self.sizes.patients, self.sizes.batch_size):
+            with transaction.atomic():
+                users = [self.user(f'patient{number}', is_patient=True) for number in numbers]
+                if numbers.start == 0:
+                    users[0] = login_user
+                users = CustomUser.objects.bulk_create(users)
+                Profile.objects.bulk_create([self.profile(user, 'patient') for user in users])
+            self.patient_user_ids += [user.pk for user in users]
+        return len(self.patient_user_ids)
+
+    def appointments(self):
+        """
+        Each doctor's appointments fill consecutive slots of clinic hours
+        from tomorrow, so none overlap, as book_appointment would have ensured.
+        """
+        from django.conf import settings
+        from django.db import transaction
+
+        from myapp.models import Appointment
+
+        if not self.doctor_user_ids:
+            return 0
+        slot = datetime.timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+        opening = datetime.datetime.strptime(settings.CLINIC_OPENING_TIME, '%H:%M').time()
+        closing = datetime.datetime.strptime(settings.CLINIC_CLOSING_TIME, '%H:%M').time()
+        slots_per_day = (
+            (closing.hour * 60 + closing.minute) - (opening.hour * 60 + opening.minute)
+        ) // settings.APPOINTMENT_SLOT_MINUTES
+        first_day = datetime.date.today() + datetime.timedelta(days=1)
+        per_patient = self.sizes.appointments_per_patient
+        total = len(self.patient_user_ids) * per_patient
+        for numbers in batches(total, self.sizes.batch_size):
+            appointments = []
+            for number in numbers:
+                day, index = divmod(number // len(self.doctor_user_ids), slots_per_day)
+                start = datetime.datetime.combine(first_day + datetime.timedelta(days=day), opening) + slot * index
+                appointments.append(Appointment(
+                    patient_id=self.patient_user_ids[number // per_patient],
+                    doctor_id=self.doctor_user_ids[number % len(self.doctor_user_ids)],
+                    date=start.date(), start_time=start.time(), end_time=(start + slot).time(),
+                    calendar_sync_status=Appointment.SYNC_SYNCED,
+                ))
+            with transaction.atomic():
+                Appointment.objects.bulk_create(appointments)
+        return total
+
+
+def generate(sizes=Sizes()):
+    """Fill the database with ``sizes`` worth of rows; returns row counts and timings per step."""
+    return Generator(sizes).run()
+
+
+def add_size_arguments(parser):
+    for field in dataclasses.fields(Sizes):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=field.default)
+
+
+def sizes_from_options(options):
+    return Sizes(**{field.name: getattr(options, field.name) for field in dataclasses.fields(Sizes)})
+
+
+def main():
+    from benchmarks._common import setup_django
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    add_size_arguments(parser)
+    parser.add_argument('--database', required=True,
+                        help='SQLite file to create (replaced if it exists); pass it to benchmarks.suite --database')
+    options = parser.parse_args()
+    setup_django(options.database)
+    counts = generate(sizes_from_options(options))
+    for name, value in counts.items():
+        print(f'{name:<24} {value:>12,}')
+
+
+if __name__ == '__main__':
+    main()
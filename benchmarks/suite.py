@@ -0,0 +1,453 @@
+"""
+Latency, throughput and query counts for every public endpoint, on data
+from benchmarks.datagen, saved as JSON that can be compared between commits.
+
+    python -m benchmarks.suite --output before.json
+    # ...change something...
+    python -m benchmarks.suite --output after.json --baseline before.json
+    python -m benchmarks.suite --compare before.json after.json
+
+Each endpoint first runs for --duration seconds through the Django test
+client, one request at a time, recording every request's latency; its
+queries are counted on one warm request. The GET endpoints then run again
+through an in-process WSGI load driver: --concurrency threads calling the
+WSGI handler directly, with no sockets and none of the test client's
+extras, for throughput under concurrency.
+
+The cached feeds run twice: as they are (served from the response cache)
+and with their generation bumped before every request, so every request
+rebuilds the response ("miss").
+
+Against a baseline, an endpoint regresses when its median latency grows
+by more than --latency-threshold, its WSGI throughput falls by more than
+--throughput-threshold, or it runs more queries than before. The exit
+status is then 1. Query counts are exact; the timings are not, so set the
+thresholds above the spread between two runs of the same commit on the
+machine at hand (on one shared core that was about 12% for median latency
+and 20% for WSGI throughput, hence the 25% defaults).
+
+The data is generated in memory for each run, with the sizes taken from
+the same options as benchmarks.datagen. Pass --database to use a SQLite
+file instead; the file is generated if it is empty and reused as it is
+otherwise, which is what makes runs at millions of rows practical.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from benchmarks._common import ROOT
+from benchmarks.datagen import LOGIN_PASSWORD, LOGIN_USERNAME, add_size_arguments, sizes_from_options
+
+# Settings for the whole run: no login throttle, the in-memory calendar in
+# place of Google's, and no slow-request SQL traces in the output
+RUN_SETTINGS = {
+    'LOGIN_THROTTLE_RATE': None,
+    'LOGIN_USERNAME_THROTTLE_RATE': None,
+    'CALENDAR_BACKEND': 'fake',
+    'METRICS_TRACE_SAMPLE_RATE': 0,
+}
+BULK_BOOKING_SIZE = 10
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    # For POSTs: called with the request's sequence number, returns the JSON body
+    body: object = None
+    expected_status: int = 200
+    # Generations bumped before each request, to measure cache misses
+    bump: tuple = ()
+
+
+@dataclass(frozen=True)
+class Targets:
+    """The rows the endpoints are pointed at."""
+    category_ids: tuple
+    doctor: int
+    other_doctor: int
+    patient: int
+    # First day with no appointments for either doctor, for the bookings
+    free_from: datetime.date
+    # Tells this run's registrations from those of earlier runs on the same database
+    run_id: int
+
+    @property
+    def categories(self):
+        return '&'.join(f'categories[]={pk}' for pk in self.category_ids)
+
+    @classmethod
+    def from_database(cls):
+        from django.db.models import Max
+
+        from myapp.models import Appointment, BlogPost, Category, CustomUser, Doctor
+
+        # Doctors with published posts and appointments; the login user
+        # is the patient with appointments
+        doctors = list(
+            Doctor.objects.filter(pk__in=BlogPost.objects.published().values('author_id')[:100])
+            .order_by('pk').values_list('profile__user_id', flat=True)[:2]
+        )
+        if len(doctors) < 2:
+            raise SystemExit('The database needs at least two doctors with published posts; run benchmarks.datagen.')
+        last_booked = Appointment.objects.filter(doctor_id__in=doctors).aggregate(last=Max('date'))['last']
+        return cls(
+            category_ids=tuple(Category.objects.order_by('pk').values_list('pk', flat=True)[:2]),
+            doctor=doctors[0],
+            other_doctor=doctors[1],
+            patient=CustomUser.objects.get(username=LOGIN_USERNAME).pk,
+            free_from=max(last_booked or datetime.date.today(), datetime.date.today()) + datetime.timedelta(days=1),
+            run_id=int(time.time()),
+        )
+
+
+def endpoints(t):
+    from django.conf import settings
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    next_week = tomorrow + datetime.timedelta(days=6)
+    slots_per_day = 8
+
+    def slot(number):
+        day = t.free_from + datetime.timedelta(days=number // slots_per_day)
+        start = datetime.datetime.combine(day, datetime.time(9)) + datetime.timedelta(
+            minutes=settings.APPOINTMENT_SLOT_MINUTES * (number % slots_per_day)
+        )
+        return {'date': day.isoformat(), 'start_time': start.strftime('%H:%M')}
+
+    def registration(number):
+        username = f'bench-new-{t.run_id}-{number}'
+        return {
+            'username': username, 'email': f'{username}@example.com', 'password': LOGIN_PASSWORD,
+            'first_name': 'New', 'last_name': 'Patient', 'select_role': 'patient',
+            'address': '12, MG Road', 'city': 'Pune', 'state': 'Maharashtra', 'pincode': 411001,
+        }
+
+    reads = [
+        Endpoint('categories', 'GET', '/categories/'),
+        Endpoint('blogposts', 'GET', '/blogposts/'),
+        Endpoint('blogposts (miss)', 'GET', '/blogposts/', bump=('blogpost',)),
+        Endpoint('blogposts offset 200', 'GET', '/blogposts/?offset=200&limit=20', bump=('blogpost',)),
+        Endpoint('filtered_blogposts', 'GET', f'/filtered_blogposts/?{t.categories}'),
+        Endpoint('filtered_blogposts (miss)', 'GET', f'/filtered_blogposts/?{t.categories}', bump=('blogpost',)),
+        Endpoint('blogposts/search', 'GET', '/blogposts/search/?q=heart%20pres'),
+        Endpoint('doctors', 'GET', '/doctors/'),
+        Endpoint('doctors (miss)', 'GET', '/doctors/', bump=('doctor',)),
+        Endpoint('doctors location+categories (miss)', 'GET', f'/doctors/?location=pune&{t.categories}',
+                 bump=('doctor',)),
+        Endpoint('doctors/availability', 'GET',
+                 f'/doctors/{t.doctor}/availability/?from={tomorrow.isoformat()}&to={next_week.isoformat()}'),
+        Endpoint('user-details patient', 'GET', f'/user-details/?user_id={t.patient}'),
+        Endpoint('user-details doctor', 'GET', f'/user-details/?user_id={t.doctor}'),
+        Endpoint('user-details bulk', 'GET', f'/user-details/?user_ids={t.doctor},{t.other_doctor},{t.patient}'),
+        Endpoint('appointments', 'GET', f'/appointments/?user_id={t.patient}'),
+        Endpoint('doc-appointments', 'GET', f'/doc-appointments/?user_id={t.doctor}'),
+        Endpoint('doc-appointments page', 'GET', f'/doc-appointments/?user_id={t.doctor}&limit=20'),
+        Endpoint('user-blogs', 'GET', f'/user-blogs/?userId={t.doctor}'),
+        Endpoint('async/blogposts', 'GET', '/async/blogposts/'),
+        Endpoint('async/filtered_blogposts', 'GET', f'/async/filtered_blogposts/?{t.categories}'),
+        Endpoint('async/doctors', 'GET', f'/async/doctors/?location=pune&{t.categories}'),
+        Endpoint('async/user-details', 'GET', f'/async/user-details/?user_id={t.doctor}'),
+        Endpoint('async/appointments', 'GET', f'/async/appointments/?user_id={t.patient}'),
+        Endpoint('async/doc-appointments', 'GET', f'/async/doc-appointments/?user_id={t.doctor}'),
+        Endpoint('metrics', 'GET', '/metrics'),
+    ]
+    writes = [
+        Endpoint('login', 'POST', '/login/', body=lambda n: {'username': LOGIN_USERNAME, 'password': LOGIN_PASSWORD}),
+        Endpoint('logout', 'POST', '/logout/', body=lambda n: {}),
+        Endpoint('register', 'POST', '/register/', body=registration, expected_status=201),
+        Endpoint('book-appointment', 'POST', '/book-appointment/', expected_status=201, body=lambda n: {
+            'access_token': 'benchmark', 'user_id': t.patient, 'doctor_id': t.doctor, **slot(n),
+        }),
+        Endpoint(f'book-appointments/bulk ({BULK_BOOKING_SIZE})', 'POST', '/book-appointments/bulk/',
+                 expected_status=201, body=lambda n: {'access_token': 'benchmark', 'appointments': [
+                     {'user_id': t.patient, 'doctor_id': t.other_doctor, **slot(n * BULK_BOOKING_SIZE + i)}
+                     for i in range(BULK_BOOKING_SIZE)
+                 ]}),
+        Endpoint('create-blog', 'POST', f'/create-blog/?userId={t.doctor}', expected_status=201, body=lambda n: {
+            'title': f'Benchmark post {n}', 'summary': 'A post written by the benchmark. ' * 5,
+            'content': 'Some content. ' * 200, 'categories': list(t.category_ids),
+        }),
+    ]
+    return reads + writes
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+
+    def at(share):
+        return round(latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000, 3)
+
+    return {
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': at(0.50), 'p95_ms': at(0.95), 'p99_ms': at(0.99),
+    }
+
+
+def sender(client, endpoint):
+    """A function making the endpoint's next request through ``client``."""
+    from myapp.cache import bump_generation
+
+    numbers = iter(range(sys.maxsize))
+
+    def send():
+        for name in endpoint.bump:
+            bump_generation(name)
+        if endpoint.method == 'GET':
+            return client.get(endpoint.path)
+        return client.post(endpoint.path, endpoint.body(next(numbers)), content_type='application/json')
+    return send
+
+
+def run_client(endpoint, duration):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    send = sender(Client(), endpoint)
+    send()  # warm up
+    with CaptureQueriesContext(connection) as captured:
+        response = send()
+    if response.status_code != endpoint.expected_status:
+        raise SystemExit(f'{endpoint.name}: expected {endpoint.expected_status}, got {response.status_code}: '
+                         f'{response.content[:300]!r}')
+    result = {'status': response.status_code, 'queries': len(captured), 'bytes': len(response.content)}
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        began = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    result['client'] = {
+        'requests': len(latencies), 'throughput': round(len(latencies) / elapsed, 1), **percentiles(latencies),
+    }
+    return result
+
+
+def run_wsgi(handler, endpoint, concurrency, duration):
+    """``concurrency`` threads sending the endpoint's GET straight to the WSGI handler for ``duration`` seconds."""
+    from django.db import connections
+
+    from myapp.cache import bump_generation
+
+    url = urlsplit(endpoint.path)
+    base_environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'testserver',
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    latencies, errors = [], []
+    lock = threading.Lock()
+    statuses = threading.local()
+    deadline = time.perf_counter() + duration
+
+    def start_response(status, headers, exc_info=None):
+        statuses.status = int(status.split()[0])
+
+    def worker():
+        mine, failed = [], 0
+        try:
+            while time.perf_counter() < deadline:
+                for name in endpoint.bump:
+                    bump_generation(name)
+                began = time.perf_counter()
+                response = handler({**base_environ, 'wsgi.input': io.BytesIO()}, start_response)
+                try:
+                    for _ in response:
+                        pass
+                finally:
+                    response.close()
+                mine.append(time.perf_counter() - began)
+                if statuses.status != endpoint.expected_status:
+                    failed += 1
+        finally:
+            connections.close_all()
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'concurrency': concurrency, 'requests': len(latencies), 'errors': sum(errors),
+        'throughput': round(len(latencies) / elapsed, 1), **percentiles(latencies),
+    }
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+
+
+def row_counts():
+    from myapp.models import Appointment, BlogPost, Category, CustomUser, Doctor
+
+    return {model._meta.model_name: model.objects.count()
+            for model in (Category, CustomUser, Doctor, BlogPost, Appointment)}
+
+
+def run(options):
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.test import override_settings
+
+    from benchmarks.datagen import generate
+
+    if not row_counts()['category']:
+        print('Generating data...', file=sys.stderr)
+        generate(sizes_from_options(options))
+    targets = Targets.from_database()
+    handler = get_wsgi_application()
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': __import__('django').get_version(),
+            'database': f'{connection.vendor} {connection.Database.sqlite_version}'
+                        if connection.vendor == 'sqlite' else connection.vendor,
+            'cpus': os.cpu_count(),
+            'duration': options.duration,
+            'rows': row_counts(),
+        },
+        'endpoints': {},
+    }
+    with override_settings(**RUN_SETTINGS):
+        for endpoint in endpoints(targets):
+            if not selected(endpoint.name, options.only):
+                continue
+            result = {'method': endpoint.method, 'path': endpoint.path, **run_client(endpoint, options.duration)}
+            if endpoint.method == 'GET' and options.concurrency:
+                result['wsgi'] = run_wsgi(handler, endpoint, options.concurrency, options.duration)
+            results['endpoints'][endpoint.name] = result
+            print_result(endpoint.name, result)
+    return results
+
+
+def selected(name, only):
+    return not only or any(part in name for part in only)
+
+
+def print_result(name, result):
+    client, wsgi = result['client'], result.get('wsgi')
+    line = (f"{name:<38} {result['queries']:>3} q {client['p50_ms']:>8.2f} ms p50 {client['p95_ms']:>8.2f} ms p95 "
+            f"{client['throughput']:>8,.0f} req/s")
+    if wsgi:
+        line += f"  | wsgi x{wsgi['concurrency']} {wsgi['throughput']:>8,.0f} req/s {wsgi['p95_ms']:>8.2f} ms p95"
+        if wsgi['errors']:
+            line += f" {wsgi['errors']} errors"
+    print(line, flush=True)
+
+
+def change(old, new):
+    return (new - old) / old if old else 0.0
+
+
+def compare(baseline, current, latency_threshold, throughput_threshold):
+    """Print the changes from ``baseline`` to ``current``; returns the regressed endpoints' names."""
+    if baseline['meta'].get('rows') != current['meta'].get('rows'):
+        print(f"Note: the runs used different data: {baseline['meta'].get('rows')} vs {current['meta'].get('rows')}")
+    print(f"{'endpoint':<38} {'queries':>9} {'p50 ms':>21} {'wsgi req/s':>23}")
+    regressed = []
+    for name, new in current['endpoints'].items():
+        old = baseline['endpoints'].get(name)
+        if old is None:
+            print(f'{name:<38} (new)')
+            continue
+        problems = []
+        if new['queries'] > old['queries']:
+            problems.append('queries')
+        latency = change(old['client']['p50_ms'], new['client']['p50_ms'])
+        if latency > latency_threshold:
+            problems.append('latency')
+        throughput = None
+        if 'wsgi' in old and 'wsgi' in new:
+            throughput = change(old['wsgi']['throughput'], new['wsgi']['throughput'])
+            if -throughput > throughput_threshold:
+                problems.append('throughput')
+        line = (f"{name:<38} {old['queries']:>3} -> {new['queries']:<3} "
+                f"{old['client']['p50_ms']:>7.2f} -> {new['client']['p50_ms']:<7.2f} {latency:>+5.0%}")
+        if throughput is not None:
+            line += f" {old['wsgi']['throughput']:>7,.0f} -> {new['wsgi']['throughput']:<7,.0f} {throughput:>+5.0%}"
+        if problems:
+            line += f"  REGRESSED ({', '.join(problems)})"
+            regressed.append(name)
+        print(line)
+    for name in baseline['endpoints'].keys() - current['endpoints'].keys():
+        print(f'{name:<38} (gone)')
+    return regressed
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds per endpoint, per driver')
+    parser.add_argument('--concurrency', type=int, default=4, help='WSGI driver threads; 0 skips the driver')
+    parser.add_argument('--only', action='append', help='Run only endpoints whose name contains this; repeatable')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Results file to compare this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two results files without running anything')
+    parser.add_argument('--latency-threshold', type=float, default=0.25,
+                        help='Largest allowed growth of median latency, as a fraction (default 0.25)')
+    parser.add_argument('--throughput-threshold', type=float, default=0.25,
+                        help='Largest allowed fall in WSGI throughput, as a fraction (default 0.25)')
+    parser.add_argument('--database', help='SQLite file made by benchmarks.datagen; generated here if empty')
+    add_size_arguments(parser)
+    options = parser.parse_args()
+
+    if options.compare:
+        baseline, current = load(options.compare[0]), load(options.compare[1])
+    else:
+        from benchmarks._common import setup_django
+
+        os.environ.setdefault('GOOGLE_CLIENT_ID', 'benchmark')
+        os.environ.setdefault('GOOGLE_CLIENT_SECRET', 'benchmark')
+        setup_django(options.database, keepdb=bool(options.database))
+        current = run(options)
+        if options.output:
+            with open(options.output, 'w') as f:
+                json.dump(current, f, indent=2)
+        if not options.baseline:
+            return
+        baseline = load(options.baseline)
+        baseline['endpoints'] = {name: result for name, result in baseline['endpoints'].items()
+                                 if selected(name, options.only)}
+        print()
+    regressed = compare(baseline, current, options.latency_threshold, options.throughput_threshold)
+    if regressed:
+        print(f'\n{len(regressed)} endpoint(s) regressed: {", ".join(regressed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
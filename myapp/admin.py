@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Profile,CustomUser,BlogPost,Category,Doctor,Appointment
+from .models import Profile,CustomUser,BlogPost,Category,Doctor,Appointment,CalendarSyncTask
 # Register your models here.
 
 admin.site.register(CustomUser)
@@ -8,4 +8,13 @@ admin.site.register(Profile)
 admin.site.register(Doctor)
 admin.site.register(BlogPost)
 admin.site.register(Category)
-admin.site.register(Appointment)
\ No newline at end of file
+admin.site.register(Appointment)
+
+
+@admin.register(CalendarSyncTask)
+class CalendarSyncTaskAdmin(admin.ModelAdmin):
+    # The patient's OAuth access token is never shown
+    exclude = ['access_token']
+    list_display = ['appointment', 'status', 'attempts', 'next_attempt_at', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['idempotency_key', 'last_error', 'created_at', 'updated_at']
\ No newline at end of file
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import checks, signals  # noqa: F401
+
+        if settings.METRICS_ENABLED:
+            from .metrics import instrument
+
+            instrument()
@@ -0,0 +1,149 @@
+# Async versions of the listing endpoints, mounted under async/. They return
+# the same JSON as their DRF counterparts in myapp.views but run on the event
+# loop when served over ASGI. Their querysets preload everything the
+# serializers read: a lazy relation access here raises SynchronousOnlyOperation.
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .cache import category_payload, user_details
+from .facets import blogpost_facets, doctor_facets
+from .metrics import serializer_data
+from .models import Appointment, BlogPost, Doctor, Profile
+from .pagination import akeyset_page, apaginate_feed, page_limit, query_int
+from .serializers import AppointmentDetailSerializer, BlogPostSerializer, DoctorSerializer
+from .views import APPOINTMENT_ORDERING, BLOGPOST_ORDERING, DOCTOR_ORDERING, MAX_PAGE_SIZE, parse_user_ids
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+async def categories_data():
+    # category_payload() may rebuild from the database and touches the cache
+    return (await sync_to_async(category_payload)()).data
+
+
+@require_GET
+async def get_all_blogposts(request):
+    try:
+        blogposts, page_info = await apaginate_feed(request, BlogPost.objects.published().feed(), BLOGPOST_ORDERING, 4)
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response({
+        **page_info,
+        'blogposts': serializer_data(BlogPostSerializer(blogposts, many=True))
+    })
+
+
+@require_GET
+async def get_filtered_blogposts(request):
+    category_ids = request.GET.getlist('categories[]')
+    blogposts = BlogPost.objects.published()
+    if category_ids:
+        blogposts = blogposts.filter(categories__id__in=category_ids).distinct()
+    categories = await categories_data()
+    category_counts = await sync_to_async(blogpost_facets)(categories, blogposts if category_ids else None)
+    try:
+        blogposts, page_info = await apaginate_feed(request, blogposts.feed(), BLOGPOST_ORDERING, 6)
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response({
+        **page_info,
+        'blogposts': serializer_data(BlogPostSerializer(blogposts, many=True)),
+        'categories': categories,
+        'category_counts': category_counts
+    })
+
+
+@require_GET
+async def get_filtered_doctors(request):
+    location_query = request.GET.get('location', '')
+    category_ids = request.GET.getlist('categories[]')
+
+    doctors = Doctor.objects.for_listing()
+    if category_ids:
+        doctors = doctors.filter(categories__id__in=category_ids).distinct()
+    if location_query:
+        # Building the location filter can query the search index
+        profiles = await sync_to_async(Profile.objects.in_location)(location_query)
+        doctors = doctors.filter(profile__in=profiles.values('id'))
+    categories = await categories_data()
+    category_counts = await sync_to_async(doctor_facets)(
+        categories, doctors if category_ids or location_query else None
+    )
+    try:
+        doctors, page_info = await apaginate_feed(request, doctors, DOCTOR_ORDERING, 6)
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response({
+        **page_info,
+        'doctors': serializer_data(DoctorSerializer(doctors, many=True)),
+        'categories': categories,
+        'category_counts': category_counts
+    })
+
+
+@require_GET
+async def get_user_details(request):
+    # Same contract as myapp.views.UserDetailsView
+    if 'user_ids' in request.GET:
+        user_ids = parse_user_ids(request.GET['user_ids'])
+        if user_ids is None:
+            return json_response({"user_ids": "A comma-separated list of user ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(user_ids) > MAX_PAGE_SIZE:
+            return json_response({"user_ids": f"At most {MAX_PAGE_SIZE} ids."}, status=status.HTTP_400_BAD_REQUEST)
+        details = await sync_to_async(user_details)(user_ids)
+        return json_response([details[user_id] for user_id in dict.fromkeys(user_ids) if user_id in details])
+
+    user_ids = parse_user_ids(request.GET.get('user_id') or '')
+    details = await sync_to_async(user_details)(user_ids) if user_ids and len(user_ids) == 1 else {}
+    if not details:
+        return json_response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(details[user_ids[0]])
+
+
+async def appointment_list_response(request, appointments):
+    # Same contract as myapp.views.appointment_list_response
+    limit = request.GET.get('limit')
+    cursor = request.GET.get('cursor')
+    if limit is None and cursor is None:
+        appointments = [appointment async for appointment in appointments.order_by(*APPOINTMENT_ORDERING)]
+        return json_response(serializer_data(AppointmentDetailSerializer(appointments, many=True)))
+
+    limit = page_limit(request.GET, 20)
+    page, next_cursor = await akeyset_page(appointments, APPOINTMENT_ORDERING, cursor, limit)
+    return json_response({
+        'appointments': serializer_data(AppointmentDetailSerializer(page, many=True)),
+        'next_cursor': next_cursor
+    })
+
+
+async def _appointments_for(request, role):
+    user_id = request.GET.get('user_id')
+    if not user_id:
+        return json_response({"error": "User ID not provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user_id = query_int(request.GET, 'user_id', None, minimum=1)
+        appointments = Appointment.objects.with_participants().filter(**{f'{role}_id': user_id})
+        return await appointment_list_response(request, appointments)
+    except ValidationError as e:
+        return json_response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+
+@require_GET
+async def get_patient_appointments(request):
+    return await _appointments_for(request, 'patient')
+
+
+@require_GET
+async def get_doctor_appointments(request):
+    return await _appointments_for(request, 'doctor')
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Appointment, CustomUser
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def busy_interval(appointment):
+    # Appointments without an end time block one default-length slot
+    start = _minutes(appointment.start_time)
+    if appointment.end_time:
+        return start, _minutes(appointment.end_time)
+    return start, start + settings.APPOINTMENT_SLOT_MINUTES
+
+
+def requested_interval(start_time, end_time):
+    start = _minutes(start_time)
+    return start, _minutes(end_time) if end_time else start + settings.APPOINTMENT_SLOT_MINUTES
+
+
+def lock_doctors(doctor_ids):
+    """
+    Serialize bookings per doctor for the rest of the current transaction.
+
+    On PostgreSQL this row-locks the doctors (in id order, so concurrent bulk
+    bookings cannot deadlock). SQLite has no row locks; there the database
+    is opened with transaction_mode=IMMEDIATE, so a booking transaction holds
+    the write lock from its first statement and bookings run one at a time.
+    """
+    doctors = CustomUser.objects.select_for_update().filter(pk__in=doctor_ids).order_by('pk')
+    return list(doctors.values_list('pk', flat=True))
+
+
+def day_intervals(doctor_ids, dates):
+    """
+    ``{(doctor_id, date): [(start, end), ...]}`` of booked minutes, read with
+    a single range query on the (doctor, date, start_time) index.
+    """
+    booked = defaultdict(list)
+    if not dates:
+        return booked
+    appointments = (
+        Appointment.objects.filter(doctor_id__in=doctor_ids, date__range=(min(dates), max(dates)))
+        .order_by('doctor_id', 'date', 'start_time')
+        .only('doctor_id', 'date', 'start_time', 'end_time')
+    )
+    for appointment in appointments:
+        booked[(appointment.doctor_id, appointment.date)].append(busy_interval(appointment))
+    return booked
+
+
+def overlaps(intervals, start, end):
+    return any(busy_start < end and start < busy_end for busy_start, busy_end in intervals)
+
+
+def book_appointment(patient, doctor, date, start_time, end_time, **fields):
+    """
+    Create the appointment unless it overlaps one of the doctor's existing
+    appointments; raises SlotUnavailable otherwise. The check and the insert
+    run in one transaction under the doctor's booking lock.
+    """
+    start, end = requested_interval(start_time, end_time)
+    with transaction.atomic():
+        lock_doctors([doctor.pk])
+        if overlaps(day_intervals([doctor.pk], [date])[(doctor.pk, date)], start, end):
+            raise SlotUnavailable(f"Dr. {doctor.get_full_name()} is already booked at that time.")
+        return Appointment.objects.create(
+            patient=patient, doctor=doctor, date=date, start_time=start_time, end_time=end_time, **fields
+        )
+
+
+def free_slots(doctor_id, start_date, end_date):
+    """
+    Free time per day between CLINIC_OPENING_TIME and CLINIC_CLOSING_TIME,
+    as merged intervals plus the APPOINTMENT_SLOT_MINUTES slots that fit.
+    """
+    opening = _minutes(datetime.strptime(settings.CLINIC_OPENING_TIME, '%H:%M'))
+    closing = _minutes(datetime.strptime(settings.CLINIC_CLOSING_TIME, '%H:%M'))
+    slot = settings.APPOINTMENT_SLOT_MINUTES
+    booked = day_intervals([doctor_id], [start_date, end_date])
+
+    days = []
+    day = start_date
+    while day <= end_date:
+        # Sweep the day's appointments in start order, emitting the gaps
+        free = []
+        cursor = opening
+        for busy_start, busy_end in sorted(booked[(doctor_id, day)]):
+            if busy_start > cursor:
+                free.append((cursor, min(busy_start, closing)))
+            cursor = max(cursor, busy_end)
+            if cursor >= closing:
+                break
+        if cursor < closing:
+            free.append((cursor, closing))
+        free = [(start, end) for start, end in free if end > start]
+
+        days.append({
+            'date': day.isoformat(),
+            'free': [{'start': _time(start).isoformat('minutes'), 'end': _time(end).isoformat('minutes')}
+                     for start, end in free],
+            'slots': [_time(minute).isoformat('minutes')
+                      for start, end in free for minute in range(start, end - slot + 1, slot)],
+        })
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,452 @@
+"""
+Bulk import of doctors, patients, blog posts and appointments from CSV or
+JSON Lines streams; see the bulk_import command.
+
+Rows are written a batch at a time, one bulk_create per table per batch
+with the many-to-many through rows inserted directly, so memory use stays
+flat however long the stream is. Users are referred to by username and
+categories by name; categories that do not exist yet are created.
+
+bulk_create skips save() and the signal handlers, so the importers do
+their work: the normalized city/state, the feeds' display fields, the
+search indexes, the category counters and the cache generations. Image variants are left to the
+generate_image_variants command.
+"""
+import csv
+import datetime
+import json
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import reset_queries, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from .cache import bump_on_commit
+from .facets import refresh_counters
+from .models import (
+    SUMMARY_PREVIEW_WORDS, Appointment, BlogPost, Category, CustomUser, Doctor, Profile, normalize_location,
+    truncate_words,
+)
+from .search import BLOGPOST_INDEX, PROFILE_ADDRESS_INDEX
+
+DEFAULT_BATCH_SIZE = 2000
+# Separates category names in a CSV column; JSON Lines rows give a list
+CATEGORY_SEPARATOR = ';'
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, format):
+    """
+    ``(line number, row)`` for each row of a CSV stream with a header line,
+    or of a JSON Lines stream. A line that is not valid JSON comes through
+    as a RowError in place of the row.
+    """
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, RowError(f'not valid JSON ({e.msg})')
+            continue
+        if not isinstance(row, dict):
+            row = RowError('not a JSON object')
+        yield number, row
+
+
+# Field parsers: each takes the row and a column name, and raises RowError
+
+def text(row, name, required=False, max_length=None):
+    value = row.get(name)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f'{name} is required')
+    if max_length is not None and len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def integer(row, name):
+    value = text(row, name, required=True)
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f'{name} must be a whole number') from None
+
+
+def boolean(row, name):
+    value = text(row, name).lower()
+    if value in ('', '0', 'false', 'no'):
+        return False
+    if value in ('1', 'true', 'yes'):
+        return True
+    raise RowError(f'{name} must be true or false')
+
+
+def parsed(row, name, parse, kind, required=True):
+    value = text(row, name, required=required)
+    if not value:
+        return None
+    try:
+        result = parse(value)
+    except ValueError:
+        result = None
+    if result is None:
+        raise RowError(f'{name} must be {kind}')
+    return result
+
+
+def names(row, name):
+    value = row.get(name) or []
+    if isinstance(value, str):
+        value = value.split(CATEGORY_SEPARATOR)
+    if not isinstance(value, list):
+        raise RowError(f'{name} must be a list of names')
+    return list(dict.fromkeys(str(item).strip() for item in value if str(item).strip()))
+
+
+def model_max_length(model, name):
+    return model._meta.get_field(name).max_length
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    rejected: int = 0
+    # (line number, message) of the first MAX_REPORTED_ERRORS rejected rows
+    errors: list = field(default_factory=list)
+
+
+class Importer:
+    """
+    Reads rows, converts each one to unsaved model instances with
+    convert(), and writes them a batch at a time with write(). Invalid
+    rows stop the import, or with ``skip_invalid`` are counted and left
+    out; batches written before the stop stay written.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, skip_invalid=False, progress=None):
+        self.batch_size = batch_size
+        self.skip_invalid = skip_invalid
+        self.progress = progress
+        self.result = ImportResult()
+        self.categories = None
+        self.category_names = {}
+        self.counted_category_ids = set()
+
+    def run(self, rows):
+        batch = []
+        try:
+            for number, row in rows:
+                try:
+                    if isinstance(row, RowError):
+                        raise row
+                    batch.append((number, self.convert(row)))
+                except RowError as e:
+                    self.reject(number, e)
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+            if batch:
+                self.flush(batch)
+        finally:
+            # Once for the whole import, including when a bad row stops it
+            # after some batches were written
+            refresh_counters(sorted(self.counted_category_ids))
+        return self.result
+
+    def reject(self, number, error):
+        if not self.skip_invalid:
+            raise RowError(f'line {number}: {error} ({self.result.imported} rows were imported before it)')
+        self.result.rejected += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append((number, str(error)))
+
+    def flush(self, batch):
+        # References are checked for the whole batch in a query or two
+        items = []
+        for number, item in batch:
+            try:
+                self.resolve(item)
+            except RowError as e:
+                self.reject(number, e)
+            else:
+                items.append(item)
+        if items:
+            with transaction.atomic():
+                self.write(items)
+            self.result.imported += len(items)
+        # With DEBUG on, the query log would otherwise keep thousands of
+        # multi-row INSERTs, megabytes each for posts
+        reset_queries()
+        if self.progress:
+            self.progress(self.result)
+
+    def convert(self, row):
+        raise NotImplementedError
+
+    def resolve(self, item):
+        """Fill in what ``item`` refers to, after the subclass's flush() has looked up the batch's references."""
+
+    def write(self, items):
+        raise NotImplementedError
+
+    def category_ids(self, category_names):
+        """Primary keys of the named categories, creating the missing ones."""
+        if self.categories is None:
+            self.categories = dict(Category.objects.values_list('name', 'pk'))
+            self.category_names = {pk: name for name, pk in self.categories.items()}
+        missing = [name for name in dict.fromkeys(category_names) if name not in self.categories]
+        if missing:
+            max_length = model_max_length(Category, 'name')
+            too_long = [name for name in missing if len(name) > max_length]
+            if too_long:
+                raise RowError(f'category name longer than {max_length} characters: {too_long[0]}')
+            for category in Category.objects.bulk_create([Category(name=name) for name in missing]):
+                self.categories[category.name] = category.pk
+                self.category_names[category.pk] = category.name
+            bump_on_commit('category')
+        return sorted(self.categories[name] for name in category_names)
+
+
+@dataclass
+class UserItem:
+    user: CustomUser
+    profile: Profile
+    doctor: Doctor = None
+    category_names: list = field(default_factory=list)
+    category_ids: list = field(default_factory=list)
+
+
+class UserImporter(Importer):
+    """
+    Doctors (DoctorImporter) or patients (PatientImporter), each with
+    their profile: username, email, first_name, last_name, address, city,
+    state, pincode, and optionally profile_picture (a name in media
+    storage). Doctors may also give establishment_name, license_number
+    and categories.
+
+    The password comes from a password_hash column (already hashed, e.g.
+    by make_password), a password column (hashed here, at the hasher's
+    full cost per row), or else ``password_hash``: one precomputed hash
+    for every row, or by default an unusable password.
+    """
+
+    role = None
+
+    def __init__(self, password_hash=None, **kwargs):
+        super().__init__(**kwargs)
+        self.password_hash = password_hash or make_password(None)
+
+    def convert(self, row):
+        username = text(row, 'username', required=True, max_length=model_max_length(CustomUser, 'username'))
+        if row.get('password_hash'):
+            password = text(row, 'password_hash')
+            try:
+                identify_hasher(password)
+            except ValueError:
+                raise RowError('password_hash is not a hash from a known hasher') from None
+        elif row.get('password'):
+            password = make_password(str(row['password']))
+        else:
+            password = self.password_hash
+        user = CustomUser(
+            username=username, email=text(row, 'email'), password=password,
+            first_name=text(row, 'first_name', max_length=model_max_length(CustomUser, 'first_name')),
+            last_name=text(row, 'last_name', max_length=model_max_length(CustomUser, 'last_name')),
+            is_patient=self.role == 'patient', is_doctor=self.role == 'doctor',
+        )
+        city = text(row, 'city', required=True, max_length=model_max_length(Profile, 'city'))
+        state = text(row, 'state', required=True, max_length=model_max_length(Profile, 'state'))
+        profile = Profile(
+            address=text(row, 'address', required=True, max_length=model_max_length(Profile, 'address')),
+            city=city, state=state, pincode=integer(row, 'pincode'),
+            city_normalized=normalize_location(city), state_normalized=normalize_location(state),
+        )
+        if text(row, 'profile_picture'):
+            profile.profile_picture = text(row, 'profile_picture')
+        item = UserItem(user, profile)
+        if self.role == 'doctor':
+            item.doctor = Doctor(
+                establishment_name=text(row, 'establishment_name') or None,
+                license_number=text(row, 'license_number') or None,
+            )
+            item.category_names = names(row, 'categories')
+        return item
+
+    def flush(self, batch):
+        usernames = [item.user.username for _, item in batch]
+        self.existing = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+        super().flush(batch)
+
+    def resolve(self, item):
+        if item.user.username in self.existing:
+            raise RowError(f'username {item.user.username} is already taken')
+        # Also catches the same username twice in one batch
+        self.existing.add(item.user.username)
+        item.category_ids = self.category_ids(item.category_names)
+
+    def write(self, items):
+        users = CustomUser.objects.bulk_create([item.user for item in items])
+        for user, item in zip(users, items):
+            item.profile.user = user
+        profiles = Profile.objects.bulk_create([item.profile for item in items])
+        PROFILE_ADDRESS_INDEX.update_many(profiles)
+        bump_on_commit('user')
+        bump_on_commit('profile')
+        if self.role != 'doctor':
+            return
+
+        for profile, item in zip(profiles, items):
+            item.doctor.profile = profile
+        doctors = Doctor.objects.bulk_create([item.doctor for item in items])
+        Doctor.categories.through.objects.bulk_create([
+            Doctor.categories.through(doctor=doctor, category_id=category_id)
+            for doctor, item in zip(doctors, items) for category_id in item.category_ids
+        ])
+        self.counted_category_ids.update(category_id for item in items for category_id in item.category_ids)
+        bump_on_commit('doctor')
+
+
+class DoctorImporter(UserImporter):
+    role = 'doctor'
+
+
+class PatientImporter(UserImporter):
+    role = 'patient'
+
+
+@dataclass
+class PostItem:
+    post: BlogPost
+    author: str
+    category_names: list
+    created_at: datetime.datetime = None
+    category_ids: list = field(default_factory=list)
+
+
+class PostImporter(Importer):
+    """
+    Blog posts: author (a doctor's username), title, summary, content, and
+    optionally draft, categories, image (a name in media storage) and
+    created_at (ISO 8601; naive times are taken as TIME_ZONE).
+    """
+
+    def convert(self, row):
+        summary = text(row, 'summary')
+        created_at = parsed(row, 'created_at', parse_datetime, 'an ISO 8601 date and time', required=False)
+        if created_at is not None and timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at)
+        post = BlogPost(
+            title=text(row, 'title', max_length=model_max_length(BlogPost, 'title')) or None,
+            summary=summary or None, content=text(row, 'content') or None, draft=boolean(row, 'draft'),
+            truncated_summary=truncate_words(summary, SUMMARY_PREVIEW_WORDS),
+        )
+        if text(row, 'image'):
+            post.image = text(row, 'image')
+        return PostItem(post, text(row, 'author', required=True), names(row, 'categories'), created_at)
+
+    def flush(self, batch):
+        usernames = {item.author for _, item in batch}
+        authors = Doctor.objects.filter(profile__user__username__in=usernames).values_list(
+            'profile__user__username', 'pk', 'profile__user__first_name', 'profile__user__last_name',
+        )
+        # get_full_name() of each author, for the materialized display name
+        self.authors = {username: (pk, f'{first} {last}'.strip()) for username, pk, first, last in authors}
+        super().flush(batch)
+
+    def resolve(self, item):
+        if item.author not in self.authors:
+            raise RowError(f'no doctor with username {item.author}')
+        item.post.author_id, item.post.author_display_name = self.authors[item.author]
+        # In category id order, as BlogPostQuerySet.refresh_category_names has them
+        item.category_ids = self.category_ids(item.category_names)
+        item.post.category_names = [self.category_names[pk] for pk in item.category_ids]
+
+    def write(self, items):
+        posts = BlogPost.objects.bulk_create([item.post for item in items])
+        BlogPost.categories.through.objects.bulk_create([
+            BlogPost.categories.through(blogpost=post, category_id=category_id)
+            for post, item in zip(posts, items) for category_id in item.category_ids
+        ])
+        self.counted_category_ids.update(category_id for item in items for category_id in item.category_ids)
+        # created_at is auto_now_add, which bulk_create fills in regardless
+        dated = []
+        for post, item in zip(posts, items):
+            if item.created_at is not None:
+                post.created_at = item.created_at
+                dated.append(post)
+        if dated:
+            BlogPost.objects.bulk_update(dated, ['created_at'])
+        BLOGPOST_INDEX.update_many(posts)
+        bump_on_commit('blogpost')
+
+
+@dataclass
+class AppointmentItem:
+    appointment: Appointment
+    patient: str
+    doctor: str
+
+
+class AppointmentImporter(Importer):
+    """
+    Appointments: patient and doctor (usernames), date, start_time, and
+    optionally end_time, calendar_sync_status and google_event_link.
+    Unlike booking through the API, overlaps with the doctor's other
+    appointments are not checked; the source is trusted to have none.
+    """
+
+    SYNC_STATUSES = {status for status, _ in Appointment.SYNC_STATUS_CHOICES}
+
+    def convert(self, row):
+        start_time = parsed(row, 'start_time', parse_time, 'a time (HH:MM)')
+        end_time = parsed(row, 'end_time', parse_time, 'a time (HH:MM)', required=False)
+        if end_time is not None and end_time <= start_time:
+            raise RowError('end_time must be after start_time')
+        status = text(row, 'calendar_sync_status') or Appointment.SYNC_PENDING
+        if status not in self.SYNC_STATUSES:
+            raise RowError(f"calendar_sync_status must be one of {', '.join(sorted(self.SYNC_STATUSES))}")
+        appointment = Appointment(
+            date=parsed(row, 'date', parse_date, 'a date (YYYY-MM-DD)'), start_time=start_time, end_time=end_time,
+            calendar_sync_status=status, google_event_link=text(row, 'google_event_link') or None,
+        )
+        return AppointmentItem(appointment, text(row, 'patient', required=True), text(row, 'doctor', required=True))
+
+    def flush(self, batch):
+        usernames = {username for _, item in batch for username in (item.patient, item.doctor)}
+        self.users = {
+            username: (pk, is_doctor)
+            for username, pk, is_doctor in CustomUser.objects.filter(username__in=usernames)
+            .values_list('username', 'pk', 'is_doctor')
+        }
+        super().flush(batch)
+
+    def resolve(self, item):
+        if item.patient not in self.users:
+            raise RowError(f'no user with username {item.patient}')
+        if not self.users.get(item.doctor, (None, False))[1]:
+            raise RowError(f'no doctor with username {item.doctor}')
+        item.appointment.patient_id = self.users[item.patient][0]
+        item.appointment.doctor_id = self.users[item.doctor][0]
+
+    def write(self, items):
+        Appointment.objects.bulk_create([item.appointment for item in items])
+
+
+IMPORTERS = {
+    'doctors': DoctorImporter,
+    'patients': PatientImporter,
+    'posts': PostImporter,
+    'appointments': AppointmentImporter,
+}
@@ -0,0 +1,263 @@
+import functools
+import hashlib
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import serializer_data
+from .routers import primary_reads
+
+
+# Generations are counters in the shared cache, one per kind of data. Signal
+# handlers bump them on writes; readers compare them against what they have
+# cached locally, so every worker notices a change on its next request.
+
+def get_generation(name):
+    return caches['shared'].get_or_set(f'generation:{name}', 1, timeout=None)
+
+
+def bump_generation(name):
+    shared = caches['shared']
+    key = f'generation:{name}'
+    shared.add(key, 1, timeout=None)
+    try:
+        generation = shared.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        shared.set(key, 2, timeout=None)
+        generation = 2
+    # Last-Modified of responses built from this kind of data
+    shared.set(f'generation-time:{name}', time.time(), timeout=None)
+    return generation
+
+
+def get_generations(names):
+    """
+    Return ``(generations, modified)`` for ``names`` in one cache round
+    trip: their current generations, in order, and the time of the latest
+    bump among them.
+    """
+    shared = caches['shared']
+    keys = [f'generation:{name}' for name in names] + [f'generation-time:{name}' for name in names]
+    found = shared.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in found:
+            default = 1 if key.startswith('generation:') else now
+            shared.add(key, default, timeout=None)
+            found[key] = shared.get(key, default)
+    generations = tuple(found[f'generation:{name}'] for name in names)
+    return generations, max(found[f'generation-time:{name}'] for name in names)
+
+
+def bump_on_commit(name):
+    # Bumping before commit would let another worker rebuild from the old
+    # rows and cache the result under the new generation.
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+@dataclass(frozen=True)
+class RenderedPayload:
+    generation: int
+    data: list
+    body: bytes
+    etag: str
+
+
+_local_payloads = {}
+
+
+def get_rendered(name, build):
+    """
+    Return ``(payload, modified)``: the RenderedPayload for ``name`` at its
+    current generation, and the time of that generation's bump.
+
+    Both come from one shared cache round trip. Lookups go to the
+    in-process copy first, then to the shared cache, and only call
+    ``build()`` (which returns serializer data) when neither has the
+    current generation.
+    """
+    (generation,), modified = get_generations([name])
+    payload = _local_payloads.get(name)
+    if payload is not None and payload.generation == generation:
+        return payload, modified
+
+    shared = caches['shared']
+    key = f'rendered:{name}:{generation}'
+    payload = shared.get(key)
+    if payload is None:
+        # Built from the primary: a replica that lags behind the bump would
+        # get its stale rows cached under the new generation, and kept there
+        # until the next bump. The cost is that misses, which follow every
+        # write to the data, load the primary rather than a replica; each
+        # worker that misses before the first has stored the payload builds
+        # it too. Cached hits, the bulk of reads, touch neither.
+        with primary_reads():
+            data = build()
+        body = JSONRenderer().render(data)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        payload = RenderedPayload(generation, data, body, etag)
+        shared.set(key, payload, settings.RESPONSE_CACHE_TIMEOUT)
+    _local_payloads[name] = payload
+    return payload, modified
+
+
+def rendered_categories():
+    """``(payload, modified)`` of the category list; see get_rendered()."""
+    from .models import Category
+    from .serializers import CategorySerializer
+
+    return get_rendered(
+        'category',
+        lambda: list(serializer_data(CategorySerializer(Category.objects.order_by('id'), many=True))),
+    )
+
+
+def category_payload():
+    return rendered_categories()[0]
+
+
+# UserDetailsSerializer data, cached per user under user-details:<id> as
+# (category generation, data): the signal handlers delete a user's entry
+# when their user, profile or doctor rows change, and a category rename
+# bumps the generation the entries were built under.
+
+def user_details_key(user_id):
+    return f'user-details:{user_id}'
+
+
+def user_details(user_ids):
+    """
+    Return ``{user_id: data}`` for those of ``user_ids`` that exist, from
+    the shared cache where it has them and otherwise from one joined
+    query, plus one for the categories of any doctors among them.
+    """
+    from .models import CustomUser
+    from .serializers import UserDetailsSerializer
+
+    shared = caches['shared']
+    generation = get_generation('category')
+    found = shared.get_many([user_details_key(user_id) for user_id in user_ids])
+    details, missing = {}, []
+    for user_id in user_ids:
+        entry = found.get(user_details_key(user_id))
+        if entry is not None and entry[0] == generation:
+            details[user_id] = entry[1]
+        else:
+            missing.append(user_id)
+
+    if missing:
+        users = CustomUser.objects.select_related('profile__doctor_profile').prefetch_related(
+            'profile__doctor_profile__categories'
+        ).filter(pk__in=missing)
+        # From the primary, for the same reason as get_rendered()
+        with primary_reads():
+            built = {user.pk: dict(serializer_data(UserDetailsSerializer(user))) for user in users}
+        shared.set_many(
+            {user_details_key(user_id): (generation, data) for user_id, data in built.items()},
+            settings.USER_DETAILS_CACHE_TIMEOUT,
+        )
+        details.update(built)
+    return details
+
+
+def forget_user_details(*user_ids):
+    # After commit, like bump_on_commit()
+    keys = [user_details_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        transaction.on_commit(lambda: caches['shared'].delete_many(keys))
+
+
+def last_modified_date(modified):
+    """
+    The Last-Modified timestamp for data last bumped at ``modified``, or
+    None while that bump is under a second old: HTTP dates have whole
+    seconds, so a later bump could carry the same date.
+    """
+    return int(modified) if time.time() - modified >= 1 else None
+
+
+PAGE_PARAMS = ('offset', 'limit', 'cursor', 'count')
+
+
+def normalized_query(request, params):
+    """
+    The query params a cached view reads, in a canonical form: list params
+    (``categories[]``) sorted and deduplicated, ``location`` normalized the
+    way the location filter does. Anything else in the URL is ignored.
+    """
+    from .models import normalize_location
+
+    items = []
+    for name in params:
+        if name.endswith('[]'):
+            values = sorted(set(request.GET.getlist(name)))
+            if values:
+                items.append((name, ','.join(values)))
+        elif name == 'location':
+            value = normalize_location(request.GET.get(name))
+            if value:
+                items.append((name, value))
+        elif name in request.GET:
+            items.append((name, request.GET[name]))
+    return urlencode(items)
+
+
+def cached_response(*generations, params=PAGE_PARAMS):
+    """
+    Cache the JSON responses of a public GET view in the shared cache,
+    keyed on ``generations`` (bumped by the signal handlers whenever that
+    kind of data changes) and the normalized ``params``.
+
+    The ETag and Last-Modified headers follow from the generations alone,
+    so a conditional request for an unchanged response gets a 304 without
+    the ORM or the cached body being touched. Requests for the browsable
+    API (text/html, ?format=) skip the cache.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or 'format' in request.GET
+                    or 'text/html' in request.headers.get('Accept', '')):
+                return view(request, *args, **kwargs)
+
+            versions, modified = get_generations(generations)
+            digest = hashlib.md5(
+                f'{view.__module__}.{view.__name__}|{versions}|{normalized_query(request, params)}'.encode()
+            ).hexdigest()
+            etag = f'"{digest}"'
+            last_modified = last_modified_date(modified)
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                shared = caches['shared']
+                key = f'response:{digest}'
+                body = shared.get(key)
+                if body is not None:
+                    response = HttpResponse(body, content_type='application/json')
+                else:
+                    # From the primary, for the same reason as get_rendered()
+                    with primary_reads():
+                        response = view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    response.render()
+                    shared.set(key, response.content, settings.RESPONSE_CACHE_TIMEOUT)
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Clients may keep the response but must revalidate it each time
+            response['Cache-Control'] = 'no-cache'
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
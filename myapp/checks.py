@@ -0,0 +1,21 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    # Each worker would keep its own generations, so a write handled by one
+    # worker would never invalidate what the others have cached
+    backend = settings.CACHES['shared']['BACKEND']
+    if not backend.endswith('.LocMemCache'):
+        return []
+    workers = os.environ.get('WEB_CONCURRENCY', '1')
+    if not workers.isdigit() or int(workers) > 1:
+        return [Error(
+            f'The shared cache is per-process but WEB_CONCURRENCY is {workers}.',
+            hint='Set SHARED_CACHE_URL to a redis://, db:// or file:// URL, or leave it unset.',
+            id='myapp.E002',
+        )]
+    return []
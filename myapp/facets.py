@@ -0,0 +1,47 @@
+"""
+Facet counts for the filter sidebars of the doctor and blog post lists:
+how many of the current results each category has.
+
+Filtered results are counted with one grouped query over the categories
+through table (DoctorQuerySet/BlogPostQuerySet.category_counts). The
+unfiltered counts are a read of CategoryCounts, which the signal handlers
+keep up to date, unless FACET_COUNTERS is off.
+"""
+from django.conf import settings
+
+from .models import BlogPost, CategoryCounts, Doctor
+
+
+def _counted(categories, counts):
+    # Every category of the sidebar, in its order, with zeros filled in
+    return {category['id']: counts.get(category['id'], 0) for category in categories}
+
+
+def doctor_facets(categories, doctors=None):
+    """
+    ``{category id: doctors}`` for each of ``categories`` (the category
+    list's data), among ``doctors``, or among all doctors when None.
+    """
+    if doctors is None:
+        if settings.FACET_COUNTERS:
+            return _counted(categories, dict(CategoryCounts.objects.values_list('category_id', 'doctors')))
+        doctors = Doctor.objects.all()
+    return _counted(categories, doctors.category_counts())
+
+
+def blogpost_facets(categories, blogposts=None):
+    """Like doctor_facets(), for published ``blogposts``."""
+    if blogposts is None:
+        if settings.FACET_COUNTERS:
+            return _counted(categories, dict(CategoryCounts.objects.values_list('category_id', 'published_posts')))
+        blogposts = BlogPost.objects.published()
+    return _counted(categories, blogposts.category_counts())
+
+
+def refresh_counters(category_ids):
+    """
+    Recount CategoryCounts for ``category_ids`` (every category when None)
+    after a write, while FACET_COUNTERS is on.
+    """
+    if settings.FACET_COUNTERS and (category_ids is None or category_ids):
+        CategoryCounts.objects.refresh(category_ids)
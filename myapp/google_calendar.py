@@ -0,0 +1,306 @@
+import itertools
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httplib2
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+
+from .google_clients import calendar_service
+from .models import Appointment, CalendarSyncTask
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_TIME_ZONE = 'Asia/Kolkata'
+# Google accepts at most 50 calls in one Calendar batch request
+CALENDAR_BATCH_LIMIT = 50
+
+
+def build_event(appointment, event_id=None):
+    doctor = appointment.doctor
+    patient = appointment.patient
+    start = datetime.combine(appointment.date, appointment.start_time)
+    if appointment.end_time:
+        end = datetime.combine(appointment.date, appointment.end_time)
+    else:
+        # Booked without an end time: the slot the availability engine holds
+        end = start + timedelta(minutes=settings.APPOINTMENT_SLOT_MINUTES)
+    event = {
+        'summary': f"Appointment with Dr. {doctor.get_full_name()}",
+        'location': doctor.profile.doctor_profile.establishment_name,
+        'description': f"Patient: {patient.get_full_name()}",
+        'start': {
+            'dateTime': start.isoformat(),
+            'timeZone': CALENDAR_TIME_ZONE,
+        },
+        'end': {
+            'dateTime': end.isoformat(),
+            'timeZone': CALENDAR_TIME_ZONE,
+        },
+        'attendees': [
+            {'email': patient.email},
+            {'email': doctor.email},
+        ],
+    }
+    if event_id:
+        # Google rejects a second insert with the same id, which makes
+        # retries after a lost response safe.
+        event['id'] = event_id
+    return event
+
+
+def get_calendar_service(access_token):
+    if settings.CALENDAR_BACKEND == 'fake':
+        return FakeCalendarService.shared()
+    return calendar_service(access_token)
+
+
+# Outbox processing
+
+def enqueue_calendar_sync(appointment, access_token):
+    return CalendarSyncTask.objects.create(
+        appointment=appointment,
+        access_token=access_token,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def enqueue_calendar_syncs(appointments, access_token):
+    """
+    Bulk variant for callers that push the events themselves right away.
+    The tasks start out leased so the worker only picks up the ones that
+    the caller's attempt leaves pending.
+    """
+    lease_until = timezone.now() + timedelta(seconds=settings.CALENDAR_SYNC_LEASE_SECONDS)
+    return CalendarSyncTask.objects.bulk_create(
+        CalendarSyncTask(appointment=appointment, access_token=access_token, next_attempt_at=lease_until)
+        for appointment in appointments
+    )
+
+
+def claim_tasks(limit):
+    """
+    Lease up to ``limit`` due tasks to this worker.
+
+    Leasing pushes next_attempt_at forward, so a worker that dies mid-task
+    only delays the task; another worker picks it up once the lease ends.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            CalendarSyncTask.objects.select_for_update(skip_locked=True)
+            .filter(status=CalendarSyncTask.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        lease_until = now + timedelta(seconds=settings.CALENDAR_SYNC_LEASE_SECONDS)
+        CalendarSyncTask.objects.filter(pk__in=[task.pk for task in tasks]).update(next_attempt_at=lease_until)
+    return tasks
+
+
+def sync_tasks(tasks):
+    """
+    Create the Google Calendar events for ``tasks`` and record each outcome.
+
+    Inserts go through the Calendar batch endpoint, CALENDAR_BATCH_LIMIT
+    per HTTP request, grouped by access token. Returns the resulting
+    ``{task.pk: appointment.calendar_sync_status}``.
+    """
+    appointments = Appointment.objects.with_participants().in_bulk([task.appointment_id for task in tasks])
+    tasks_by_token = defaultdict(list)
+    for task in tasks:
+        tasks_by_token[task.access_token].append(task)
+
+    results = {}
+    for access_token, token_tasks in tasks_by_token.items():
+        service = get_calendar_service(access_token)
+        for start in range(0, len(token_tasks), CALENDAR_BATCH_LIMIT):
+            chunk = token_tasks[start:start + CALENDAR_BATCH_LIMIT]
+            outcomes = _insert_batch(service, chunk, appointments)
+            synced = []
+            for task in chunk:
+                appointment = appointments[task.appointment_id]
+                event, error = outcomes[task.pk]
+                if error is None:
+                    synced.append((task, appointment, event.get('htmlLink')))
+                else:
+                    record_failure(task, appointment, error)
+            record_successes(synced)
+            for task in chunk:
+                results[task.pk] = appointments[task.appointment_id].calendar_sync_status
+    return results
+
+
+def _insert_batch(service, tasks, appointments):
+    outcomes = {}
+
+    def collect(request_id, response, exception):
+        outcomes[int(request_id)] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=collect)
+    for task in tasks:
+        body = build_event(appointments[task.appointment_id], task.idempotency_key)
+        batch.add(service.events().insert(calendarId='primary', body=body), request_id=str(task.pk))
+    try:
+        batch.execute()
+    except Exception as error:
+        # The batch request itself failed; every item without an answer
+        # gets the error and is retried later
+        for task in tasks:
+            outcomes.setdefault(task.pk, (None, error))
+
+    for task in tasks:
+        event, error = outcomes.setdefault(task.pk, (None, RuntimeError('No response in batch')))
+        if isinstance(error, HttpError) and error.resp.status == 409:
+            # Created by an earlier attempt whose response never arrived
+            try:
+                event = service.events().get(calendarId='primary', eventId=task.idempotency_key).execute()
+                outcomes[task.pk] = (event, None)
+            except Exception as get_error:
+                outcomes[task.pk] = (None, get_error)
+    return outcomes
+
+
+def record_successes(synced):
+    """
+    Store the event links for ``(task, appointment, event_link)`` triples.
+    The tasks' access tokens are no longer needed and are cleared.
+    """
+    for task, appointment, event_link in synced:
+        appointment.google_event_link = event_link
+        appointment.calendar_sync_status = Appointment.SYNC_SYNCED
+        task.status = CalendarSyncTask.DONE
+        task.access_token = ''
+        task.attempts += 1
+        task.last_error = ''
+        task.updated_at = timezone.now()
+    with transaction.atomic():
+        Appointment.objects.bulk_update(
+            [appointment for _, appointment, _ in synced], ['google_event_link', 'calendar_sync_status']
+        )
+        CalendarSyncTask.objects.bulk_update(
+            [task for task, _, _ in synced], ['status', 'access_token', 'attempts', 'last_error', 'updated_at']
+        )
+
+
+def record_failure(task, appointment, error):
+    task.attempts += 1
+    task.last_error = str(error)[:1000]
+    # 4xx other than rate limiting will not get better by retrying
+    status_code = getattr(getattr(error, 'resp', None), 'status', None)
+    permanent = status_code is not None and 400 <= status_code < 500 and status_code != 429
+    if permanent or task.attempts >= settings.CALENDAR_SYNC_MAX_ATTEMPTS:
+        # Not retried again, so the token is not kept either
+        task.status = CalendarSyncTask.FAILED
+        task.access_token = ''
+    else:
+        task.next_attempt_at = timezone.now() + backoff(task.attempts)
+    logger.warning('Calendar sync for appointment %s failed (attempt %s): %s',
+                   appointment.pk, task.attempts, task.last_error)
+    with transaction.atomic():
+        task.save(update_fields=['status', 'access_token', 'attempts', 'last_error', 'next_attempt_at', 'updated_at'])
+        if task.status == CalendarSyncTask.FAILED:
+            appointment.calendar_sync_status = Appointment.SYNC_FAILED
+            appointment.save(update_fields=['calendar_sync_status'])
+
+
+def backoff(attempts):
+    # Exponential with full jitter, capped
+    ceiling = min(settings.CALENDAR_SYNC_BACKOFF_BASE * 2 ** (attempts - 1), settings.CALENDAR_SYNC_BACKOFF_MAX)
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+# Offline stand-in for the Calendar API
+
+class FakeCalendarService:
+    """
+    In-memory stand-in for the subset of the Calendar v3 client used here,
+    including batch requests. Select it with CALENDAR_BACKEND=fake.
+    ``fail_next`` queues HTTP status codes to raise from the next inserts,
+    and ``batch_sizes`` records the size of every executed batch.
+    """
+
+    _shared = None
+
+    def __init__(self):
+        self.events_by_id = {}
+        self.fail_next = []
+        self.batch_sizes = []
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def events(self):
+        return _FakeEvents(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        if len(self.requests) >= CALENDAR_BATCH_LIMIT:
+            raise ValueError('Exceeded the maximum calls in a single batch request.')
+        request_id = request_id or str(len(self.requests) + 1)
+        self.requests.append((request_id, request, callback or self.callback))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as error:
+                response, exception = None, error
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class _FakeEvents:
+    def __init__(self, service):
+        self.service = service
+
+    def insert(self, calendarId, body):
+        return _FakeRequest(lambda: self._insert(body))
+
+    def get(self, calendarId, eventId):
+        return _FakeRequest(lambda: self._get(eventId))
+
+    def _insert(self, body):
+        service = self.service
+        if service.fail_next:
+            raise _http_error(service.fail_next.pop(0))
+        event_id = body.get('id') or f'fake{next(service._ids)}'
+        if event_id in service.events_by_id:
+            raise _http_error(409)
+        event = {**body, 'id': event_id, 'htmlLink': f'https://calendar.google.com/event?eid={event_id}'}
+        service.events_by_id[event_id] = event
+        return event
+
+    def _get(self, event_id):
+        if event_id not in self.service.events_by_id:
+            raise _http_error(404)
+        return self.service.events_by_id[event_id]
+
+
+class _FakeRequest:
+    def __init__(self, call):
+        self.call = call
+
+    def execute(self):
+        return self.call()
+
+
+def _http_error(status_code):
+    return HttpError(httplib2.Response({'status': status_code}), b'')
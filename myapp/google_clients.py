@@ -0,0 +1,97 @@
+import functools
+import hashlib
+import json
+import os
+import secrets
+import threading
+from base64 import urlsafe_b64encode
+from urllib.parse import quote, urlencode
+
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from oauthlib.common import generate_token
+
+GOOGLE_SCOPES = ['https://www.googleapis.com/auth/calendar']
+GOOGLE_REDIRECT_URI = 'https://doc-patient-fe.vercel.app/auth/google/callback'
+HTTP_TIMEOUT = 15
+
+_local = threading.local()
+
+
+@functools.lru_cache(maxsize=None)
+def oauth_client_config():
+    # Read from the environment once per process
+    return {
+        "web": {
+            "client_id": os.environ["GOOGLE_CLIENT_ID"],
+            "client_secret": os.environ["GOOGLE_CLIENT_SECRET"],
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+            "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+            "redirect_uris": [GOOGLE_REDIRECT_URI]
+        }
+    }
+
+
+def oauth_flow():
+    # A Flow carries per-login state, so each request still gets its own
+    return Flow.from_client_config(oauth_client_config(), scopes=GOOGLE_SCOPES, redirect_uri=GOOGLE_REDIRECT_URI)
+
+
+def authorization_url(**params):
+    """
+    Return ``(url, state)`` for Google's consent screen, the same as
+    oauth_flow().authorization_url(**params) but without building a Flow
+    and its requests session on every login.
+    """
+    config = oauth_client_config()['web']
+    state = generate_token()
+    # PKCE, as Flow adds by default
+    code_verifier = secrets.token_urlsafe(96)
+    code_challenge = urlsafe_b64encode(hashlib.sha256(code_verifier.encode()).digest()).decode().rstrip('=')
+    query = {
+        'response_type': 'code',
+        'client_id': config['client_id'],
+        'redirect_uri': GOOGLE_REDIRECT_URI,
+        'scope': ' '.join(GOOGLE_SCOPES),
+        'state': state,
+        'code_challenge': code_challenge,
+        'code_challenge_method': 'S256',
+        'access_type': 'offline',
+        **params,
+    }
+    return f"{config['auth_uri']}?{urlencode(query, quote_via=quote)}", state
+
+
+@functools.lru_cache(maxsize=None)
+def discovery_document(service_name, version):
+    # The discovery documents bundled with google-api-python-client, parsed
+    # once; build() would re-read and re-parse the JSON on every call.
+    # build_from_document only fills in default parameters on the dict it
+    # is given, idempotently, so the parsed document can be shared.
+    document = get_static_doc(service_name, version)
+    if document is None:
+        raise LookupError(f'No bundled discovery document for {service_name} {version}')
+    return json.loads(document)
+
+
+def shared_http():
+    # httplib2.Http keeps connections alive per host but is not thread-safe,
+    # so there is one per thread, reused across requests.
+    http = getattr(_local, 'http', None)
+    if http is None:
+        http = _local.http = httplib2.Http(timeout=HTTP_TIMEOUT)
+    return http
+
+
+def calendar_service(access_token):
+    """A Calendar v3 client for one user's access token."""
+    credentials = Credentials(token=access_token)
+    return build_from_document(
+        discovery_document('calendar', 'v3'),
+        http=AuthorizedHttp(credentials, http=shared_http()),
+    )
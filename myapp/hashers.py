@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Password hashers whose cost comes from settings (see PASSWORD_HASHER in
+# settings.py). They keep Django's algorithm names, so hashes made with
+# other parameters still verify; Django rehashes them with the current
+# parameters on the user's next successful login.
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * r * N bytes and OpenSSL refuses more than 32 MB
+        # unless told otherwise. Leave room for verifying hashes made with a
+        # larger work factor than the current one.
+        return max(2 * 128 * self.block_size * self.work_factor, 256 * 1024 * 1024)
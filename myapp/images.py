@@ -0,0 +1,136 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Resized copies of uploaded images. Variants are stored under the SHA-256
+# of the source bytes, so identical uploads share one set of files and a
+# variant's URL never changes meaning. The record of a source's variants
+# is kept on the row (BlogPost.image_variants, Profile.profile_picture_variants):
+#
+#     {'source': 'blog_images/a.jpg', 'width': 1850,
+#      'webp': {'320': 'derivatives/ab/ab12.../320.webp', ...}, 'jpeg': {...}}
+#
+# This module does no model imports, so process pool workers can run
+# generate_variants() without setting up the app registry.
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(digest, width, extension):
+    return f'derivatives/{digest[:2]}/{digest}/{width}.{extension}'
+
+
+def target_widths(source_width, widths):
+    # Never upscale; an image narrower than every width gets one variant at
+    # its own width, so the client still gets a WebP and a small JPEG
+    fitting = [width for width in sorted(widths) if width < source_width]
+    return fitting or [source_width]
+
+
+def _flatten(image, mode):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        if mode == 'RGBA':
+            return rgba
+        background = Image.new('RGB', rgba.size, 'white')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(name, widths):
+    """
+    Write the variants of stored file ``name`` that do not exist yet and
+    return its variant record.
+    """
+    with default_storage.open(name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale when the largest variant
+            # is much smaller than the original
+            image.draft('RGB', (max(widths), image.height * max(widths) // image.width))
+        image = ImageOps.exif_transpose(image)
+        source_width, source_height = image.size
+        record = {'source': name, 'width': source_width}
+        for extension, (pillow_format, options) in VARIANT_FORMATS.items():
+            base = _flatten(image, 'RGBA' if pillow_format == 'WEBP' else 'RGB')
+            record[extension] = {}
+            for width in target_widths(source_width, widths):
+                path = variant_name(digest, width, extension)
+                if not default_storage.exists(path):
+                    height = max(1, round(source_height * width / source_width))
+                    resized = base.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                    buffer = io.BytesIO()
+                    resized.save(buffer, pillow_format, **options)
+                    # Storage may store it under another name; the record
+                    # keeps whichever it used
+                    path = default_storage.save(path, ContentFile(buffer.getvalue()))
+                record[extension][str(width)] = path
+    return record
+
+
+def srcset(record):
+    """``{'webp': 'url 320w, url 640w', 'jpeg': ...}`` for a variant record, or None."""
+    if not record:
+        return None
+    return {
+        extension: ', '.join(
+            f'{default_storage.url(path)} {width}w'
+            for width, path in sorted(record[extension].items(), key=lambda item: int(item[0]))
+        )
+        for extension in VARIANT_FORMATS if extension in record
+    }
+
+
+_executor = None
+
+
+def _background():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_VARIANT_THREADS, thread_name_prefix='image-variants')
+    return _executor
+
+
+def process_upload(model, pk, field, name, widths):
+    """
+    Generate the variants for ``name`` and store the record on the row,
+    unless its image has changed in the meantime. Runs after the upload's
+    transaction commits: in a background thread, or inline when
+    IMAGE_VARIANTS_IN_BACKGROUND is off. Rows that fail keep an empty
+    record; the generate_image_variants command picks them up.
+    """
+    def run():
+        from django.db import connection
+
+        from .cache import bump_on_commit
+
+        try:
+            record = generate_variants(name, widths)
+            if model.objects.filter(pk=pk, **{field: name}).update(**{f'{field}_variants': record}):
+                # The srcsets in the cached feeds change with the record
+                bump_on_commit(model._meta.model_name)
+        except Exception:
+            logger.exception('Could not generate variants of %s', name)
+        finally:
+            if settings.IMAGE_VARIANTS_IN_BACKGROUND:
+                connection.close()
+
+    if settings.IMAGE_VARIANTS_IN_BACKGROUND:
+        _background().submit(run)
+    else:
+        run()
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from myapp.cache import bump_generation
+from myapp.models import SUMMARY_PREVIEW_WORDS, BlogPost, Category, truncate_words
+
+
+class Command(BaseCommand):
+    help = 'Fill the materialized display fields (truncated summary, author name, category names) on BlogPost.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = (
+            BlogPost.objects.order_by('pk')
+            .only('pk', 'summary', 'author__profile__user__first_name', 'author__profile__user__last_name')
+            .select_related('author__profile__user')
+            .prefetch_related(Prefetch('categories', queryset=Category.objects.order_by('id')))
+        )
+        updated = 0
+        batch = []
+        for post in posts.iterator(chunk_size=batch_size):
+            post.truncated_summary = truncate_words(post.summary, SUMMARY_PREVIEW_WORDS)
+            post.author_display_name = post.author.profile.user.get_full_name()
+            post.category_names = [category.name for category in post.categories.all()]
+            batch.append(post)
+            if len(batch) == batch_size:
+                updated += self.write(batch)
+                batch = []
+        if batch:
+            updated += self.write(batch)
+        if updated:
+            # bulk_update sends no signals; drop the cached feeds
+            bump_generation('blogpost')
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} blog posts'))
+
+    def write(self, batch):
+        with transaction.atomic():
+            BlogPost.objects.bulk_update(batch, ['truncated_summary', 'author_display_name', 'category_names'])
+        return len(batch)
@@ -0,0 +1,101 @@
+import gzip
+import io
+import sys
+import time
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.bulk_import import DEFAULT_BATCH_SIZE, IMPORTERS, RowError, UserImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import doctors, patients, blog posts or appointments from a CSV or JSON Lines file, '
+        'in batches of bulk inserts. See myapp.bulk_import for the columns of each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(IMPORTERS))
+        parser.add_argument('path', help='File to read, optionally gzipped, or - for standard input.')
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='Defaults to the file extension (.csv, .jsonl or .ndjson, before any .gz).',
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='Leave out invalid rows and report them, instead of stopping at the first one.',
+        )
+        password = parser.add_mutually_exclusive_group()
+        password.add_argument(
+            '--password-hash',
+            help='Hash (from make_password) given to users without a password or password_hash column.',
+        )
+        password.add_argument(
+            '--password',
+            help='Like --password-hash, hashed once here; meant for test data.',
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        format = options['format'] or self.format_of(path)
+        importer_class = IMPORTERS[kind]
+        kwargs = {
+            'batch_size': options['batch_size'],
+            'skip_invalid': options['skip_invalid'],
+            'progress': self.progress if options['verbosity'] > 1 else None,
+        }
+        if issubclass(importer_class, UserImporter):
+            kwargs['password_hash'] = self.password_hash(options)
+        elif options['password_hash'] or options['password']:
+            raise CommandError(f'{kind} have no passwords')
+
+        start = time.perf_counter()
+        with self.open(path) as stream:
+            try:
+                result = importer_class(**kwargs).run(read_rows(stream, format))
+            except RowError as e:
+                raise CommandError(str(e)) from None
+        elapsed = time.perf_counter() - start
+
+        for number, message in sorted(result.errors):
+            self.stderr.write(f'line {number}: {message}')
+        if result.rejected > len(result.errors):
+            self.stderr.write(f'...and {result.rejected - len(result.errors)} more')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} {kind} in {elapsed:.1f}s '
+            f'({result.imported / max(elapsed, 1e-9):,.0f}/s), rejected {result.rejected}'
+        ))
+
+    def format_of(self, path):
+        name = path.removesuffix('.gz')
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        raise CommandError('Pass --format; it cannot be told from the file name.')
+
+    def open(self, path):
+        # newline='' lets the csv module handle line endings inside quoted values
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        try:
+            if path.endswith('.gz'):
+                return gzip.open(path, 'rt', encoding='utf-8', newline='')
+            return open(path, encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f'Cannot read {path}: {e}') from None
+
+    def password_hash(self, options):
+        if options['password']:
+            return make_password(options['password'])
+        if options['password_hash']:
+            try:
+                identify_hasher(options['password_hash'])
+            except ValueError:
+                raise CommandError('--password-hash is not a hash from a known hasher') from None
+        return options['password_hash']
+
+    def progress(self, result):
+        self.stdout.write(f'{result.imported} imported, {result.rejected} rejected')
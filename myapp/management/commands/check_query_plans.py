@@ -0,0 +1,91 @@
+import datetime
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from myapp.models import Appointment, BlogPost, CalendarSyncTask, Profile
+from myapp.pagination import _keyset_filter
+from myapp.views import APPOINTMENT_ORDERING, BLOGPOST_ORDERING
+
+# How each backend reports a table read without an index, and a sort the
+# query's ORDER BY could not take from an index.
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING| VIRTUAL TABLE)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+SORT = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'\bSort\b'),
+}
+
+
+def plans():
+    """
+    ``(name, queryset, tables, ordered)`` for the queries behind the hot
+    endpoints. ``tables`` must be read through an index; ``ordered`` queries
+    must also get their order from one.
+    """
+    now = timezone.now()
+    day = datetime.date(2024, 1, 1)
+    feed = BlogPost.objects.published().feed().order_by(*BLOGPOST_ORDERING)
+    return [
+        ('blog feed', feed[:6], ['myapp_blogpost'], True),
+        ('blog feed, next page', feed.filter(_keyset_filter(BLOGPOST_ORDERING, [now, 1]))[:6],
+         ['myapp_blogpost'], True),
+        ('blog feed by category', BlogPost.objects.published().filter(categories__id__in=[1]).distinct(),
+         ['myapp_blogpost', 'myapp_blogpost_categories'], False),
+        ("doctor's posts", BlogPost.objects.feed().filter(author_id=1), ['myapp_blogpost'], False),
+        ('doctors by location', Profile.objects.in_location('pune'), ['myapp_profile'], False),
+        ('doctors by pincode', Profile.objects.in_location('411001'), ['myapp_profile'], False),
+        ('patient appointments',
+         Appointment.objects.with_participants().filter(patient_id=1).order_by(*APPOINTMENT_ORDERING)[:20],
+         ['myapp_appointment'], True),
+        ('doctor appointments',
+         Appointment.objects.with_participants().filter(doctor_id=1).order_by(*APPOINTMENT_ORDERING)[:20],
+         ['myapp_appointment'], True),
+        ("doctor's day (availability)",
+         Appointment.objects.filter(doctor_id__in=[1], date__range=(day, day)).order_by('doctor_id', 'date', 'start_time'),
+         ['myapp_appointment'], True),
+        ('due calendar syncs',
+         CalendarSyncTask.objects.filter(status=CalendarSyncTask.PENDING, next_attempt_at__lte=now).order_by('next_attempt_at')[:50],
+         ['myapp_calendarsynctask'], True),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries behind the hot endpoints and fail if any of them falls back to a full table scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just failing ones.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCAN:
+            raise CommandError(f'Query plan checks are not implemented for {vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Small tables are cheaper to scan, which says nothing about
+                # production; only fall back to a scan when no index applies
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset, tables, ordered in plans():
+                plan = queryset.explain()
+                problems = [
+                    f'full scan of {table}' for table in FULL_SCAN[vendor].findall(plan) if table in tables
+                ]
+                if ordered and SORT[vendor].search(plan):
+                    problems.append('sort not served by an index')
+                if problems:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f"FAIL {name}: {', '.join(problems)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+                if problems or options['verbose_plans']:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} query plan(s) regressed: {', '.join(failures)}")
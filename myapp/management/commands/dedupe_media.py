@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.cache import bump_on_commit
+from myapp.models import BlogPost, Profile
+from myapp.storage import file_digest
+
+MEDIA_FIELDS = [(BlogPost, 'image'), (Profile, 'profile_picture')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Point rows that use byte-identical media files at a single copy. '
+        'Files uploaded before ContentAddressedStorage each got their own name.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Also delete the duplicate files once no row refers to them.',
+        )
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field in MEDIA_FIELDS:
+            names.update(model.objects.exclude(**{field: ''}).values_list(field, flat=True).distinct())
+
+        by_digest = defaultdict(list)
+        for name in sorted(filter(None, names)):
+            if not default_storage.exists(name):
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            with default_storage.open(name, 'rb') as content:
+                by_digest[file_digest(content)].append(name)
+
+        merged = deleted = 0
+        for digest, group in by_digest.items():
+            if len(group) < 2:
+                continue
+            canonical, *duplicates = group
+            with transaction.atomic():
+                for model, field in MEDIA_FIELDS:
+                    # The variant records are rebuilt for the new name by
+                    # generate_image_variants; the variant files are shared
+                    repointed = model.objects.filter(**{f'{field}__in': duplicates}).update(
+                        **{field: canonical, f'{field}_variants': {}}
+                    )
+                    if repointed:
+                        bump_on_commit(model._meta.model_name)
+                    merged += repointed
+            if options['delete']:
+                for name in duplicates:
+                    default_storage.delete(name)
+                    deleted += 1
+            self.stdout.write(f"{canonical} <- {', '.join(duplicates)}")
+
+        self.stdout.write(self.style.SUCCESS(f'Repointed {merged} rows, deleted {deleted} duplicate files'))
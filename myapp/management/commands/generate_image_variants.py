@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from myapp.cache import bump_generation
+from myapp.images import generate_variants
+from myapp.models import BlogPost, Profile
+
+IMAGE_FIELDS = [(BlogPost, 'image'), (Profile, 'profile_picture')]
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG variants of blog images and profile pictures, in parallel processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Redo every image, not just those without an up-to-date variant record.',
+        )
+
+    def handle(self, *args, **options):
+        # Each distinct file is processed once, however many rows use it
+        jobs = {}
+        for model, field in IMAGE_FIELDS:
+            rows = (
+                model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .values_list(field, f'{field}_variants')
+            )
+            for name, record in rows.iterator():
+                if options['all'] or record.get('source') != name:
+                    jobs[(model, field, name)] = model.VARIANT_WIDTHS
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('All images are up to date'))
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        start = time.perf_counter()
+        done = failed = 0
+        updated_models = set()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(generate_variants, name, widths): (model, field, name)
+                for (model, field, name), widths in jobs.items()
+            }
+            for future in as_completed(futures):
+                model, field, name = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{name}: {e}')
+                    continue
+                model.objects.filter(**{field: name}).update(**{f'{field}_variants': record})
+                updated_models.add(model)
+                done += 1
+        # The srcsets in the cached feeds change with the records
+        for model in updated_models:
+            bump_generation(model._meta.model_name)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {done} images in {elapsed:.1f}s ({failed} failed)'
+        ))
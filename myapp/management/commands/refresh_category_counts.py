@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.models import CategoryCounts
+
+
+class Command(BaseCommand):
+    help = 'Recount the doctors and published blog posts of every category, for the facet counts.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        with transaction.atomic():
+            CategoryCounts.objects.refresh()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Recounted {CategoryCounts.objects.count()} categories in {elapsed:.1f}s'))
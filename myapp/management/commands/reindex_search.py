@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from myapp.search import REBUILD_BATCH_SIZE, SEARCH_INDEXES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes, streaming rows in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes', nargs='*',
+            help=f"Indexes to rebuild ({', '.join(SEARCH_INDEXES)}). Defaults to all of them.",
+        )
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        names = options['indexes'] or list(SEARCH_INDEXES)
+        unknown = [name for name in names if name not in SEARCH_INDEXES]
+        if unknown:
+            raise CommandError(f"Unknown index: {', '.join(unknown)}")
+
+        for name in names:
+            start = time.perf_counter()
+            with transaction.atomic():
+                indexed = SEARCH_INDEXES[name].rebuild(batch_size=options['batch_size'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'{name}: indexed {indexed} rows in {elapsed:.1f}s'))
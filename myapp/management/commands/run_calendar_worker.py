@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp.google_calendar import claim_tasks, sync_tasks
+from myapp.models import Appointment
+
+
+class Command(BaseCommand):
+    help = 'Create Google Calendar events for booked appointments from the CalendarSyncTask outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when there is nothing due.')
+        parser.add_argument('--once', action='store_true', help='Drain the due tasks once and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = claim_tasks(options['batch_size'])
+            statuses = sync_tasks(tasks).values()
+            synced = sum(status == Appointment.SYNC_SYNCED for status in statuses)
+            if tasks:
+                self.stdout.write(f'Synced {synced}/{len(tasks)} appointments')
+            if options['once'] and not tasks:
+                return
+            if not tasks:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,321 @@
+"""
+Per-route request metrics, served in the Prometheus text format at /metrics:
+
+- http_request_duration_seconds: time spent under MetricsMiddleware
+- http_request_queries / http_request_query_seconds: SQL statements run
+  for the request and the time spent executing them, recorded by a
+  database execute wrapper
+- http_request_serializer_seconds: time in DRF serializers' ``.data``,
+  including the queries it sets off (where N+1 patterns show up), for the
+  views that read it through serializer_data()
+- http_response_size_bytes, and http_requests_total by status
+
+Each worker keeps its own histograms and publishes them to the shared cache
+every METRICS_PUBLISH_SECONDS; /metrics adds up the live workers, so one
+scrape covers them all when SHARED_CACHE_URL points at Redis. /metrics
+needs METRICS_TOKEN as a bearer token, and is only open without one under
+DEBUG.
+
+A METRICS_TRACE_SAMPLE_RATE share of requests also keep the SQL they run;
+those slower than METRICS_SLOW_REQUEST_SECONDS are logged with it.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time spent handling the request.', DURATION_BUCKETS),
+    'http_request_queries': ('SQL statements executed for the request.', QUERY_COUNT_BUCKETS),
+    'http_request_query_seconds': ('Time spent executing SQL for the request.', DURATION_BUCKETS),
+    'http_request_serializer_seconds': (
+        'Time spent in serializer .data for the request, including the queries it runs.', DURATION_BUCKETS,
+    ),
+    'http_response_size_bytes': ('Size of the response body; streamed bodies count their Content-Length.', SIZE_BUCKETS),
+}
+MAX_TRACE_STATEMENTS = 200
+HOSTNAME = socket.gethostname()
+WORKERS_KEY = 'metrics:workers'
+# Held while a worker updates WORKERS_KEY, so concurrent publishes cannot
+# drop each other's entries; expires in case its holder dies
+WORKERS_LOCK_KEY = 'metrics:workers:lock'
+WORKERS_LOCK_SECONDS = 5
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_time', 'serializer_time', 'in_serializer', 'statements')
+
+    def __init__(self, trace):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.in_serializer = False
+        # (seconds, alias, sql) of each statement, for sampled requests only
+        self.statements = [] if trace else None
+
+
+def worker_id():
+    # Not computed at import: workers forked from a preloaded app share
+    # whatever the parent had
+    return f'{HOSTNAME}:{os.getpid()}'
+
+
+class Registry:
+    """
+    This worker's histograms and counters. A histogram series is a list of
+    per-bucket counts (the last bucket being +Inf) followed by the sum.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.requests = {}
+        self.next_publish = 0.0
+
+    def observe(self, route, method, status, values):
+        labels = (route, method)
+        with self.lock:
+            for name, value in values.items():
+                series = self.histograms[name].get(labels)
+                buckets = HISTOGRAMS[name][1]
+                if series is None:
+                    series = self.histograms[name][labels] = [0] * (len(buckets) + 1) + [0.0]
+                series[bisect.bisect_left(buckets, value)] += 1
+                series[-1] += value
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': {
+                    name: {labels: list(series) for labels, series in by_labels.items()}
+                    for name, by_labels in self.histograms.items()
+                },
+                'requests': dict(self.requests),
+            }
+
+    def publish(self, now):
+        """Share this worker's snapshot with the others, every METRICS_PUBLISH_SECONDS."""
+        self.next_publish = now + settings.METRICS_PUBLISH_SECONDS
+        ttl = settings.METRICS_PUBLISH_SECONDS * 6
+        shared = caches['shared']
+        worker = worker_id()
+        try:
+            shared.set(f'metrics:worker:{worker}', self.snapshot(), ttl)
+            if not shared.add(WORKERS_LOCK_KEY, worker, WORKERS_LOCK_SECONDS):
+                # Another worker is updating the list; try again next request
+                self.next_publish = now
+                return
+            try:
+                workers = shared.get(WORKERS_KEY) or {}
+                workers = {other: seen for other, seen in workers.items() if seen > now - ttl}
+                workers[worker] = now
+                shared.set(WORKERS_KEY, workers, timeout=None)
+            finally:
+                shared.delete(WORKERS_LOCK_KEY)
+        except Exception:
+            # Metrics must never fail a request
+            logger.exception('Could not publish metrics')
+
+
+REGISTRY = Registry()
+# A forked worker starts with empty metrics of its own
+os.register_at_fork(after_in_child=REGISTRY.reset)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing each statement of an instrumented request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.query_time += elapsed
+        if stats.statements is not None and len(stats.statements) < MAX_TRACE_STATEMENTS:
+            stats.statements.append((elapsed, context['connection'].alias, sql))
+
+
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def serializer_data(serializer):
+    """``serializer.data``, with the time it takes counted as the request's serializer time."""
+    stats = _current.get()
+    if stats is None or stats.in_serializer:
+        return serializer.data
+    stats.in_serializer = True
+    start = time.perf_counter()
+    try:
+        return serializer.data
+    finally:
+        stats.serializer_time += time.perf_counter() - start
+        stats.in_serializer = False
+
+
+def instrument():
+    """Hook the database up to the metrics; called once from AppConfig.ready()."""
+    connection_created.connect(instrument_connection, dispatch_uid='myapp.metrics')
+
+
+def response_size(response):
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+class MetricsMiddleware:
+    """Record the metrics of every request; goes first in MIDDLEWARE."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats(trace=random.random() < settings.METRICS_TRACE_SAMPLE_RATE)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(trace=random.random() < settings.METRICS_TRACE_SAMPLE_RATE)
+        # The context variable is copied into the threads sync code runs in,
+        # and they all update the same RequestStats
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, duration):
+        match = request.resolver_match
+        # Unmatched paths share one label, so scanners can't add series
+        route = match.route if match is not None else '<unmatched>'
+        REGISTRY.observe(route, request.method, response.status_code, {
+            'http_request_duration_seconds': duration,
+            'http_request_queries': stats.queries,
+            'http_request_query_seconds': stats.query_time,
+            'http_request_serializer_seconds': stats.serializer_time,
+            'http_response_size_bytes': response_size(response),
+        })
+        if stats.statements is not None and duration >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, serializers %.1f ms\n%s',
+                request.method, request.get_full_path(), route, duration * 1000, stats.queries,
+                stats.query_time * 1000, stats.serializer_time * 1000,
+                '\n'.join(f'  {elapsed * 1000:8.2f} ms  [{alias}]  {sql}' for elapsed, alias, sql in stats.statements),
+            )
+        if settings.METRICS_PUBLISH_SECONDS is not None:
+            now = time.time()
+            if now >= REGISTRY.next_publish:
+                REGISTRY.publish(now)
+
+
+def merge(snapshots):
+    merged = {'histograms': {name: {} for name in HISTOGRAMS}, 'requests': {}}
+    for snapshot in snapshots:
+        for name, by_labels in snapshot['histograms'].items():
+            target = merged['histograms'].setdefault(name, {})
+            for labels, series in by_labels.items():
+                if labels in target:
+                    target[labels] = [a + b for a, b in zip(target[labels], series)]
+                else:
+                    target[labels] = list(series)
+        for key, count in snapshot['requests'].items():
+            merged['requests'][key] = merged['requests'].get(key, 0) + count
+    return merged
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (route, method), series in sorted(snapshot['histograms'].get(name, {}).items()):
+            labels = f'route="{_label(route)}",method="{_label(method)}"'
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {_number(series[-1])}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+    lines += ['# HELP http_requests_total Requests handled, by response status.', '# TYPE http_requests_total counter']
+    for (route, method, status), count in sorted(snapshot['requests'].items()):
+        lines.append(
+            f'http_requests_total{{route="{_label(route)}",method="{_label(method)}",status="{status}"}} {count}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def worker_snapshots():
+    """This worker's snapshot, live, and the last published ones of the other workers."""
+    snapshots = [REGISTRY.snapshot()]
+    if settings.METRICS_PUBLISH_SECONDS is not None:
+        shared = caches['shared']
+        workers = shared.get(WORKERS_KEY) or {}
+        keys = [f'metrics:worker:{worker}' for worker in workers if worker != worker_id()]
+        snapshots += shared.get_many(keys).values()
+    return snapshots
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token is None and not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to scrape metrics\n', status=403, content_type='text/plain')
+    if token is not None and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(render(merge(worker_snapshots())), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,88 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_pin'
+# Query parameters the read endpoints use to name the user they are about
+USER_ID_PARAMS = ('user_id', 'userId')
+
+
+def _pin_key(user_id):
+    return f'primary-pin:user:{user_id}'
+
+
+def pin_users_to_primary(*user_ids):
+    """
+    Read these users' data from the primary for the next
+    REPLICA_STICKY_SECONDS, so a write is visible on their next read even
+    when it comes from another client. Called from signal handlers.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return
+    keys = {_pin_key(user_id): 1 for user_id in user_ids if user_id}
+    transaction.on_commit(lambda: caches['shared'].set_many(keys, timeout=settings.REPLICA_STICKY_SECONDS))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests from the read replicas, unless the client or the user
+    the request names wrote something in the last REPLICA_STICKY_SECONDS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method in SAFE_METHODS:
+            if self._pinned(request):
+                return self.get_response(request)
+            with replica_reads():
+                return self.get_response(request)
+
+        response = self.get_response(request)
+        self._pin_client(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        if request.method in SAFE_METHODS:
+            if await sync_to_async(self._pinned)(request):
+                return await self.get_response(request)
+            # The context variable is copied into the threads sync views run in
+            with replica_reads():
+                return await self.get_response(request)
+
+        response = await self.get_response(request)
+        self._pin_client(request, response)
+        return response
+
+    def _pinned(self, request):
+        if request.COOKIES.get(PIN_COOKIE):
+            return True
+        keys = [_pin_key(request.GET[param]) for param in USER_ID_PARAMS if request.GET.get(param)]
+        return bool(keys) and bool(caches['shared'].get_many(keys))
+
+    def _pin_client(self, request, response):
+        if response.status_code < 400:
+            # Read-your-writes for this client, whoever it was acting for
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, secure=request.is_secure(), samesite='None' if request.is_secure() else 'Lax',
+            )
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+# Copy of myapp.models.normalize_location as it was when this migration was
+# written, so it keeps filling the same values if that changes later.
+def normalize_location(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def fill_profile_locations(apps, schema_editor):
+    Profile = apps.get_model('myapp', 'Profile')
+    batch = []
+    for profile in Profile.objects.order_by('pk').only('pk', 'city', 'state').iterator(chunk_size=BATCH_SIZE):
+        profile.city_normalized = normalize_location(profile.city)
+        profile.state_normalized = normalize_location(profile.state)
+        batch.append(profile)
+        if len(batch) == BATCH_SIZE:
+            Profile.objects.bulk_update(batch, ['city_normalized', 'state_normalized'])
+            batch = []
+    if batch:
+        Profile.objects.bulk_update(batch, ['city_normalized', 'state_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_squashed_0005_rename_google_event_id_appointment_google_event_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='city_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='state_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='pincode',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.RunPython(fill_profile_locations, migrations.RunPython.noop),
+    ]
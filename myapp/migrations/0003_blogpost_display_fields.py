@@ -0,0 +1,69 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Copies of myapp.models.truncate_words and SUMMARY_PREVIEW_WORDS as they
+# were when this migration was written, so it keeps filling the same values
+# if those change later.
+SUMMARY_PREVIEW_WORDS = 15
+
+
+def truncate_words(value, count):
+    if not value:
+        return ''
+    words = value.split()
+    if len(words) > count:
+        return ' '.join(words[:count]) + '...'
+    return value
+
+
+def fill_blogpost_display(apps, schema_editor):
+    # Same values as the backfill_blog_display command, computed with the
+    # historical models
+    BlogPost = apps.get_model('myapp', 'BlogPost')
+    fields = ['truncated_summary', 'author_display_name', 'category_names']
+    posts = (
+        BlogPost.objects.order_by('pk')
+        .select_related('author__profile__user')
+        .prefetch_related('categories')
+    )
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        user = post.author.profile.user
+        post.truncated_summary = truncate_words(post.summary, SUMMARY_PREVIEW_WORDS)
+        post.author_display_name = f'{user.first_name} {user.last_name}'.strip()
+        post.category_names = [category.name for category in sorted(post.categories.all(), key=lambda c: c.pk)]
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            BlogPost.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        BlogPost.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_profile_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='author_display_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=301),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='category_names',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='truncated_summary',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_blogpost_display, migrations.RunPython.noop),
+    ]
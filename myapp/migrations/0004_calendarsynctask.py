@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:58
+
+import django.db.models.deletion
+import django.utils.timezone
+import myapp.models
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_existing_appointments(apps, schema_editor):
+    # Appointments booked before the outbox either got their event in the
+    # request or never will; none of them has a CalendarSyncTask to retry.
+    Appointment = apps.get_model('myapp', 'Appointment')
+    has_link = Q(google_event_link__isnull=False) & ~Q(google_event_link='')
+    Appointment.objects.filter(has_link).update(calendar_sync_status='synced')
+    Appointment.objects.exclude(has_link).update(calendar_sync_status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_blogpost_display_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='calendar_sync_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('synced', 'Synced'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='CalendarSyncTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('access_token', models.TextField()),
+                ('idempotency_key', models.CharField(default=myapp.models.new_idempotency_key, editable=False, max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_sync', to='myapp.appointment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='calendarsync_due_idx')],
+            },
+        ),
+        migrations.RunPython(mark_existing_appointments, migrations.RunPython.noop),
+    ]
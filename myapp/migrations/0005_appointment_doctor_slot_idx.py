@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_calendarsynctask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date', 'start_time'], name='appointment_doctor_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_appointment_doctor_slot_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date', 'start_time'], name='appointment_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(condition=models.Q(('draft', False)), fields=['-created_at', '-id'], name='blogpost_published_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_category_counts(apps, schema_editor):
+    # CategoryCounts.objects.refresh() for every category, with the
+    # historical models
+    Category = apps.get_model('myapp', 'Category')
+    Doctor = apps.get_model('myapp', 'Doctor')
+    BlogPost = apps.get_model('myapp', 'BlogPost')
+    CategoryCounts = apps.get_model('myapp', 'CategoryCounts')
+
+    def counts(links):
+        return dict(links.order_by().values('category_id').annotate(count=Count('pk')).values_list('category_id', 'count'))
+
+    doctors = counts(Doctor.categories.through.objects.all())
+    published_posts = counts(BlogPost.categories.through.objects.filter(blogpost__draft=False))
+    CategoryCounts.objects.bulk_create([
+        CategoryCounts(category_id=pk, doctors=doctors.get(pk, 0), published_posts=published_posts.get(pk, 0))
+        for pk in Category.objects.values_list('pk', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryCounts',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counts', serialize=False, to='myapp.category')),
+                ('doctors', models.PositiveIntegerField(default=0)),
+                ('published_posts', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_category_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+from django.db import OperationalError, migrations, transaction
+
+
+# The FTS5 tables behind myapp.search, copied here rather than read from the
+# live SearchIndex objects: table -> (source table, indexed columns)
+SEARCH_TABLES = {
+    'myapp_profile_address_fts': ('myapp_profile', ['address']),
+    'myapp_blogpost_fts': ('myapp_blogpost', ['title', 'summary', 'content']),
+}
+
+
+def create_search_tables(apps, schema_editor):
+    # Other databases, and SQLite builds without FTS5, use the in-process
+    # index instead
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, (source, columns) in SEARCH_TABLES.items():
+            try:
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({', '.join(columns)}, tokenize='unicode61')"
+                    )
+            except OperationalError:
+                return
+            # Filled lazily by earlier versions of myapp.search, if at all
+            cursor.execute(f'DELETE FROM {table}')
+            values = ', '.join(f"COALESCE({column}, '')" for column in columns)
+            cursor.execute(f"INSERT INTO {table} (rowid, {', '.join(columns)}) SELECT id, {values} FROM {source}")
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0008_category_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
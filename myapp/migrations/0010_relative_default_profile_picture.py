@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def strip_leading_slash(apps, schema_editor):
+    # Registration used to store the placeholder as '/profile-default.png',
+    # which storage treats as an absolute path; the field default has no slash
+    Profile = apps.get_model('myapp', 'Profile')
+    Profile.objects.filter(profile_picture='/profile-default.png').update(profile_picture='profile-default.png')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_search_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_leading_slash, migrations.RunPython.noop),
+    ]
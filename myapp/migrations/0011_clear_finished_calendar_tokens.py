@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def clear_finished_tokens(apps, schema_editor):
+    # Done and failed tasks are never retried; their tokens were kept by
+    # earlier versions of myapp.google_calendar
+    CalendarSyncTask = apps.get_model('myapp', 'CalendarSyncTask')
+    CalendarSyncTask.objects.exclude(status='pending').exclude(access_token='').update(access_token='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_relative_default_profile_picture'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_finished_tokens, migrations.RunPython.noop),
+    ]
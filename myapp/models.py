@@ -1,7 +1,22 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connections, models
+from django.db.models import Count, Q
 from Medi_BE import settings
 from django.utils import timezone
+from .search import PROFILE_ADDRESS_INDEX
+
+PINCODE_LENGTH = 6
+# Placeholder for profiles without an upload; ships in MEDIA_ROOT
+DEFAULT_PROFILE_PICTURE = 'profile-default.png'
+
+
+def normalize_location(value):
+    # Lowercased, single-spaced form stored alongside city/state so lookups
+    # can use a plain index instead of a case-insensitive LIKE scan.
+    return ' '.join((value or '').split()).casefold()
+
 
 class CustomUser(AbstractUser):
     is_patient = models.BooleanField(default=False)
@@ -12,28 +27,172 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+def stale_variants(instance, field):
+    """
+    True when the image in ``field`` is not the one its variant record was
+    made from (see myapp.images); save() then clears the record and the
+    post_save handler queues new variants.
+    """
+    name = getattr(instance, field).name or ''
+    return getattr(instance, f'{field}_variants').get('source', '') != name
+
+
+def prefix_q(field, prefix, vendor):
+    """A Q object for values of ``field`` starting with ``prefix``, written so the column index serves it."""
+    if vendor == 'sqlite':
+        # SQLite's LIKE is case-insensitive and skips the index; a range
+        # over the default binary collation uses it
+        return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'})
+    # Elsewhere a range would depend on the column's collation, which need
+    # not sort '\U0010ffff' after every string with the prefix. LIKE
+    # 'prefix%' does not; on PostgreSQL it uses the varchar_pattern_ops
+    # (_like) index Django creates for a CharField with db_index
+    return Q(**{f'{field}__startswith': prefix})
+
+
+class ProfileQuerySet(models.QuerySet):
+    def in_location(self, query):
+        """
+        Profiles whose city or state starts with ``query``, whose address
+        contains words starting with each word of ``query``, or, for a
+        numeric query, whose pincode starts with those digits.
+        """
+        normalized = normalize_location(query)
+        if not normalized:
+            return self
+        vendor = connections[self.db].vendor
+        condition = (
+            prefix_q('city_normalized', normalized, vendor) |
+            prefix_q('state_normalized', normalized, vendor) |
+            PROFILE_ADDRESS_INDEX.filter_q(query, 'id')
+        )
+        if normalized.isdigit() and len(normalized) <= PINCODE_LENGTH:
+            scale = 10 ** (PINCODE_LENGTH - len(normalized))
+            prefix = int(normalized)
+            condition |= Q(pincode__gte=prefix * scale, pincode__lt=(prefix + 1) * scale)
+        return self.filter(condition)
+
+
 class Profile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='profile')
-    profile_picture = models.ImageField(upload_to='profile_pictures/', default='profile-default.png')
+    profile_picture = models.ImageField(upload_to='profile_pictures/', default=DEFAULT_PROFILE_PICTURE)
     address = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
-    pincode = models.IntegerField()
+    pincode = models.IntegerField(db_index=True)
+    city_normalized = models.CharField(max_length=100, db_index=True, editable=False, default='')
+    state_normalized = models.CharField(max_length=100, db_index=True, editable=False, default='')
+    # Resized copies of profile_picture, filled in after upload (myapp.images)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    VARIANT_WIDTHS = (64, 128, 256)
+
+    objects = ProfileQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.city_normalized = normalize_location(self.city)
+        self.state_normalized = normalize_location(self.state)
+        recomputed = ['city_normalized', 'state_normalized']
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'profile_picture' in update_fields:
+            if self.profile_picture_variants and stale_variants(self, 'profile_picture'):
+                self.profile_picture_variants = {}
+            recomputed.append('profile_picture_variants')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *recomputed}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user.email
 
+def count_by_category(through, owner_field, owners, category_ids=None):
+    # One grouped query over a categories through table, restricted to the
+    # rows of ``owners`` (a queryset of doctors or posts)
+    links = through.objects.filter(**{f'{owner_field}__in': owners.order_by().values('pk')})
+    if category_ids is not None:
+        links = links.filter(category_id__in=category_ids)
+    counts = links.order_by().values('category_id').annotate(count=Count('pk')).values_list('category_id', 'count')
+    return dict(counts)
+
+
+class DoctorQuerySet(models.QuerySet):
+    def for_listing(self):
+        # Everything DoctorSerializer reads, in two queries per page
+        return self.select_related('profile__user').prefetch_related('categories')
+
+    def category_counts(self, category_ids=None):
+        """{category id: number of these doctors in it}, for categories that have any."""
+        return count_by_category(Doctor.categories.through, 'doctor_id', self, category_ids)
+
+
 class Doctor(models.Model):
     profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='doctor_profile')
     categories = models.ManyToManyField(Category, blank=True)  
     establishment_name = models.CharField(max_length=255, null=True, blank=True)
     license_number = models.CharField(max_length=100, null=True, blank=True)
 
+    objects = DoctorQuerySet.as_manager()
+
     def __str__(self):
         return f"Dr. {self.profile.user.get_full_name()}"
 
 
 
+SUMMARY_PREVIEW_WORDS = 15
+
+
+def truncate_words(value, count):
+    if not value:
+        return ''
+    words = value.split()
+    if len(words) > count:
+        return ' '.join(words[:count]) + '...'
+    return value
+
+
+class BlogPostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(draft=False)
+
+    def feed(self):
+        # BlogPostSerializer only reads columns of BlogPost itself (the
+        # display fields are materialized on write), so the page is a single
+        # query; the post bodies are left out of it.
+        return self.defer('summary', 'content')
+
+    def category_counts(self, category_ids=None):
+        """{category id: number of these posts in it}, for categories that have any."""
+        return count_by_category(BlogPost.categories.through, 'blogpost_id', self, category_ids)
+
+    def refresh_category_names(self):
+        """Recompute category_names for every post in this queryset."""
+        through = BlogPost.categories.through
+        for post_ids in _batched(self.order_by().values_list('pk', flat=True).iterator(), 1000):
+            names = {pk: [] for pk in post_ids}
+            links = (
+                through.objects.filter(blogpost_id__in=post_ids)
+                .order_by('category_id')
+                .values_list('blogpost_id', 'category__name')
+            )
+            for post_id, name in links:
+                names[post_id].append(name)
+            BlogPost.objects.bulk_update(
+                [BlogPost(pk=pk, category_names=category_names) for pk, category_names in names.items()],
+                ['category_names'],
+            )
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class BlogPost(models.Model):
     author = models.ForeignKey(Doctor, on_delete=models.CASCADE)
     title = models.CharField(max_length=200, null=True, blank=True)
@@ -44,9 +203,98 @@ class BlogPost(models.Model):
     draft = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Display fields for the feeds, materialized on write. save() fills the
+    # first two; category_names and renames of authors or categories are
+    # kept up to date by the handlers in myapp.signals.
+    truncated_summary = models.TextField(blank=True, default='', editable=False)
+    author_display_name = models.CharField(max_length=301, blank=True, default='', editable=False)
+    category_names = models.JSONField(default=list, blank=True, editable=False)
+    # Resized copies of image, filled in after upload (myapp.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    VARIANT_WIDTHS = (320, 640, 960, 1280)
+
+    objects = BlogPostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The published feeds: WHERE NOT draft ORDER BY created_at DESC, id DESC
+            models.Index(
+                fields=['-created_at', '-id'], condition=Q(draft=False), name='blogpost_published_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        recomputed = []
+        if update_fields is None or 'summary' in update_fields:
+            self.truncated_summary = truncate_words(self.summary, SUMMARY_PREVIEW_WORDS)
+            recomputed.append('truncated_summary')
+        if update_fields is None or {'author', 'author_id'} & set(update_fields):
+            self.author_display_name = self.author.profile.user.get_full_name()
+            recomputed.append('author_display_name')
+        if update_fields is None or 'image' in update_fields:
+            if self.image_variants and stale_variants(self, 'image'):
+                self.image_variants = {}
+            recomputed.append('image_variants')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *recomputed}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
+
+class CategoryCountsQuerySet(models.QuerySet):
+    def refresh(self, category_ids=None):
+        """Recount the doctors and published posts of ``category_ids``, or of every category."""
+        categories = Category.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+        category_ids = list(categories.values_list('pk', flat=True))
+        if not category_ids:
+            return
+        doctors = Doctor.objects.category_counts(category_ids)
+        published_posts = BlogPost.objects.published().category_counts(category_ids)
+        CategoryCounts.objects.bulk_create(
+            [
+                CategoryCounts(
+                    category_id=pk, doctors=doctors.get(pk, 0), published_posts=published_posts.get(pk, 0)
+                )
+                for pk in category_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=['doctors', 'published_posts'],
+        )
+
+
+class CategoryCounts(models.Model):
+    """
+    Doctors and published posts per category, for the unfiltered facet
+    counts (myapp.facets). Kept up to date by the handlers in myapp.signals
+    while FACET_COUNTERS is on; refresh_category_counts rebuilds it.
+    """
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='counts')
+    doctors = models.PositiveIntegerField(default=0)
+    published_posts = models.PositiveIntegerField(default=0)
+
+    objects = CategoryCountsQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.category}: {self.doctors} doctors, {self.published_posts} posts"
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def with_participants(self):
+        # Joins both users, their profiles and the doctor's Doctor row so
+        # AppointmentDetailSerializer never has to go back to the database.
+        return self.select_related(
+            'doctor__profile__doctor_profile',
+            'patient__profile',
+        )
+
+
 class Appointment(models.Model):
     patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="appointments_as_patient")
     doctor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="appointments_as_doctor")
@@ -55,5 +303,61 @@ class Appointment(models.Model):
     end_time = models.TimeField(null=True, blank=True)
     google_event_link = models.CharField(max_length=255, null=True, blank=True)
 
+    SYNC_PENDING = 'pending'
+    SYNC_SYNCED = 'synced'
+    SYNC_FAILED = 'failed'
+    SYNC_STATUS_CHOICES = [
+        (SYNC_PENDING, 'Pending'),
+        (SYNC_SYNCED, 'Synced'),
+        (SYNC_FAILED, 'Failed'),
+    ]
+    # Google Calendar events are created after the booking commits, by
+    # the run_calendar_worker command working through CalendarSyncTask rows
+    calendar_sync_status = models.CharField(max_length=10, choices=SYNC_STATUS_CHOICES, default=SYNC_PENDING)
+
+    objects = AppointmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Overlap checks and availability read a doctor's day in start order
+            models.Index(fields=['doctor', 'date', 'start_time'], name='appointment_doctor_slot_idx'),
+            # A patient's appointments, newest first
+            models.Index(fields=['patient', 'date', 'start_time'], name='appointment_patient_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Appointment with Dr. {self.doctor.get_full_name()} for {self.patient.get_full_name()} on {self.date} at {self.start_time}"
+
+
+def new_idempotency_key():
+    # Hex is valid in Google Calendar event ids (base32hex, 5-1024 chars)
+    return uuid.uuid4().hex
+
+
+class CalendarSyncTask(models.Model):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name='calendar_sync')
+    access_token = models.TextField()
+    idempotency_key = models.CharField(max_length=64, unique=True, default=new_idempotency_key, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='calendarsync_due_idx'),
+        ]
+
     def __str__(self):
-        return f"Appointment with Dr. {self.doctor.get_full_name()} for {self.patient.get_full_name()} on {self.date} at {self.start_time}"
\ No newline at end of file
+        return f"Calendar sync for appointment {self.appointment_id} ({self.status})"
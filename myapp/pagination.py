@@ -0,0 +1,203 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import exceptions
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+MAX_PAGE_SIZE = 100
+
+
+def query_int(params, name, default, minimum=0):
+    """
+    The integer query param ``name``, or ``default`` when it is absent;
+    anything that is not an integer of at least ``minimum`` is a 400.
+    """
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        number = None
+    # Past 2**63 the database cannot take it as a LIMIT/OFFSET
+    if number is None or not minimum <= number < 2 ** 63:
+        raise ValidationError({name: f'Must be an integer of at least {minimum}.'})
+    return number
+
+
+def page_limit(params, default):
+    """The ``limit`` query param, capped at MAX_PAGE_SIZE."""
+    return min(query_int(params, 'limit', default, minimum=1), MAX_PAGE_SIZE)
+
+
+# Cursors are opaque to clients: a url-safe base64 blob of the ordering
+# values of the last row on the previous page.
+
+def encode_cursor(values):
+    raw = json.dumps([_dump_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering, model):
+    """
+    The ordering values in ``cursor``, each converted by its field of
+    ``model``; a cursor that does not decode to one valid value per field
+    of ``ordering`` (tampered with, or for another ordering) is a 400.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError
+        return [_load_value(_ordering_field(model, field), value) for field, value in zip(ordering, values)]
+    except (ValueError, TypeError, exceptions.ValidationError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime.date, datetime.time, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def _load_value(field, value):
+    # Only what _dump_value() writes: strings and numbers, never null
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError
+    return field.to_python(value)
+
+
+def _ordering_field(model, field):
+    *relations, name = field.lstrip('-').split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _keyset_filter(ordering, values):
+    # Rows strictly after ``values`` in ``ordering``:
+    # (a > x) | (a = x & b > y) | (a = x & b = y & c > z) ...
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor, limit):
+    """
+    Return ``(rows, next_cursor)`` for the page that follows ``cursor``.
+
+    ``ordering`` must end in a unique column so that the order is total.
+    One extra row is fetched to tell whether another page exists, so no
+    COUNT query is needed.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_keyset_filter(ordering, decode_cursor(cursor, ordering, queryset.model)))
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([_ordering_value(last, field) for field in ordering])
+    return rows, next_cursor
+
+
+async def akeyset_page(queryset, ordering, cursor, limit):
+    """Async keyset_page(), for views running on the event loop."""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_keyset_filter(ordering, decode_cursor(cursor, ordering, queryset.model)))
+    rows = [row async for row in queryset[:limit + 1]]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([_ordering_value(last, field) for field in ordering])
+    return rows, next_cursor
+
+
+def _ordering_value(obj, field):
+    value = obj
+    for part in field.lstrip('-').split('__'):
+        value = getattr(value, part)
+    return value
+
+
+def cached_count(queryset):
+    """
+    COUNT(*) for ``queryset``, reused for COUNT_CACHE_TIMEOUT seconds.
+
+    The total only drives the "N results" label and the last-page check on
+    the frontend, so a count that is a few seconds stale is fine and saves
+    a full scan of the filtered set on every page.
+    """
+    key = 'count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, getattr(settings, 'COUNT_CACHE_TIMEOUT', 60))
+    return total
+
+
+async def acached_count(queryset):
+    key = 'count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    total = await cache.aget(key)
+    if total is None:
+        total = await queryset.acount()
+        await cache.aset(key, total, getattr(settings, 'COUNT_CACHE_TIMEOUT', 60))
+    return total
+
+
+def paginate_feed(request, queryset, ordering, default_limit):
+    """
+    Page ``queryset`` according to the request's query params.
+
+    The original ``offset``/``limit`` contract is kept as the default. Passing
+    ``cursor`` (empty for the first page) switches to keyset pagination and
+    adds ``next_cursor`` to the returned metadata. ``count=cached`` or
+    ``count=exact`` overrides how ``total_count`` is computed; cursor mode
+    defaults to the cached count.
+    """
+    params = request.query_params
+    limit = page_limit(params, default_limit)
+    cursor = params.get('cursor')
+    count_mode = params.get('count', 'exact' if cursor is None else 'cached')
+    total_count = cached_count(queryset) if count_mode == 'cached' else queryset.count()
+
+    if cursor is not None:
+        rows, next_cursor = keyset_page(queryset, ordering, cursor, limit)
+        return rows, {'total_count': total_count, 'next_cursor': next_cursor}
+
+    offset = query_int(params, 'offset', 0)
+    rows = queryset.order_by(*ordering)[offset:offset + limit]
+    return rows, {'total_count': total_count}
+
+
+async def apaginate_feed(request, queryset, ordering, default_limit):
+    """
+    Async paginate_feed(), taking a plain Django request. The page is
+    returned as a list, already fetched.
+    """
+    params = request.GET
+    limit = page_limit(params, default_limit)
+    cursor = params.get('cursor')
+    count_mode = params.get('count', 'exact' if cursor is None else 'cached')
+    total_count = await acached_count(queryset) if count_mode == 'cached' else await queryset.acount()
+
+    if cursor is not None:
+        rows, next_cursor = await akeyset_page(queryset, ordering, cursor, limit)
+        return rows, {'total_count': total_count, 'next_cursor': next_cursor}
+
+    offset = query_int(params, 'offset', 0)
+    rows = [row async for row in queryset.order_by(*ordering)[offset:offset + limit]]
+    return rows, {'total_count': total_count}
@@ -0,0 +1,80 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Reads go to a replica only inside replica_reads(), which
+# ReplicaRoutingMiddleware enters for safe requests. Everything else
+# (writes, management commands, the calendar worker) stays on the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """For reads whose result is cached under a generation, which must not come from a lagging replica."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Send reads to the DATABASE_REPLICAS in turn, skipping any that could not
+    be reached in the last REPLICA_RETRY_SECONDS; send writes to the primary.
+    """
+
+    def __init__(self):
+        self.replicas = list(settings.DATABASE_REPLICAS)
+        self._cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+        self._down_until = {}
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                alias = next(self._cycle)
+            if self._is_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *self.replicas}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+    def _is_available(self, alias):
+        if self._down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            # A no-op when this thread already holds an open connection
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self._down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            return False
+        return True
@@ -0,0 +1,336 @@
+import bisect
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .cache import bump_generation, bump_on_commit, get_generation
+from .routers import primary_reads
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+REBUILD_BATCH_SIZE = 2000
+# The in-process index catches up on at most this many writes from the
+# shared change log before it rebuilds instead; entries live this long
+CATCH_UP_LIMIT = 1000
+CHANGE_LOG_TIMEOUT = 60 * 60
+# filter_q() inlines up to this many in-process matches as an IN list;
+# beyond it the text columns are matched in the database instead
+FILTER_MAX_IDS = 1000
+
+
+def tokenize(text):
+    return [token.casefold() for token in TOKEN_RE.findall(text or '')]
+
+
+class SearchIndex:
+    """
+    A token index over some text columns of a model.
+
+    On SQLite builds with FTS5 the index is a virtual table named ``table``
+    whose rowid is the model's primary key, created by a migration and
+    refilled by the reindex_search command. Elsewhere it falls back to an
+    in-process inverted index: built from the database on first use, then
+    brought up to date from a log of changed rows kept in the shared cache,
+    so every worker sees every write without rebuilding.
+
+    Every query token is prefix-matched and all of them must be present.
+    """
+
+    def __init__(self, table, model_label, fields):
+        self.table = table
+        self.model_label = model_label
+        self.fields = fields
+        self._ready = {}
+        self._memory = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    # Backend selection
+
+    def uses_fts5(self, using=DEFAULT_DB_ALIAS):
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            return False
+        key = (using, str(connection.settings_dict['NAME']))
+        if key not in self._ready:
+            # Absent when SQLite was built without FTS5 (see the migration)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table])
+                self._ready[key] = cursor.fetchone() is not None
+        return self._ready[key]
+
+    # Writes, called from signal handlers
+
+    def _insert_sql(self):
+        return (
+            f"INSERT INTO {self.table} (rowid, {', '.join(self.fields)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(self.fields))})"
+        )
+
+    def update(self, instance):
+        if self.uses_fts5():
+            values = [getattr(instance, field) or '' for field in self.fields]
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [instance.pk])
+                cursor.execute(self._insert_sql(), [instance.pk, *values])
+        else:
+            self._log_changes([instance.pk])
+
+    def update_many(self, instances):
+        """update() for a batch of rows, e.g. ones just written with bulk_create."""
+        if self.uses_fts5():
+            rows = [[instance.pk, *(getattr(instance, field) or '' for field in self.fields)] for instance in instances]
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [row[:1] for row in rows])
+                cursor.executemany(self._insert_sql(), rows)
+        else:
+            self._log_changes([instance.pk for instance in instances])
+
+    def remove(self, pk):
+        if self.uses_fts5():
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+        else:
+            self._log_changes([pk])
+
+    def _log_changes(self, pks):
+        # Each write gets its own generation, and the rows it changed are
+        # stored under it for the other workers' in-process indexes. After
+        # commit, like bump_on_commit(), so they read the new rows.
+        def record():
+            generation = bump_generation(f'search:{self.table}')
+            caches['shared'].set(self._change_key(generation), pks, CHANGE_LOG_TIMEOUT)
+        transaction.on_commit(record)
+
+    def _change_key(self, generation):
+        return f'search-changes:{self.table}:{generation}'
+
+    def rebuild(self, batch_size=REBUILD_BATCH_SIZE):
+        """
+        Re-index every row, streaming them from the database in batches.
+        Returns the number of rows indexed (0 for the in-process fallback,
+        which only rebuilds lazily on the next query).
+        """
+        if self.uses_fts5():
+            return self._fill_table(connections[DEFAULT_DB_ALIAS], batch_size)
+        bump_on_commit(f'search:{self.table}')
+        return 0
+
+    def _fill_table(self, connection, batch_size=REBUILD_BATCH_SIZE):
+        rows = self.model.objects.order_by('pk').values_list('pk', *self.fields)
+        insert = self._insert_sql()
+        indexed = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append([value or '' for value in row])
+                if len(batch) == batch_size:
+                    cursor.executemany(insert, batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                indexed += len(batch)
+        return indexed
+
+    # Reads
+
+    def match_expression(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        return ' '.join('"%s"*' % token.replace('"', '""') for token in tokens)
+
+    def filter_q(self, query, field='pk'):
+        """A Q object restricting ``field`` to primary keys matching ``query``."""
+        expression = self.match_expression(query)
+        if expression is None:
+            return Q(**{f'{field}__in': []})
+        if self.uses_fts5():
+            subquery = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression])
+            return Q(**{f'{field}__in': subquery})
+        tokens = tokenize(query)
+        matched = self._memory_search(tokens)
+        if len(matched) <= FILTER_MAX_IDS:
+            return Q(**{f'{field}__in': matched})
+        # A common prefix can match most of the table, too many ids for one
+        # statement; a subquery scanning the text columns finds the same rows
+        return Q(**{f'{field}__in': self.model.objects.filter(self._text_q(tokens)).values('pk')})
+
+    def _text_q(self, tokens):
+        # Each token starts a word in one of the fields, as in the index.
+        # Tokens are \w+, so they need no escaping in the pattern.
+        condition = Q()
+        for token in tokens:
+            in_any_field = Q()
+            for field in self.fields:
+                in_any_field |= Q(**{f'{field}__iregex': r'(^|\W)' + token})
+            condition &= in_any_field
+        return condition
+
+    def ranked(self, query, queryset, limit, offset=0):
+        """
+        Primary keys of rows in ``queryset`` matching ``query``, best match
+        first, sliced to ``offset``/``limit``.
+        """
+        expression = self.match_expression(query)
+        if expression is None:
+            return []
+        if self.uses_fts5():
+            restrict_sql, restrict_params = self._restrict(queryset)
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                    f'AND EXISTS ({restrict_sql}) ORDER BY rank LIMIT %s OFFSET %s',
+                    [expression, *restrict_params, limit, offset],
+                )
+                return [row[0] for row in cursor.fetchall()]
+
+        # Walk the in-process ranking and keep the ids the queryset allows
+        ranking = self._memory_search(tokenize(query))
+        matched = []
+        for start in range(0, len(ranking), 500):
+            chunk = ranking[start:start + 500]
+            allowed = set(queryset.filter(pk__in=chunk).values_list('pk', flat=True))
+            matched.extend(pk for pk in chunk if pk in allowed)
+            if len(matched) >= offset + limit:
+                break
+        return matched[offset:offset + limit]
+
+    def count(self, query, queryset):
+        """Number of rows in ``queryset`` matching ``query``."""
+        expression = self.match_expression(query)
+        if expression is None:
+            return 0
+        if self.uses_fts5():
+            restrict_sql, restrict_params = self._restrict(queryset)
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s AND EXISTS ({restrict_sql})',
+                    [expression, *restrict_params],
+                )
+                return cursor.fetchone()[0]
+        return queryset.filter(self.filter_q(query)).count()
+
+    def _restrict(self, queryset):
+        # A correlated EXISTS checks each match against the queryset's filters
+        # by primary key. An IN (...) list would first materialize every id
+        # the queryset allows, which for "all published posts" is the table.
+        correlated = queryset.filter(pk=RawSQL(f'{self.table}.rowid', ())).values('pk')
+        return correlated.query.sql_with_params()
+
+    def _memory_search(self, tokens):
+        with self._lock:
+            return self._memory_index().search(tokens)
+
+    def _memory_index(self):
+        generation = get_generation(f'search:{self.table}')
+        index = self._memory
+        if index is not None and index.generation != generation and not self._catch_up(index, generation):
+            index = None
+        if index is None:
+            index = InProcessIndex(generation)
+            rows = self.model.objects.order_by('pk').values_list('pk', *self.fields)
+            with primary_reads():
+                for pk, *values in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+                    index.add(pk, ' '.join(value or '' for value in values))
+            index.freeze()
+            self._memory = index
+        return index
+
+    def _catch_up(self, index, generation):
+        """
+        Apply the logged changes between the index's generation and
+        ``generation``; False when some are missing (expired, not written
+        yet, or a rebuild) or there are too many, and a rebuild is needed.
+        """
+        if not 0 < generation - index.generation <= CATCH_UP_LIMIT:
+            return False
+        keys = [self._change_key(number) for number in range(index.generation + 1, generation + 1)]
+        changes = caches['shared'].get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        pks = {pk for changed in changes.values() for pk in changed}
+        rows = self.model.objects.filter(pk__in=pks).values_list('pk', *self.fields)
+        with primary_reads():
+            rows = list(rows)
+        for pk in pks:
+            index.remove(pk)
+        for pk, *values in rows:
+            index.add(pk, ' '.join(value or '' for value in values))
+        index.generation = generation
+        return True
+
+
+class InProcessIndex:
+    """Inverted index held in memory: token -> {pk: term frequency}."""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.tokens = None
+
+    def add(self, pk, text):
+        self.remove(pk)
+        counts = Counter(tokenize(text))
+        self.documents[pk] = tuple(counts)
+        for token, count in counts.items():
+            if self.tokens is not None and token not in self.postings:
+                bisect.insort(self.tokens, token)
+            self.postings[token][pk] = count
+
+    def remove(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+                if self.tokens is not None:
+                    del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def freeze(self):
+        # Sorted once after the initial build; kept sorted by add/remove after
+        self.tokens = sorted(self.postings)
+
+    def _prefix_postings(self, prefix):
+        matched = Counter()
+        start = bisect.bisect_left(self.tokens, prefix)
+        for position in range(start, len(self.tokens)):
+            token = self.tokens[position]
+            if not token.startswith(prefix):
+                break
+            matched.update(self.postings[token])
+        return matched
+
+    def search(self, tokens):
+        """Primary keys containing every token as a prefix, best matches first."""
+        scores = None
+        for token in tokens:
+            matched = self._prefix_postings(token)
+            if scores is None:
+                scores = matched
+            else:
+                scores = Counter({pk: scores[pk] + count for pk, count in matched.items() if pk in scores})
+            if not scores:
+                return []
+        return [pk for pk, _ in (scores or Counter()).most_common()]
+
+
+PROFILE_ADDRESS_INDEX = SearchIndex('myapp_profile_address_fts', 'myapp.Profile', ['address'])
+BLOGPOST_INDEX = SearchIndex('myapp_blogpost_fts', 'myapp.BlogPost', ['title', 'summary', 'content'])
+
+SEARCH_INDEXES = {
+    'profiles': PROFILE_ADDRESS_INDEX,
+    'blogposts': BLOGPOST_INDEX,
+}
@@ -1,8 +1,14 @@
 from rest_framework import serializers
-from .models import CustomUser, Doctor, Category, Profile , BlogPost,Appointment
+from .models import CustomUser, Doctor, Category, Profile , BlogPost,Appointment, DEFAULT_PROFILE_PICTURE
+from .images import srcset
+from .uploads import UploadedImageField
+from .facets import refresh_counters
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import authenticate
-from django.templatetags.static import static
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 
 
@@ -23,10 +29,14 @@ class CustomUserSerializer(serializers.ModelSerializer):
 
 class ProfileSerializer(serializers.ModelSerializer):
     user = CustomUserSerializer()
+    profile_picture_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ['user', 'profile_picture', 'address', 'city', 'state', 'pincode']
+        fields = ['user', 'profile_picture', 'profile_picture_srcset', 'address', 'city', 'state', 'pincode']
+
+    def get_profile_picture_srcset(self, obj):
+        return srcset(obj.profile_picture_variants)
 
 
 
@@ -41,6 +51,7 @@ class DoctorSerializer(serializers.ModelSerializer):
 
 
 class BlogCreateSerializer(serializers.ModelSerializer):
+    image = UploadedImageField(required=False, allow_null=True)
     categories = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), many=True, required=False)
 
     class Meta:
@@ -57,32 +68,22 @@ class BlogCreateSerializer(serializers.ModelSerializer):
 
 
 class BlogPostSerializer(serializers.ModelSerializer):
-    author_name = serializers.CharField(source='author.profile.user.get_full_name', read_only=True)
-    truncated_summary = serializers.SerializerMethodField()
-    categories = serializers.SerializerMethodField()
+    # Display fields are materialized on BlogPost when it is written
+    author_name = serializers.CharField(source='author_display_name', read_only=True)
+    categories = serializers.ListField(source='category_names', child=serializers.CharField(), read_only=True)
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogPost
-        fields = ['id', 'author_name', 'image', 'title', 'created_at', 'truncated_summary','categories']
-
-    def get_truncated_summary(self, obj):
-        return self.truncate_words(obj.summary, 15)
-
-    def truncate_words(self, value, arg):
-        if not value:
-            return ''
-        words = value.split()
-        if len(words) > arg:
-            return ' '.join(words[:arg]) + '...'
-        return value
-    
-    def get_categories(self, obj):
-        # Return a list of category names
-        return [category.name for category in obj.categories.all()]
+        fields = ['id', 'author_name', 'image', 'image_srcset', 'title', 'created_at', 'truncated_summary','categories']
+
+    def get_image_srcset(self, obj):
+        # Resized WebP/JPEG copies; None until they have been generated
+        return srcset(obj.image_variants)
     
 
 class RegisterSerializer(serializers.ModelSerializer):
-    profile_picture = serializers.ImageField(required=False, default='/profile-default.png')
+    profile_picture = UploadedImageField(required=False)
     address = serializers.CharField(max_length=255, required=True)
     city = serializers.CharField(max_length=100, required=True)
     state = serializers.CharField(max_length=100, required=True)
@@ -115,37 +116,47 @@ class RegisterSerializer(serializers.ModelSerializer):
         categories = validated_data.pop('categories', [])
         establishment_name = validated_data.pop('establishment_name', None)
         license_number = validated_data.pop('license_number', None)
-        profile_picture = validated_data.get('profile_picture') or '/profile-default.png'
-
-        # Create user
-        user = CustomUser.objects.create(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            password=make_password(validated_data['password']),
-            is_patient=(role == 'patient'),
-            is_doctor=(role == 'doctor')
-        )
-
-        # Create profile
-        profile = Profile.objects.create(
-            user=user,
-            profile_picture=profile_picture,
-            address=validated_data['address'],
-            city=validated_data['city'],
-            state=validated_data['state'],
-            pincode=validated_data['pincode']
-        )
-
-        # If user is a doctor, create the doctor record
-        if role == 'doctor':
-            doctor = Doctor.objects.create(
-                profile=profile,
-                establishment_name=establishment_name,
-                license_number=license_number
+        profile_picture = validated_data.get('profile_picture') or DEFAULT_PROFILE_PICTURE
+
+        # The user, profile and doctor rows are written together or not at
+        # all; the password is hashed before the transaction opens
+        password = make_password(validated_data['password'])
+        with transaction.atomic():
+            # Create user
+            user = CustomUser.objects.create(
+                username=validated_data['username'],
+                email=validated_data['email'],
+                first_name=validated_data['first_name'],
+                last_name=validated_data['last_name'],
+                password=password,
+                is_patient=(role == 'patient'),
+                is_doctor=(role == 'doctor')
+            )
+
+            # Create profile
+            profile = Profile.objects.create(
+                user=user,
+                profile_picture=profile_picture,
+                address=validated_data['address'],
+                city=validated_data['city'],
+                state=validated_data['state'],
+                pincode=validated_data['pincode']
             )
-            doctor.categories.set(categories)
+
+            # If user is a doctor, create the doctor record
+            if role == 'doctor':
+                doctor = Doctor.objects.create(
+                    profile=profile,
+                    establishment_name=establishment_name,
+                    license_number=license_number
+                )
+                # One INSERT for all the through rows, without m2m_changed;
+                # the Doctor save above already bumps the doctor feeds, and
+                # the category counters are recounted here
+                Doctor.categories.through.objects.bulk_create([
+                    Doctor.categories.through(doctor=doctor, category=category) for category in set(categories)
+                ])
+                refresh_counters(sorted(category.pk for category in set(categories)))
 
         return user
     
@@ -180,7 +191,12 @@ class UserDetailsSerializer(serializers.ModelSerializer):
 
     def get_doctor_profile(self, obj):
         if obj.is_doctor:
-            doctor = Doctor.objects.filter(profile=obj.profile).first()
+            # Reverse one-to-one access, so a view can select_related and
+            # prefetch the doctor row and its categories up front
+            try:
+                doctor = obj.profile.doctor_profile
+            except ObjectDoesNotExist:
+                doctor = None
             if doctor:
                 return {
                     'categories': [category.name for category in doctor.categories.all()],
@@ -190,17 +206,41 @@ class UserDetailsSerializer(serializers.ModelSerializer):
         return None
     
 
+def require_preloaded(obj, *paths):
+    # With STRICT_PRELOADING on, raise instead of silently issuing a query
+    # when a serializer walks a relation the view did not select_related.
+    if not getattr(settings, 'STRICT_PRELOADING', False):
+        return
+    for path in paths:
+        current = obj
+        for name in path.split('__'):
+            field = current._meta.get_field(name)
+            if not field.is_cached(current):
+                raise AssertionError(
+                    f"{type(obj).__name__}.{path} was not preloaded; use a queryset that select_related()s it."
+                )
+            current = field.get_cached_value(current)
+            if current is None:
+                break
+
+
 class AppointmentDetailSerializer(serializers.ModelSerializer):
     doctor_name = serializers.SerializerMethodField()
     patient_name = serializers.SerializerMethodField()
     doctor_profile = serializers.SerializerMethodField()
     patient_profile = serializers.SerializerMethodField()
+    doctor_profile_srcset = serializers.SerializerMethodField()
+    patient_profile_srcset = serializers.SerializerMethodField()
     establishment_name = serializers.SerializerMethodField()
     duration = serializers.SerializerMethodField()
 
     class Meta:
         model = Appointment
-        fields = ['doctor_name','patient_name', 'doctor_profile','patient_profile','establishment_name', 'google_event_link', 'date', 'start_time', 'end_time', 'duration']
+        fields = ['doctor_name','patient_name', 'doctor_profile','patient_profile', 'doctor_profile_srcset', 'patient_profile_srcset', 'establishment_name', 'google_event_link', 'calendar_sync_status', 'date', 'start_time', 'end_time', 'duration']
+
+    def to_representation(self, instance):
+        require_preloaded(instance, 'doctor__profile__doctor_profile', 'patient__profile')
+        return super().to_representation(instance)
 
     def get_doctor_name(self, obj):
         return f"Dr. {obj.doctor.get_full_name()}"
@@ -212,15 +252,21 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
         if obj.doctor.profile and obj.doctor.profile.profile_picture:
             return obj.doctor.profile.profile_picture.url
         else:
-            # Return the default profile image from the static folder
-            return static('media/profile-default.png')
+            # The placeholder lives in MEDIA_ROOT, not in the static manifest
+            return default_storage.url(DEFAULT_PROFILE_PICTURE)
         
     def get_patient_profile(self, obj):
         if obj.patient.profile and obj.patient.profile.profile_picture:
             return obj.patient.profile.profile_picture.url
         else:
-            # Return the default profile image from the static folder
-            return static('media/profile-default.png')
+            # The placeholder lives in MEDIA_ROOT, not in the static manifest
+            return default_storage.url(DEFAULT_PROFILE_PICTURE)
+
+    def get_doctor_profile_srcset(self, obj):
+        return srcset(obj.doctor.profile.profile_picture_variants)
+
+    def get_patient_profile_srcset(self, obj):
+        return srcset(obj.patient.profile.profile_picture_variants)
 
     def get_establishment_name(self, obj):
         return obj.doctor.profile.doctor_profile.establishment_name
@@ -232,4 +278,18 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
             duration = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
             hours, minutes = divmod(duration, 60)
             return f"{hours} hours, {minutes} minutes"
-        return None
\ No newline at end of file
+        return None
+
+
+class AppointmentBookingSerializer(serializers.Serializer):
+    # One item of a bulk booking; users are looked up in bulk by the view
+    user_id = serializers.IntegerField()
+    doctor_id = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if attrs.get('end_time') and attrs['end_time'] <= attrs['start_time']:
+            raise serializers.ValidationError("end_time must be after start_time.")
+        return attrs
@@ -0,0 +1,204 @@
+"""
+Serving static files and media from the app, in place of
+django.conf.urls.static (which is meant for development only).
+
+- Files whose name changes with their content (manifest-hashed static
+  files, content-addressed uploads and image variants) are sent with
+  ``Cache-Control: immutable``; the rest are cached for FILE_CACHE_MAX_AGE.
+- Every response has an ETag and Last-Modified, so revalidation is a 304.
+- Single byte ranges are answered with 206, e.g. for resumed downloads.
+- Static text assets are sent as their precompressed .br/.gz sibling when
+  the client accepts it (see CompressedManifestStaticFilesStorage).
+- The body is a FileResponse around the open file, which gunicorn hands to
+  sendfile(2). Behind nginx or Apache, MEDIA_SENDFILE_HEADER passes media
+  to the proxy instead (X-Accel-Redirect / X-Sendfile).
+"""
+import functools
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# uploads are stored as <sha256>.<ext> and variants under derivatives/<ab>/<sha256>/
+CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{64}[./]')
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Preferred first
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+BLOCK_SIZE = 64 * 1024
+
+
+class FileRange:
+    """
+    An open file limited to ``length`` bytes from its current position.
+    It keeps fileno(), so gunicorn still sends it with sendfile(2), using
+    the file position as the offset and Content-Length as the count.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def accepted_encodings(request):
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def requested_range(request, size, etag, mtime):
+    """
+    The (start, end) of a single byte range the client asked for, None to
+    send the whole file, or False if the range can't be satisfied.
+    """
+    header = request.headers.get('Range')
+    if not header or request.method != 'GET':
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(mtime):
+        return None
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Multiple ranges and other units: answering with the whole file is allowed
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def serve_file(request, path, document_root, immutable=False, precompressed=False, sendfile_header=None):
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stats = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+
+    filename = os.path.basename(fullpath)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    if precompressed and 'Range' not in request.headers:
+        accepted = accepted_encodings(request)
+        for coding, suffix in PRECOMPRESSED:
+            if coding in accepted:
+                try:
+                    stats, fullpath, encoding = os.stat(fullpath + suffix), fullpath + suffix, coding
+                    break
+                except OSError:
+                    continue
+
+    etag = f'"{int(stats.st_mtime):x}-{stats.st_size:x}{"-" + encoding if encoding else ""}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stats.st_mtime),
+        'Cache-Control': IMMUTABLE if immutable else f'public, max-age={settings.FILE_CACHE_MAX_AGE}',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stats.st_mtime))
+    if response is None and sendfile_header:
+        response = HttpResponse(content_type=content_type)
+        response[sendfile_header] = (
+            fullpath if sendfile_header == 'X-Sendfile'
+            else settings.MEDIA_SENDFILE_URL + quote(path)
+        )
+    elif response is None:
+        byte_range = requested_range(request, stats.st_size, etag, stats.st_mtime)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stats.st_size}'
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type)
+            response['Content-Length'] = stats.st_size
+        else:
+            file = open(fullpath, 'rb')
+            if byte_range:
+                start, end = byte_range
+                file.seek(start)
+                response = FileResponse(
+                    FileRange(file, end - start + 1), content_type=content_type, filename=filename, status=206,
+                )
+                response['Content-Range'] = f'bytes {start}-{end}/{stats.st_size}'
+                response['Content-Length'] = end - start + 1
+            else:
+                response = FileResponse(file, content_type=content_type, filename=filename)
+            response.block_size = BLOCK_SIZE
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if response.status_code in (200, 206):
+            response['Accept-Ranges'] = 'bytes'
+
+    for name, value in headers.items():
+        response[name] = value
+    if precompressed:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@functools.cache
+def hashed_static_names():
+    # Empty unless the staticfiles storage keeps a manifest and collectstatic ran
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+@require_safe
+def serve_static(request, path):
+    return serve_file(
+        request, path, settings.STATIC_ROOT,
+        immutable=path in hashed_static_names(), precompressed=True,
+    )
+
+
+@require_safe
+def serve_media(request, path):
+    return serve_file(
+        request, path, settings.MEDIA_ROOT,
+        immutable=bool(CONTENT_ADDRESSED.search(path)), sendfile_header=settings.MEDIA_SENDFILE_HEADER,
+    )
+
+
+def file_pattern(prefix, view):
+    """A URL pattern sending every path under ``prefix`` (e.g. MEDIA_URL) to ``view``."""
+    return re_path(r'^%s(?P<path>.+)$' % re.escape(prefix.lstrip('/')), view)
@@ -0,0 +1,258 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_on_commit, forget_user_details
+from .facets import refresh_counters
+from .images import process_upload
+from .middleware import pin_users_to_primary
+from .models import Appointment, BlogPost, Category, CustomUser, Doctor, Profile, stale_variants
+from .search import BLOGPOST_INDEX, PROFILE_ADDRESS_INDEX
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    bump_on_commit('category')
+
+
+# Generations of the cached public feeds, named after the model
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_feeds(sender, **kwargs):
+    bump_on_commit(sender._meta.model_name)
+
+
+# Logging in saves last_login, and the password when it is rehashed; no
+# feed or materialized field shows either
+LOGIN_FIELDS = frozenset({'last_login', 'password'})
+
+
+def is_login_save(update_fields):
+    return update_fields is not None and update_fields <= LOGIN_FIELDS
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_users(sender, update_fields=None, **kwargs):
+    if not is_login_save(update_fields):
+        bump_on_commit('user')
+
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+@receiver(m2m_changed, sender=Doctor.categories.through)
+def invalidate_feed_categories(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_on_commit('blogpost' if sender is BlogPost.categories.through else 'doctor')
+
+
+# Cached user details (myapp.cache.user_details) of whoever a write concerns
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_saved_user_details(sender, instance, update_fields=None, **kwargs):
+    if not is_login_save(update_fields):
+        forget_user_details(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def forget_profile_user_details(sender, instance, **kwargs):
+    forget_user_details(instance.user_id)
+
+
+def doctor_user_ids(doctor_ids):
+    return Doctor.objects.filter(pk__in=doctor_ids).values_list('profile__user_id', flat=True)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def forget_doctor_user_details(sender, instance, **kwargs):
+    if Doctor.profile.is_cached(instance):
+        forget_user_details(instance.profile.user_id)
+    else:
+        # Deleted along with its profile, the profile's handler has it
+        forget_user_details(*Profile.objects.filter(pk=instance.profile_id).values_list('user_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Doctor.categories.through)
+def forget_doctor_categories_user_details(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            forget_doctor_user_details(sender, instance)
+    elif action in ('post_add', 'post_remove'):
+        # category.doctor_set changes: pk_set holds the doctors
+        forget_user_details(*doctor_user_ids(pk_set))
+    elif action == 'pre_clear':
+        # Cleared doctors are not listed, so look them up beforehand
+        forget_user_details(*doctor_user_ids(instance.doctor_set.values('pk')))
+
+
+@receiver(post_save, sender=Profile)
+def index_profile_address(sender, instance, **kwargs):
+    PROFILE_ADDRESS_INDEX.update(instance)
+
+
+@receiver(post_delete, sender=Profile)
+def unindex_profile_address(sender, instance, **kwargs):
+    PROFILE_ADDRESS_INDEX.remove(instance.pk)
+
+
+@receiver(post_save, sender=BlogPost)
+def index_blogpost(sender, instance, **kwargs):
+    BLOGPOST_INDEX.update(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_blogpost(sender, instance, **kwargs):
+    BLOGPOST_INDEX.remove(instance.pk)
+
+
+# Materialized display fields on BlogPost
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def refresh_blogpost_category_names(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # category.blogpost_set changed; pk_set holds post ids, except on
+        # clear, where they have to be captured before the rows go away
+        if action == 'pre_clear':
+            instance._cleared_post_ids = list(instance.blogpost_set.values_list('pk', flat=True))
+            return
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_cleared_post_ids', [])
+        if action in ('post_add', 'post_remove', 'post_clear') and pk_set:
+            BlogPost.objects.filter(pk__in=pk_set).refresh_category_names()
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        BlogPost.objects.filter(pk=instance.pk).refresh_category_names()
+
+
+@receiver(post_save, sender=Category)
+def rename_category_on_posts(sender, instance, created, **kwargs):
+    if not created:
+        BlogPost.objects.filter(categories=instance).refresh_category_names()
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_posts(sender, instance, **kwargs):
+    # The through rows are deleted with the category, without m2m_changed
+    instance._post_ids = list(instance.blogpost_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def drop_category_from_posts(sender, instance, **kwargs):
+    BlogPost.objects.filter(pk__in=getattr(instance, '_post_ids', [])).refresh_category_names()
+
+
+@receiver(post_save, sender=CustomUser)
+def rename_author_on_posts(sender, instance, created, update_fields, **kwargs):
+    # A new user has no posts yet
+    if instance.is_doctor and not created and not is_login_save(update_fields):
+        name = instance.get_full_name()
+        renamed = BlogPost.objects.filter(author__profile__user=instance).exclude(author_display_name=name).update(
+            author_display_name=name
+        )
+        if renamed:
+            bump_on_commit('blogpost')
+
+
+# Per-category counts for the facets (myapp.facets). Each change recounts
+# the categories it touches rather than adding to the counts, so a remove
+# of a category that was not there, or a redundant add, cannot skew them.
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+@receiver(m2m_changed, sender=Doctor.categories.through)
+def refresh_category_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # category.doctor_set or category.blogpost_set changed
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_counters([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_category_ids = list(instance.categories.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        refresh_counters(getattr(instance, '_cleared_category_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_counters(list(pk_set))
+
+
+@receiver(post_save, sender=BlogPost)
+def recount_saved_blogpost(sender, instance, created, update_fields, **kwargs):
+    # A new post has no categories yet; an edit may publish or unpublish it
+    if not created and (update_fields is None or 'draft' in update_fields):
+        refresh_counters(list(instance.categories.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=BlogPost)
+@receiver(pre_delete, sender=Doctor)
+def remember_counted_categories(sender, instance, **kwargs):
+    # The through rows are deleted with the post or doctor, without m2m_changed
+    instance._counted_category_ids = list(instance.categories.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_delete, sender=Doctor)
+def recount_deleted_categories(sender, instance, **kwargs):
+    refresh_counters(getattr(instance, '_counted_category_ids', []))
+
+
+# Read-your-writes with read replicas: whoever a write concerns reads from
+# the primary for a little while
+
+@receiver(post_save, sender=CustomUser)
+def pin_saved_user(sender, instance, **kwargs):
+    pin_users_to_primary(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+def pin_profile_user(sender, instance, **kwargs):
+    pin_users_to_primary(instance.user_id)
+
+
+@receiver(post_save, sender=BlogPost)
+def pin_blogpost_author(sender, instance, **kwargs):
+    if settings.DATABASE_REPLICAS:
+        # Only worth the author lookup when there is a replica to avoid
+        pin_users_to_primary(instance.author.profile.user_id)
+
+
+@receiver(post_save, sender=Appointment)
+def pin_appointment_participants(sender, instance, **kwargs):
+    pin_users_to_primary(instance.patient_id, instance.doctor_id)
+
+
+# Image variants, generated once the upload is committed
+
+def queue_image_variants(instance, field):
+    name = getattr(instance, field).name
+    # The shared placeholder is not an upload and gets no variants
+    placeholder = instance._meta.get_field(field).get_default()
+    if name and name != placeholder and stale_variants(instance, field):
+        model, pk, widths = type(instance), instance.pk, instance.VARIANT_WIDTHS
+        transaction.on_commit(lambda: process_upload(model, pk, field, name, widths))
+
+
+@receiver(post_save, sender=Profile)
+def queue_profile_picture_variants(sender, instance, **kwargs):
+    queue_image_variants(instance, 'profile_picture')
+
+
+@receiver(post_save, sender=BlogPost)
+def queue_blogpost_image_variants(sender, instance, **kwargs):
+    queue_image_variants(instance, 'image')
+
+
+
+# WAL is kept in the SQLite file, so it is switched on once by migrate (the
+# release step) rather than by every connection's init_command
+
+@receiver(post_migrate)
+def enable_sqlite_wal(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.label == 'myapp' and connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
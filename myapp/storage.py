@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+
+try:
+    import brotli
+except ImportError:  # only the .gz siblings are written
+    brotli = None
+
+# Text assets worth precompressing; images and fonts already are compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico'}
+COMPRESSORS = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+if brotli is not None:
+    COMPRESSORS.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+
+def file_digest(content):
+    hasher = hashlib.sha256()
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that names uploaded files after the SHA-256 of their
+    contents (``profile_pictures/<digest>.jpg``), so identical uploads are
+    stored once and every later copy points at the existing file.
+
+    Image variants (myapp.images) are named after their source's digest by
+    the app itself. Names of both kinds stand for their contents, so they
+    are never given a ``_XXXXXXX`` suffix: two processes writing the same
+    name at once write the same bytes, through a temporary file that is
+    renamed into place, and both get the name they asked for.
+    """
+
+    content_addressed_directories = ('derivatives/',)
+
+    def is_content_addressed(self, name):
+        return name.startswith(self.content_addressed_directories)
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if isinstance(content, UploadedFile):
+            # LimitedUploadHandler hashes the upload while receiving it
+            digest = getattr(content, 'sha256', None) or file_digest(content)
+            directory, filename = os.path.split(name)
+            name = os.path.join(directory, digest + os.path.splitext(filename)[1].lower())
+        elif not self.is_content_addressed(name):
+            return super()._save(name, content)
+        if self.exists(name):
+            return name
+        return self._replace(name, content)
+
+    def _replace(self, name, content):
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            # mkstemp creates the file readable by its owner only
+            os.chmod(temp_path, 0o644 if self.file_permissions_mode is None else self.file_permissions_mode)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return name
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes gzip (``.gz``) and, with the
+    brotli package installed, brotli (``.br``) siblings of text assets during
+    collectstatic, for myapp.serving to send to clients that accept them.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in names:
+                self.write_compressed(name)
+
+    def write_compressed(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for suffix, compress in COMPRESSORS:
+            compressed = compress(data)
+            # A sibling that saves almost nothing only costs a stat per request
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
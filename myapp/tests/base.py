@@ -0,0 +1,75 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from myapp import cache
+from myapp.models import Appointment, BlogPost, Category, CustomUser, Doctor, Profile
+from myapp.search import SEARCH_INDEXES
+
+
+# In-memory caches rather than the file cache a run would share with the
+# next one
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'shared'},
+}
+
+
+# Image variants inline, so nothing is left queued between tests; the
+# in-memory calendar; a fast hasher, since the tests create many users
+@override_settings(
+    CACHES=TEST_CACHES,
+    IMAGE_VARIANTS_IN_BACKGROUND=False,
+    CALENDAR_BACKEND='fake',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class AppTestCase(TestCase):
+    """
+    A TestCase that starts each test with empty caches. The database is
+    rolled back after every test but the caches are not, and a cached feed
+    or generation left behind would otherwise leak into the next test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+        cache._local_payloads.clear()
+        for index in SEARCH_INDEXES.values():
+            index._memory = None
+
+    def commit(self):
+        """Run the on-commit callbacks (generation bumps, cache deletes) of what the block writes."""
+        return self.captureOnCommitCallbacks(execute=True)
+
+
+def make_category(name):
+    return Category.objects.create(name=name)
+
+
+def make_user(username, role='patient', city='Pune', state='Maharashtra', pincode=411001, **fields):
+    user = CustomUser.objects.create_user(
+        username=username, email=f'{username}@example.com', password='password',
+        first_name=fields.pop('first_name', username.title()), last_name=fields.pop('last_name', 'Test'),
+        is_patient=(role == 'patient'), is_doctor=(role == 'doctor'), **fields,
+    )
+    Profile.objects.create(user=user, address='12 MG Road', city=city, state=state, pincode=pincode)
+    return user
+
+
+def make_doctor(username, categories=(), **fields):
+    user = make_user(username, role='doctor', **fields)
+    doctor = Doctor.objects.create(profile=user.profile, establishment_name='Clinic')
+    doctor.categories.set(categories)
+    return doctor
+
+
+def make_post(doctor, categories=(), draft=False, title='A post'):
+    post = BlogPost.objects.create(author=doctor, title=title, summary='word ' * 30, content='body', draft=draft)
+    post.categories.set(categories)
+    return post
+
+
+def make_appointment(patient, doctor_user, date=datetime.date(2030, 1, 7), start=datetime.time(10), end=datetime.time(10, 30)):
+    return Appointment.objects.create(patient=patient, doctor=doctor_user, date=date, start_time=start, end_time=end)
@@ -0,0 +1,65 @@
+import datetime
+
+from django.test import override_settings
+
+from myapp.models import Appointment, Profile
+from myapp.serializers import AppointmentDetailSerializer
+
+from .base import AppTestCase, make_appointment, make_doctor, make_user
+
+
+class AppointmentListTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctors = [make_doctor(f'doctor{n}') for n in range(6)]
+        cls.patient = make_user('patient')
+        for n in range(24):
+            doctor = cls.doctors[n % len(cls.doctors)].profile.user
+            make_appointment(cls.patient, doctor, date=datetime.date(2030, 1, 1 + n // 4), start=datetime.time(9 + n % 4))
+
+    def test_one_query_per_page(self):
+        for path, total in ((f'/appointments/?user_id={self.patient.pk}', 24),
+                            (f'/doc-appointments/?user_id={self.doctors[0].profile.user_id}', 4)):
+            for limit in (2, 10):
+                with self.subTest(path=path, limit=limit), self.assertNumQueries(1):
+                    response = self.client.get(f'{path}&limit={limit}')
+                self.assertEqual(len(response.json()['appointments']), min(limit, total))
+            # The unpaged history is one query too, however long it is
+            with self.subTest(path=path), self.assertNumQueries(1):
+                self.client.get(path)
+
+    def test_cursor_walks_history_in_order(self):
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            page = self.client.get(f'/appointments/?user_id={self.patient.pk}&limit=5&cursor={cursor}').json()
+            seen.extend((row['date'], row['start_time']) for row in page['appointments'])
+            cursor = page['next_cursor']
+        self.assertEqual(len(seen), 24)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_bad_page_params_are_400s(self):
+        for path in ('/appointments/', '/doc-appointments/', '/async/appointments/', '/async/doc-appointments/'):
+            for limit in ('abc', '-1', '0'):
+                with self.subTest(path=path, limit=limit):
+                    response = self.client.get(path, {'user_id': self.patient.pk, 'limit': limit})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('limit', response.json())
+        for params in ({'limit': 'abc'}, {'offset': 'abc'}, {'offset': '-1'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/blogposts/search/', {'q': 'post', **params}).status_code, 400)
+
+    @override_settings(STRICT_PRELOADING=True)
+    def test_lazy_load_raises_with_strict_preloading(self):
+        with self.assertRaisesMessage(AssertionError, 'was not preloaded'):
+            AppointmentDetailSerializer(Appointment.objects.all(), many=True).data
+        # The views' queryset preloads everything the serializer reads
+        with self.assertNumQueries(1):
+            AppointmentDetailSerializer(Appointment.objects.with_participants(), many=True).data
+
+    def test_missing_picture_falls_back_to_the_placeholder(self):
+        Profile.objects.filter(user=self.patient).update(profile_picture='')
+        # Under DEBUG=False, as in the tests, a static() URL would need the
+        # file in the static manifest
+        data = AppointmentDetailSerializer(Appointment.objects.with_participants().first()).data
+        self.assertEqual(data['patient_profile'], '/media/profile-default.png')
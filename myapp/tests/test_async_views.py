@@ -0,0 +1,45 @@
+import datetime
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from myapp import cache
+
+from .base import AppTestCase, make_appointment, make_category, make_doctor, make_post, make_user
+
+
+class AsyncViewTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = make_category('Cardiology')
+        cls.doctors = [make_doctor(f'drasync{n}', [cls.category]) for n in range(3)]
+        cls.patient = make_user('asyncpatient')
+        for n, doctor in enumerate(cls.doctors):
+            make_post(doctor, [cls.category], title=f'Post {n}')
+            make_post(doctor, draft=True)
+            make_appointment(cls.patient, doctor.profile.user, date=datetime.date(2030, 1, 1 + n))
+
+    def get_uncached(self, path, params):
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+        cache._local_payloads.clear()
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, path)
+        return response.json()
+
+    @override_settings(STRICT_PRELOADING=True)
+    def test_same_json_as_the_sync_views(self):
+        doctor_user = self.doctors[0].profile.user
+        for path, params in (
+            ('/blogposts/', {}),
+            ('/blogposts/', {'cursor': '', 'limit': 2}),
+            ('/filtered_blogposts/', {'categories[]': self.category.pk}),
+            ('/doctors/', {'limit': 2}),
+            ('/doctors/', {'location': 'pune'}),
+            ('/user-details/', {'user_id': doctor_user.pk}),
+            ('/user-details/', {'user_id': self.patient.pk}),
+            ('/appointments/', {'user_id': self.patient.pk, 'limit': 2}),
+            ('/doc-appointments/', {'user_id': doctor_user.pk}),
+        ):
+            with self.subTest(path=path, params=params):
+                self.assertEqual(self.get_uncached(f'/async{path}', params), self.get_uncached(path, params))
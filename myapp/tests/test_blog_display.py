@@ -0,0 +1,42 @@
+from myapp.models import BlogPost
+
+from .base import AppTestCase, make_category, make_doctor, make_post
+
+
+class BlogDisplayFieldTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.heart = make_category('Heart')
+        self.skin = make_category('Skin')
+        self.doctor = make_doctor('drdisplay', first_name='Asha', last_name='Rao')
+        self.post = make_post(self.doctor, categories=[self.skin, self.heart])
+
+    def display(self):
+        post = BlogPost.objects.get(pk=self.post.pk)
+        return post.author_display_name, post.category_names
+
+    def test_filled_on_save(self):
+        post = BlogPost.objects.get(pk=self.post.pk)
+        self.assertEqual(post.truncated_summary, ' '.join(['word'] * 15) + '...')
+        self.assertEqual(self.display(), ('Asha Rao', ['Heart', 'Skin']))
+
+    def test_categories_follow_both_sides_of_the_relation(self):
+        self.post.categories.remove(self.skin)
+        self.assertEqual(self.display()[1], ['Heart'])
+
+        self.heart.name = 'Cardiology'
+        self.heart.save()
+        self.assertEqual(self.display()[1], ['Cardiology'])
+
+        self.skin.blogpost_set.add(self.post)
+        self.assertEqual(self.display()[1], ['Cardiology', 'Skin'])
+
+        self.skin.blogpost_set.clear()
+        self.heart.delete()
+        self.assertEqual(self.display()[1], [])
+
+    def test_author_rename_updates_posts(self):
+        user = self.doctor.profile.user
+        user.last_name = 'Iyer'
+        user.save()
+        self.assertEqual(self.display()[0], 'Asha Iyer')
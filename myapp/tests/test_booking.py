@@ -0,0 +1,114 @@
+import datetime
+import threading
+
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase, override_settings
+
+from myapp.availability import SlotUnavailable, book_appointment
+from myapp.models import Appointment
+
+from .base import TEST_CACHES, AppTestCase, make_appointment, make_doctor, make_user
+
+DAY = datetime.date(2030, 1, 7)
+
+
+class BookingTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor('doctor').profile.user
+        self.patient = make_user('patient')
+        make_appointment(self.patient, self.doctor, date=DAY, start=datetime.time(10), end=datetime.time(11))
+
+    def book(self, start, end=None, **fields):
+        return self.client.post('/book-appointment/', {
+            'access_token': 'token', 'user_id': self.patient.pk, 'doctor_id': self.doctor.pk,
+            'date': DAY.isoformat(), 'start_time': start, **({'end_time': end} if end else {}), **fields,
+        })
+
+    def test_overlapping_booking_is_a_conflict(self):
+        for start, end in (('10:00', '10:30'), ('09:30', '10:15'), ('10:45', None), ('09:00', '12:00')):
+            with self.subTest(start=start, end=end):
+                response = self.book(start, end)
+                self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_adjacent_booking_is_accepted(self):
+        self.assertEqual(self.book('11:00').status_code, 201)
+        self.assertEqual(self.book('09:30', '10:00').status_code, 201)
+        # Without an end time the slot takes APPOINTMENT_SLOT_MINUTES
+        self.assertEqual(self.book('11:15').status_code, 409)
+
+    def test_invalid_booking_returns_field_errors(self):
+        response = self.book('25:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ['start_time'])
+
+        response = self.book('12:00', '11:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.json())
+
+        response = self.book('12:00', doctor_id=999999)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'doctor_id': ['User not found.']})
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_bad_user_id_on_appointment_lists(self):
+        for path in ('/appointments/', '/doc-appointments/', '/async/appointments/'):
+            with self.subTest(path=path):
+                response = self.client.get(path, {'user_id': 'abc'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('user_id', response.json())
+
+    def test_bulk_booking_reports_conflicts_per_item(self):
+        response = self.client.post('/book-appointments/bulk/', {
+            'access_token': 'token',
+            'appointments': [
+                {'user_id': self.patient.pk, 'doctor_id': self.doctor.pk, 'date': DAY.isoformat(), 'start_time': '12:00'},
+                {'user_id': self.patient.pk, 'doctor_id': self.doctor.pk, 'date': DAY.isoformat(), 'start_time': '12:15'},
+                {'user_id': self.patient.pk, 'doctor_id': self.doctor.pk, 'date': DAY.isoformat(), 'start_time': '10:30'},
+            ],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item['status'] for item in response.json()['results']], ['created', 'conflict', 'conflict'])
+
+    def test_availability_leaves_out_booked_time(self):
+        response = self.client.get(f'/doctors/{self.doctor.pk}/availability/?from={DAY.isoformat()}')
+        day = response.json()['days'][0]
+        self.assertEqual(day['free'], [{'start': '09:00', 'end': '10:00'}, {'start': '11:00', 'end': '18:00'}])
+        self.assertNotIn('10:30', day['slots'])
+        self.assertIn('11:00', day['slots'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConcurrentBookingTests(TransactionTestCase):
+    """Threads racing for the same slot: exactly one of them gets it."""
+
+    THREADS = 8
+
+    def test_race_for_one_slot(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot share an in-memory SQLite database with write locking')
+        doctor = make_doctor('doctor').profile.user
+        patients = [make_user(f'patient{n}') for n in range(self.THREADS)]
+        barrier = threading.Barrier(self.THREADS)
+        outcomes = []
+
+        def book(patient):
+            try:
+                barrier.wait()
+                book_appointment(patient, doctor, DAY, datetime.time(10), None)
+                outcomes.append('booked')
+            except SlotUnavailable:
+                outcomes.append('conflict')
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(patient,)) for patient in patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['booked'] + ['conflict'] * (self.THREADS - 1))
+        self.assertEqual(Appointment.objects.filter(doctor=doctor).count(), 1)
@@ -0,0 +1,77 @@
+import datetime
+
+from django.test import override_settings
+
+from myapp.google_calendar import FakeCalendarService
+from myapp.models import Appointment, CalendarSyncTask
+from myapp.views import MAX_BULK_APPOINTMENTS
+
+from .base import AppTestCase, make_doctor, make_user
+
+
+@override_settings(CALENDAR_BACKEND='fake')
+class BulkAppointmentBookingTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        FakeCalendarService._shared = None
+        self.addCleanup(setattr, FakeCalendarService, '_shared', None)
+        self.calendar = FakeCalendarService.shared()
+        self.doctor = make_doctor('drbulk').profile.user
+        self.patient = make_user('bulkpatient')
+
+    def item(self, n, **fields):
+        start = datetime.datetime(2030, 1, 7, 9) + datetime.timedelta(hours=n)
+        return {
+            'user_id': self.patient.pk, 'doctor_id': self.doctor.pk,
+            'date': str(start.date()), 'start_time': start.strftime('%H:%M'), **fields,
+        }
+
+    def book(self, items):
+        return self.client.post(
+            '/book-appointments/bulk/', {'access_token': 'token', 'appointments': items}, content_type='application/json',
+        )
+
+    def test_events_are_inserted_in_batches_of_fifty(self):
+        response = self.book([self.item(n) for n in range(120)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 120)
+        self.assertEqual(self.calendar.batch_sizes, [50, 50, 20])
+        self.assertEqual(len(self.calendar.events_by_id), 120)
+        self.assertEqual(Appointment.objects.filter(calendar_sync_status=Appointment.SYNC_SYNCED).count(), 120)
+
+    def test_item_failures_map_to_calendar_sync_status(self):
+        # The first insert hits a transient error, the second a permanent one
+        self.calendar.fail_next.extend([503, 403])
+        with self.assertLogs('myapp.google_calendar', 'WARNING'):
+            response = self.book([self.item(n) for n in range(60)])
+        self.assertEqual(response.status_code, 201)
+        statuses = [result['calendar_sync_status'] for result in response.json()['results']]
+        self.assertEqual(statuses[:3], [Appointment.SYNC_PENDING, Appointment.SYNC_FAILED, Appointment.SYNC_SYNCED])
+        self.assertEqual(statuses.count(Appointment.SYNC_SYNCED), 58)
+        self.assertEqual(self.calendar.batch_sizes, [50, 10])
+        # Only the transient failure is left for the worker to retry
+        self.assertEqual(CalendarSyncTask.objects.filter(status=CalendarSyncTask.PENDING).count(), 1)
+
+    def test_mixed_results_are_a_multi_status(self):
+        response = self.book([
+            self.item(0),
+            self.item(1, end_time='08:00'),
+            self.item(2, doctor_id=self.doctor.pk + 1000),
+        ])
+        self.assertEqual(response.status_code, 207)
+        body = response.json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([result['status'] for result in body['results']], ['created', 'invalid', 'invalid'])
+        self.assertIn('doctor_id', body['results'][2]['errors'])
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_rejects_more_than_the_cap(self):
+        response = self.book([self.item(0)] * (MAX_BULK_APPOINTMENTS + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(self.calendar.batch_sizes, [])
+
+    def test_nothing_valid_is_a_bad_request(self):
+        response = self.book([self.item(0, user_id='x')])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
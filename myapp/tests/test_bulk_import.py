@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from myapp.cache import get_generation
+from myapp.models import BlogPost, Category, CustomUser, Doctor, Profile
+
+from .base import AppTestCase
+
+DOCTOR_COLUMNS = ['username', 'email', 'first_name', 'last_name', 'address', 'city', 'state', 'pincode', 'categories']
+
+
+def doctor_row(n, **fields):
+    return {
+        'username': f'drimport{n}', 'email': f'drimport{n}@example.com', 'first_name': 'Asha',
+        'last_name': f'Rao{n}', 'address': f'{n} Linking Road', 'city': '  Navi   Mumbai ',
+        'state': 'Maharashtra', 'pincode': 400703, 'categories': 'Cardiology;Neurology', **fields,
+    }
+
+
+class BulkImportTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.directory = directory
+
+    def write_csv(self, rows, name='doctors.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, DOCTOR_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def write_jsonl(self, rows, name='posts.jsonl'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.writelines(json.dumps(row) + '\n' for row in rows)
+        return path
+
+    def run_import(self, kind, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        with self.commit():
+            call_command('bulk_import', kind, path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_fills_materialized_fields(self):
+        generation = get_generation('doctor')
+        stdout, _ = self.run_import('doctors', self.write_csv([doctor_row(n) for n in range(5)]), '--batch-size', '2')
+        self.assertIn('Imported 5 doctors', stdout)
+        self.assertIn('rejected 0', stdout)
+        self.assertEqual(Doctor.objects.count(), 5)
+        self.assertEqual(sorted(Category.objects.values_list('name', flat=True)), ['Cardiology', 'Neurology'])
+        self.assertEqual(Doctor.categories.through.objects.count(), 10)
+        self.assertGreater(get_generation('doctor'), generation)
+
+        profile = Profile.objects.get(user__username='drimport3')
+        self.assertEqual((profile.city_normalized, profile.state_normalized), ('navi mumbai', 'maharashtra'))
+        # The address index was updated for the bulk-created rows
+        self.assertEqual(list(Profile.objects.in_location('3 linking')), [profile])
+
+        stdout, _ = self.run_import('posts', self.write_jsonl([
+            {'author': 'drimport3', 'title': 'Imported', 'summary': 'word ' * 20, 'content': 'C',
+             'categories': ['Neurology', 'Cardiology'], 'created_at': '2030-01-01T10:00:00'},
+        ]))
+        self.assertIn('Imported 1 posts', stdout)
+        post = BlogPost.objects.get()
+        self.assertEqual(post.author_display_name, 'Asha Rao3')
+        self.assertEqual(post.category_names, ['Cardiology', 'Neurology'])
+        self.assertEqual(post.truncated_summary, ' '.join(['word'] * 15) + '...')
+        self.assertEqual(post.created_at.year, 2030)
+        self.assertEqual([row['title'] for row in self.client.get('/blogposts/search/', {'q': 'imported'}).json()['blogposts']],
+                         ['Imported'])
+
+    def test_invalid_row_stops_the_import_without_its_batch(self):
+        rows = [doctor_row(n) for n in range(3)] + [doctor_row(3, pincode='not a number'), doctor_row(4)]
+        with self.assertRaisesMessage(CommandError, 'line 5: pincode must be a whole number (2 rows were imported before it)'):
+            self.run_import('doctors', self.write_csv(rows), '--batch-size', '2')
+        # The first batch stays; the one the bad row was in is not written
+        self.assertEqual(sorted(CustomUser.objects.values_list('username', flat=True)), ['drimport0', 'drimport1'])
+
+    def test_skip_invalid_reports_and_imports_the_rest(self):
+        rows = [doctor_row(0), doctor_row(1, pincode='x'), doctor_row(2, city=''), doctor_row(3)]
+        stdout, stderr = self.run_import('doctors', self.write_csv(rows), '--skip-invalid')
+        self.assertIn('Imported 2 doctors', stdout)
+        self.assertIn('rejected 2', stdout)
+        self.assertEqual(stderr.splitlines(), ['line 3: pincode must be a whole number', 'line 4: city is required'])
+        self.assertEqual(Doctor.objects.count(), 2)
+
+    def test_rerun_changes_nothing(self):
+        path = self.write_csv([doctor_row(n) for n in range(3)])
+        self.run_import('doctors', path)
+        stdout, stderr = self.run_import('doctors', path, '--skip-invalid')
+        self.assertIn('Imported 0 doctors', stdout)
+        self.assertIn('rejected 3', stdout)
+        self.assertIn('line 2: username drimport0 is already taken', stderr)
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Doctor.categories.through.objects.count(), 6)
@@ -0,0 +1,182 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+
+from myapp.pagination import MAX_PAGE_SIZE
+
+from .base import AppTestCase, make_category, make_doctor, make_post, make_user
+
+
+class FeedCacheTests(AppTestCase):
+    """Cached feeds and the category list change as soon as what they show does."""
+
+    def setUp(self):
+        super().setUp()
+        with self.commit():
+            self.heart = make_category('Cardiology')
+            self.doctor = make_doctor('drcache', first_name='Asha', last_name='Rao')
+            self.post = make_post(self.doctor, categories=[self.heart], title='First post')
+
+    def feed(self, path='/blogposts/'):
+        return self.client.get(path).json()['blogposts']
+
+    def titles(self, path='/blogposts/'):
+        return [post['title'] for post in self.feed(path)]
+
+    def test_conditional_requests(self):
+        response = self.client.get('/blogposts/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/blogposts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.commit():
+            make_post(self.doctor, title='Second post')
+        response = self.client.get('/blogposts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_post_create_edit_and_delete(self):
+        self.assertEqual(self.titles(), ['First post'])
+
+        with self.commit():
+            second = make_post(self.doctor, title='Second post')
+        self.assertEqual(self.titles(), ['Second post', 'First post'])
+
+        with self.commit():
+            second.title = 'Second post, edited'
+            second.save()
+        self.assertEqual(self.titles(), ['Second post, edited', 'First post'])
+
+        with self.commit():
+            second.draft = True
+            second.save()
+        self.assertEqual(self.titles(), ['First post'])
+
+        with self.commit():
+            self.post.delete()
+        self.assertEqual(self.titles(), [])
+
+    def test_author_rename(self):
+        self.assertEqual(self.feed()[0]['author_name'], 'Asha Rao')
+
+        user = self.doctor.profile.user
+        with self.commit():
+            user.last_name = 'Iyer'
+            user.save()
+        self.assertEqual(self.feed()[0]['author_name'], 'Asha Iyer')
+        self.assertEqual(self.feed('/filtered_blogposts/')[0]['author_name'], 'Asha Iyer')
+
+    def test_category_rename_and_delete(self):
+        self.assertEqual(self.feed('/filtered_blogposts/')[0]['categories'], ['Cardiology'])
+
+        with self.commit():
+            self.heart.name = 'Heart'
+            self.heart.save()
+        response = self.client.get('/filtered_blogposts/').json()
+        self.assertEqual(response['blogposts'][0]['categories'], ['Heart'])
+        self.assertEqual([category['name'] for category in response['categories']], ['Heart'])
+        self.assertEqual(self.feed()[0]['categories'], ['Heart'])
+
+        with self.commit():
+            self.heart.delete()
+        response = self.client.get('/filtered_blogposts/').json()
+        self.assertEqual(response['blogposts'][0]['categories'], [])
+        self.assertEqual(response['categories'], [])
+
+    def test_post_category_change(self):
+        skin = make_category('Dermatology')
+        with self.commit():
+            self.post.categories.set([skin])
+        self.assertEqual(self.feed()[0]['categories'], ['Dermatology'])
+        self.assertEqual(self.titles(f'/filtered_blogposts/?categories[]={self.heart.pk}'), [])
+        self.assertEqual(self.titles(f'/filtered_blogposts/?categories[]={skin.pk}'), ['First post'])
+
+
+class CategoryListCacheTests(AppTestCase):
+    def test_categories_follow_writes(self):
+        with self.commit():
+            category = make_category('Cardiology')
+        response = self.client.get('/categories/')
+        self.assertEqual([item['name'] for item in response.json()], ['Cardiology'])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/categories/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.commit():
+            category.name = 'Heart'
+            category.save()
+            make_category('Neurology')
+        response = self.client.get('/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.json()], ['Heart', 'Neurology'])
+
+        with self.commit():
+            category.delete()
+        self.assertEqual([item['name'] for item in self.client.get('/categories/').json()], ['Neurology'])
+
+    def test_cached_list_is_one_shared_cache_read(self):
+        self.client.get('/categories/')
+        shared = caches['shared']
+        with mock.patch.object(shared, 'get_many', wraps=shared.get_many) as get_many, \
+                mock.patch.object(shared, 'get_or_set', wraps=shared.get_or_set) as get_or_set:
+            self.assertEqual(self.client.get('/categories/').status_code, 200)
+        # The generation and its bump time, together
+        self.assertEqual((get_many.call_count, get_or_set.call_count), (1, 0))
+
+    def test_rendered_payload_expires(self):
+        self.client.get('/categories/')
+        shared = caches['shared']
+        # Payloads of old generations do not pile up in the shared cache
+        expires = shared._expire_info[shared.make_key('rendered:category:1')]
+        self.assertLessEqual(expires, time.time() + 10 * 60)
+
+
+class UserDetailsCacheTests(AppTestCase):
+    """The per-user details cache follows writes to the user, profile and doctor."""
+
+    def setUp(self):
+        super().setUp()
+        with self.commit():
+            self.heart = make_category('Cardiology')
+            self.doctor = make_doctor('drdetails', categories=[self.heart])
+            self.patient = make_user('ptdetails')
+        self.user_id = self.doctor.profile.user_id
+
+    def details(self, user_ids):
+        return self.client.get('/user-details/', {'user_ids': ','.join(map(str, user_ids))}).json()
+
+    def test_details_follow_writes(self):
+        self.assertEqual(self.details([self.user_id])[0]['doctor_profile']['categories'], ['Cardiology'])
+
+        with self.commit():
+            profile = self.doctor.profile
+            profile.city = 'Mumbai'
+            profile.save()
+            self.doctor.establishment_name = 'Heart Clinic'
+            self.doctor.save()
+        data = self.details([self.user_id])[0]
+        self.assertEqual((data['city'], data['doctor_profile']['establishment_name']), ('Mumbai', 'Heart Clinic'))
+
+        with self.commit():
+            self.heart.name = 'Heart'
+            self.heart.save()
+        self.assertEqual(self.details([self.user_id])[0]['doctor_profile']['categories'], ['Heart'])
+
+        with self.commit():
+            self.heart.doctor_set.clear()
+        self.assertEqual(self.details([self.user_id])[0]['doctor_profile']['categories'], [])
+
+        patient_id = self.patient.pk
+        self.details([patient_id])
+        with self.commit():
+            self.patient.delete()
+        self.assertEqual([row['id'] for row in self.details([patient_id, self.user_id])], [self.user_id])
+
+    def test_bulk_keeps_the_requested_order(self):
+        self.assertEqual([row['id'] for row in self.details([self.patient.pk, 0, self.user_id, self.patient.pk])],
+                         [self.patient.pk, self.user_id])
+        self.assertEqual(self.client.get('/user-details/', {'user_ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.client.get('/user-details/', {'user_ids': ','.join(['1'] * (MAX_PAGE_SIZE + 1))}).status_code, 400)
@@ -0,0 +1,92 @@
+import datetime
+
+from django.contrib import admin
+from django.test import RequestFactory
+from django.utils import timezone
+
+from myapp.google_calendar import FakeCalendarService, build_event, enqueue_calendar_sync, sync_tasks
+from myapp.models import Appointment, CalendarSyncTask
+
+from .base import AppTestCase, make_appointment, make_doctor, make_user
+
+
+class CalendarSyncTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        FakeCalendarService._shared = None
+        self.addCleanup(setattr, FakeCalendarService, '_shared', None)
+        self.doctor = make_doctor('drcal').profile.user
+        self.patient = make_user('calpatient')
+
+    def sync(self, appointment, fail_with=None):
+        task = enqueue_calendar_sync(appointment, 'secret-token')
+        if fail_with:
+            FakeCalendarService.shared().fail_next.append(fail_with)
+            with self.assertLogs('myapp.google_calendar', 'WARNING'):
+                sync_tasks([task])
+        else:
+            sync_tasks([task])
+        task.refresh_from_db()
+        return task
+
+    def test_synced_event_is_linked(self):
+        appointment = make_appointment(self.patient, self.doctor)
+        task = self.sync(appointment)
+        appointment.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (CalendarSyncTask.DONE, 1))
+        self.assertEqual(appointment.calendar_sync_status, Appointment.SYNC_SYNCED)
+        self.assertEqual(
+            appointment.google_event_link,
+            f'https://calendar.google.com/event?eid={task.idempotency_key}',
+        )
+
+    def test_retryable_error_backs_off(self):
+        appointment = make_appointment(self.patient, self.doctor)
+        task = self.sync(appointment, fail_with=503)
+        appointment.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (CalendarSyncTask.PENDING, 1))
+        self.assertGreater(task.next_attempt_at, timezone.now() + datetime.timedelta(seconds=1))
+        self.assertEqual(appointment.calendar_sync_status, Appointment.SYNC_PENDING)
+
+    def test_client_error_fails_for_good(self):
+        appointment = make_appointment(self.patient, self.doctor)
+        task = self.sync(appointment, fail_with=403)
+        appointment.refresh_from_db()
+        self.assertEqual(task.status, CalendarSyncTask.FAILED)
+        self.assertEqual(appointment.calendar_sync_status, Appointment.SYNC_FAILED)
+
+    def test_retry_after_a_lost_response_reuses_the_event(self):
+        task = enqueue_calendar_sync(make_appointment(self.patient, self.doctor), 'secret-token')
+        # The first insert went through but its response never arrived
+        FakeCalendarService.shared().events().insert(calendarId='primary', body={'id': task.idempotency_key}).execute()
+        self.assertEqual(sync_tasks([task]), {task.pk: Appointment.SYNC_SYNCED})
+        self.assertEqual(len(FakeCalendarService.shared().events_by_id), 1)
+
+    def test_event_without_end_time_takes_a_slot(self):
+        appointment = make_appointment(self.patient, self.doctor, start=datetime.time(23, 45), end=None)
+        appointment = Appointment.objects.with_participants().get(pk=appointment.pk)
+        event = build_event(appointment)
+        self.assertEqual(event['start']['dateTime'], '2030-01-07T23:45:00')
+        self.assertEqual(event['end']['dateTime'], '2030-01-08T00:15:00')
+
+        appointment.end_time = datetime.time(23, 55)
+        self.assertEqual(build_event(appointment)['end']['dateTime'], '2030-01-07T23:55:00')
+
+    def test_token_is_cleared_once_synced(self):
+        task = self.sync(make_appointment(self.patient, self.doctor))
+        self.assertEqual((task.status, task.access_token), (CalendarSyncTask.DONE, ''))
+
+    def test_token_is_kept_for_retries_only(self):
+        task = self.sync(make_appointment(self.patient, self.doctor), fail_with=503)
+        self.assertEqual((task.status, task.access_token), (CalendarSyncTask.PENDING, 'secret-token'))
+
+        task = self.sync(make_appointment(self.patient, self.doctor, start=datetime.time(12)), fail_with=403)
+        self.assertEqual((task.status, task.access_token), (CalendarSyncTask.FAILED, ''))
+
+    def test_admin_does_not_show_the_token(self):
+        request = RequestFactory().get('/admin/')
+        request.user = make_user('admin', is_staff=True, is_superuser=True)
+        task = enqueue_calendar_sync(make_appointment(self.patient, self.doctor), 'secret-token')
+        model_admin = admin.site._registry[CalendarSyncTask]
+        self.assertNotIn('access_token', model_admin.get_fields(request, task))
+        self.assertNotIn('access_token', model_admin.get_list_display(request))
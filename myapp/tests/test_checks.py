@@ -0,0 +1,48 @@
+import os
+from unittest import mock
+
+from django.core.checks import run_checks
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from Medi_BE.settings import BASE_DIR, shared_cache_config
+from myapp.checks import check_shared_cache
+
+
+def shared_cache(url):
+    return override_settings(
+        SHARED_CACHE_URL=url,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'shared': shared_cache_config(url)},
+    )
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def error_ids(self):
+        return [error.id for error in check_shared_cache(None)]
+
+    def test_default_is_shared_between_workers(self):
+        config = shared_cache_config('')
+        self.assertEqual(config['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertEqual(config['LOCATION'], os.path.join(BASE_DIR, '.cache', 'shared'))
+        with shared_cache(''), mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+            self.assertEqual(self.error_ids(), [])
+
+    def test_unknown_scheme_is_refused(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "'memcached://127.0.0.1' is not"):
+            shared_cache_config('memcached://127.0.0.1')
+
+    def test_explicit_locmem_needs_a_single_worker(self):
+        with shared_cache('locmem://'):
+            with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '1'}):
+                self.assertEqual(self.error_ids(), [])
+            with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+                self.assertEqual(self.error_ids(), ['myapp.E002'])
+                # A deployment check only
+                self.assertIn('myapp.E002', [error.id for error in run_checks(include_deployment_checks=True)])
+                self.assertNotIn('myapp.E002', [error.id for error in run_checks()])
+
+    def test_shared_backends_pass(self):
+        for url in ('redis://127.0.0.1:6379/1', 'db://medi_cache', 'file:///var/tmp/medi_cache'):
+            with self.subTest(url=url), shared_cache(url):
+                self.assertEqual(self.error_ids(), [])
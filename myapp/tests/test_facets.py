@@ -0,0 +1,64 @@
+from myapp.models import CategoryCounts
+
+from .base import AppTestCase, make_category, make_doctor, make_post
+
+
+class FacetCountTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cardiology = make_category('Cardiology')
+        self.neurology = make_category('Neurology')
+        self.skin = make_category('Dermatology')
+
+    def facets(self, path):
+        return {int(pk): count for pk, count in self.client.get(path).json()['category_counts'].items()}
+
+    def test_registered_doctor_is_counted(self):
+        response = self.client.post('/register/', {
+            'username': 'drnew', 'email': 'drnew@example.com', 'password': 'secret-pass-1',
+            'first_name': 'New', 'last_name': 'Doctor', 'select_role': 'doctor',
+            'address': '1 Park Street', 'city': 'Pune', 'state': 'Maharashtra', 'pincode': 411001,
+            'categories': [self.cardiology.pk, self.neurology.pk], 'establishment_name': 'Clinic',
+        })
+        self.assertEqual(response.status_code, 201)
+
+        expected = {self.cardiology.pk: 1, self.neurology.pk: 1, self.skin.pk: 0}
+        self.assertEqual(self.facets('/doctors/'), expected)
+        # The counter table and the grouped query agree
+        self.assertEqual(self.facets('/doctors/?location=pune'), expected)
+
+    def test_filtered_counts_follow_filters(self):
+        make_doctor('a', [self.cardiology, self.neurology])
+        make_doctor('b', [self.cardiology], city='Mumbai', state='Maharashtra', pincode=400001)
+        self.assertEqual(
+            self.facets(f'/doctors/?categories[]={self.neurology.pk}'),
+            {self.cardiology.pk: 1, self.neurology.pk: 1, self.skin.pk: 0},
+        )
+        self.assertEqual(
+            self.facets('/doctors/?location=mumbai'),
+            {self.cardiology.pk: 1, self.neurology.pk: 0, self.skin.pk: 0},
+        )
+
+    def test_counters_follow_writes(self):
+        doctor = make_doctor('a', [self.cardiology])
+        post = make_post(doctor, [self.cardiology, self.skin])
+        make_post(doctor, [self.skin], draft=True)
+
+        def counts():
+            return {row.category_id: (row.doctors, row.published_posts) for row in CategoryCounts.objects.all()}
+
+        self.assertEqual(counts()[self.cardiology.pk], (1, 1))
+        self.assertEqual(counts()[self.skin.pk], (0, 1))
+
+        doctor.categories.remove(self.cardiology)
+        self.skin.doctor_set.add(doctor)
+        post.draft = True
+        post.save()
+        self.assertEqual(counts()[self.cardiology.pk], (0, 0))
+        self.assertEqual(counts()[self.skin.pk], (1, 0))
+
+        doctor.delete()
+        self.assertEqual(counts()[self.skin.pk], (0, 0))
+        self.assertEqual(
+            self.facets('/filtered_blogposts/'), {self.cardiology.pk: 0, self.neurology.pk: 0, self.skin.pk: 0}
+        )
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import BaseSerializer
+
+from myapp import metrics
+
+from .base import AppTestCase, make_doctor, make_post
+
+
+class MetricsTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.REGISTRY.reset()
+        self.addCleanup(metrics.REGISTRY.reset)
+
+    def series(self, name, route):
+        return metrics.REGISTRY.snapshot()['histograms'][name][(route, 'GET')]
+
+    def test_serializer_time_without_patching_drf(self):
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+        make_post(make_doctor('drmetrics'))
+        self.client.get('/blogposts/')
+        serializer_seconds = self.series('http_request_serializer_seconds', 'blogposts/')
+        self.assertEqual(sum(serializer_seconds[:-1]), 1)
+        self.assertGreater(serializer_seconds[-1], 0)
+
+    def test_query_count_matches_the_queries_run(self):
+        make_post(make_doctor('drmetrics'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/blogposts/')
+        self.assertEqual(self.series('http_request_queries', 'blogposts/')[-1], len(queries))
+        self.assertEqual(metrics.REGISTRY.snapshot()['requests'], {('blogposts/', 'GET', 200): 1})
+
+    def test_unmatched_paths_share_a_label(self):
+        for path in ('/no-such-page/', '/wp-login.php'):
+            self.client.get(path)
+        self.assertEqual(metrics.REGISTRY.snapshot()['requests'], {('<unmatched>', 'GET', 404): 2})
+
+    @override_settings(METRICS_TRACE_SAMPLE_RATE=1, METRICS_SLOW_REQUEST_SECONDS=0)
+    def test_sampled_slow_request_logs_its_sql(self):
+        with self.assertLogs('myapp.metrics', 'WARNING') as logs:
+            self.client.get('/blogposts/')
+        self.assertIn('Slow request GET /blogposts/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_metrics_are_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_need_the_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'http_requests_total', response.content)
+
+    def test_forked_workers_get_their_own_id(self):
+        with mock.patch('os.getpid', return_value=101):
+            first = metrics.worker_id()
+        with mock.patch('os.getpid', return_value=102):
+            self.assertNotEqual(metrics.worker_id(), first)
+
+    def test_publish_waits_for_the_workers_lock(self):
+        shared = caches['shared']
+        shared.set(metrics.WORKERS_KEY, {'other:1': 100.0}, timeout=None)
+        shared.add(metrics.WORKERS_LOCK_KEY, 'other:1')
+        metrics.REGISTRY.publish(100.0)
+        # Left alone while another worker holds the lock, retried next request
+        self.assertEqual(shared.get(metrics.WORKERS_KEY), {'other:1': 100.0})
+        self.assertEqual(metrics.REGISTRY.next_publish, 100.0)
+
+        shared.delete(metrics.WORKERS_LOCK_KEY)
+        metrics.REGISTRY.publish(101.0)
+        self.assertEqual(set(shared.get(metrics.WORKERS_KEY)), {'other:1', metrics.worker_id()})
+        self.assertIsNone(shared.get(metrics.WORKERS_LOCK_KEY))
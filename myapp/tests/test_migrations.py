@@ -0,0 +1,14 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class MigrationTests(TestCase):
+    def test_models_match_migrations(self):
+        # Every model change must come with its migration
+        output = StringIO()
+        try:
+            call_command('makemigrations', '--check', '--dry-run', stdout=output, stderr=output)
+        except SystemExit:
+            self.fail(f'Model changes without a migration:\n{output.getvalue()}')
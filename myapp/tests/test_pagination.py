@@ -0,0 +1,97 @@
+import base64
+import json
+
+from django.test import SimpleTestCase
+
+from myapp.models import BlogPost
+from myapp.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_limit
+from myapp.views import BLOGPOST_ORDERING
+
+from .base import AppTestCase, make_doctor, make_post
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+TAMPERED_CURSORS = [
+    'not base64!',
+    raw_cursor({'a': 1}),
+    raw_cursor([1]),
+    raw_cursor(['notadate', 1]),
+    raw_cursor([{'a': 1}, 1]),
+    raw_cursor(['2030-01-01T00:00:00+00:00', 'x']),
+    raw_cursor(['2030-01-01T00:00:00+00:00', None]),
+    raw_cursor(['2030-01-01T00:00:00+00:00', [1]]),
+]
+
+
+class PageParamTests(SimpleTestCase):
+    def test_limit(self):
+        self.assertEqual(page_limit({}, 6), 6)
+        self.assertEqual(page_limit({'limit': ''}, 6), 6)
+        self.assertEqual(page_limit({'limit': '10'}, 6), 10)
+        self.assertEqual(page_limit({'limit': '100000'}, 6), MAX_PAGE_SIZE)
+
+    def test_cursor_round_trip(self):
+        post = BlogPost(pk=7)
+        post.created_at = BlogPost._meta.get_field('created_at').to_python('2030-01-01T10:00:00+00:00')
+        cursor = encode_cursor([post.created_at, post.pk])
+        self.assertEqual(decode_cursor(cursor, BLOGPOST_ORDERING, BlogPost), [post.created_at, 7])
+
+
+class PageParamValidationTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        doctor = make_doctor('drpages')
+        for number in range(3):
+            make_post(doctor, title=f'Post {number}')
+
+    def test_bad_page_params_are_400s(self):
+        for path in ('/blogposts/', '/filtered_blogposts/', '/doctors/', '/async/blogposts/', '/async/doctors/'):
+            for params in ({'limit': 'abc'}, {'limit': '-1'}, {'limit': '0'}, {'offset': 'abc'},
+                           {'offset': '-5'}, {'offset': str(2 ** 64)}):
+                with self.subTest(path=path, params=params):
+                    response = self.client.get(path, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(next(iter(params)), response.json())
+
+    def test_tampered_cursors_are_400s(self):
+        for path in ('/blogposts/', '/async/blogposts/'):
+            for cursor in TAMPERED_CURSORS:
+                with self.subTest(path=path, cursor=cursor):
+                    response = self.client.get(path, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'cursor': 'Invalid cursor.'})
+
+
+class FeedPaginationTests(AppTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = make_doctor('drpages')
+        for number in range(7):
+            make_post(cls.doctor, title=f'Post {number}')
+        for number in range(4):
+            make_doctor(f'drlist{number}')
+
+    def walk(self, path, key):
+        rows, cursor = [], ''
+        while cursor is not None:
+            page = self.client.get(path, {'cursor': cursor, 'limit': 3}).json()
+            rows.extend(page[key])
+            cursor = page['next_cursor']
+        return rows
+
+    def test_cursor_pages_follow_offset_order(self):
+        for path, key in (('/blogposts/', 'blogposts'), ('/filtered_blogposts/', 'blogposts'), ('/doctors/', 'doctors')):
+            with self.subTest(path=path):
+                rows = self.client.get(path, {'limit': 10}).json()[key]
+                self.assertEqual(len(rows), 7 if key == 'blogposts' else 5)
+                self.assertEqual(self.walk(path, key), rows)
+
+    def test_cached_count(self):
+        self.assertEqual(self.client.get('/blogposts/', {'count': 'cached'}).json()['total_count'], 7)
+        make_post(self.doctor, title='Late post')
+        # Up to COUNT_CACHE_TIMEOUT old; exact counts see the new post
+        self.assertEqual(self.client.get('/blogposts/', {'count': 'cached'}).json()['total_count'], 7)
+        self.assertEqual(self.client.get('/blogposts/').json()['total_count'], 8)
@@ -0,0 +1,75 @@
+from django.core.cache import caches
+
+from myapp import cache
+
+from .base import AppTestCase, make_category, make_doctor, make_post, make_user
+
+
+class QueryCountTests(AppTestCase):
+    """
+    Pins each list and detail endpoint to a fixed number of queries, the
+    same for a page of 2 rows as for a page of 10. Every request starts with
+    empty caches, so the view itself runs each time.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [make_category(f'Category {n}') for n in range(3)]
+        cls.doctors = [make_doctor(f'doctor{n}', cls.categories[:2]) for n in range(12)]
+        for doctor in cls.doctors:
+            make_post(doctor, cls.categories)
+            make_post(doctor, cls.categories[1:], draft=True)
+        cls.patient = make_user('patient')
+
+    def get_uncached(self, path):
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+        cache._local_payloads.clear()
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertConstantQueries(self, queries, path, limits=(2, 10)):
+        for limit in limits:
+            with self.subTest(path=path, limit=limit):
+                separator = '&' if '?' in path else '?'
+                with self.assertNumQueries(queries):
+                    response = self.get_uncached(f'{path}{separator}limit={limit}')
+                rows = response.json()
+                if isinstance(rows, dict):
+                    rows = next(value for key, value in rows.items() if key in ('blogposts', 'doctors'))
+                self.assertEqual(len(rows), limit)
+
+    def test_blog_feeds(self):
+        # COUNT and page; the filtered feed adds the category list and the facet counts
+        self.assertConstantQueries(2, '/blogposts/')
+        self.assertConstantQueries(2, '/blogposts/?cursor=')
+        self.assertConstantQueries(4, '/filtered_blogposts/')
+        self.assertConstantQueries(4, f'/filtered_blogposts/?categories[]={self.categories[0].pk}')
+
+    def test_doctor_list(self):
+        # COUNT, page, prefetched categories, category list, facet counts
+        self.assertConstantQueries(5, '/doctors/')
+        # Once per process, the search index looks up its table first
+        self.get_uncached('/doctors/?location=pune')
+        self.assertConstantQueries(5, '/doctors/?location=pune')
+
+    def test_user_blog_posts(self):
+        # The user, the doctor, then one query each for published posts and drafts
+        with self.assertNumQueries(4):
+            response = self.get_uncached(f'/user-blogs/?userId={self.doctors[0].profile.user_id}')
+        self.assertEqual(len(response.json()['published_posts']), 1)
+        self.assertEqual(len(response.json()['draft_posts']), 1)
+
+    def test_user_details(self):
+        # One joined query; a doctor's categories are prefetched
+        with self.assertNumQueries(1):
+            self.get_uncached(f'/user-details/?user_id={self.patient.pk}')
+        with self.assertNumQueries(2):
+            self.get_uncached(f'/user-details/?user_id={self.doctors[0].profile.user_id}')
+        user_ids = ','.join(str(doctor.profile.user_id) for doctor in self.doctors)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.get_uncached(f'/user-details/?user_ids={user_ids}').json()), 12)
+        # Served from the per-user cache the second time
+        with self.assertNumQueries(0):
+            self.client.get(f'/user-details/?user_ids={user_ids}')
@@ -0,0 +1,30 @@
+import datetime
+
+from django.db import connection
+
+from myapp.management.commands.check_query_plans import FULL_SCAN, SORT, plans
+
+from .base import AppTestCase, make_appointment, make_category, make_doctor, make_post, make_user
+
+
+class QueryPlanTests(AppTestCase):
+    """The hot queries read through their indexes, whatever the row counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = make_category('Cardiology')
+        doctor = make_doctor('drplan', categories=[category])
+        patient = make_user('planpatient')
+        for number in range(5):
+            make_post(doctor, categories=[category], title=f'Post {number}')
+            make_appointment(patient, doctor.profile.user, date=datetime.date(2030, 1, 7 + number))
+
+    def test_hot_queries_use_indexes(self):
+        self.assertIn(connection.vendor, FULL_SCAN)
+        for name, queryset, tables, ordered in plans():
+            with self.subTest(name):
+                plan = queryset.explain()
+                scanned = [table for table in FULL_SCAN[connection.vendor].findall(plan) if table in tables]
+                self.assertEqual(scanned, [], plan)
+                if ordered:
+                    self.assertIsNone(SORT[connection.vendor].search(plan), plan)
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.auth.hashers import identify_hasher
+from django.db import DatabaseError
+from django.test import override_settings
+
+from myapp.google_clients import oauth_client_config
+from myapp.models import DEFAULT_PROFILE_PICTURE, CustomUser, Doctor, Profile
+
+from .base import AppTestCase, make_category, make_user
+from .test_uploads import png
+
+
+class RegistrationTests(AppTestCase):
+    def register(self, **fields):
+        return self.client.post('/register/', {
+            'username': 'newpatient', 'email': 'new@example.com', 'password': 'secret-pass-1',
+            'first_name': 'New', 'last_name': 'Patient', 'select_role': 'patient',
+            'address': '1 Park Street', 'city': 'Pune', 'state': 'Maharashtra', 'pincode': 411001,
+            **fields,
+        })
+
+    def test_failed_registration_leaves_no_rows(self):
+        category = make_category('Cardiology')
+        with mock.patch.object(Doctor.categories.through.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.register(select_role='doctor', categories=[category.pk], establishment_name='Clinic')
+        self.assertFalse(CustomUser.objects.filter(username='newpatient').exists())
+
+    @mock.patch('myapp.signals.process_upload')
+    def test_placeholder_picture_gets_no_variants(self, process_upload):
+        with self.commit():
+            self.assertEqual(self.register().status_code, 201)
+        profile = Profile.objects.get(user__username='newpatient')
+        self.assertEqual(profile.profile_picture.name, DEFAULT_PROFILE_PICTURE)
+        self.assertEqual(profile.profile_picture.url, '/media/profile-default.png')
+        process_upload.assert_not_called()
+
+    @mock.patch('myapp.signals.process_upload')
+    def test_uploaded_picture_gets_variants(self, process_upload):
+        with mock.patch('myapp.storage.ContentAddressedStorage._save', return_value='profile_pictures/a.png'):
+            with self.commit():
+                self.assertEqual(self.register(profile_picture=png()).status_code, 201)
+        process_upload.assert_called_once()
+        self.assertEqual(process_upload.call_args.args[2:4], ('profile_picture', 'profile_pictures/a.png'))
+
+
+@mock.patch.dict('os.environ', {'GOOGLE_CLIENT_ID': 'client', 'GOOGLE_CLIENT_SECRET': 'secret'})
+class LoginRehashTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        oauth_client_config.cache_clear()
+        self.addCleanup(oauth_client_config.cache_clear)
+        # Hashed with the tests' MD5 hasher
+        self.user = make_user('rehash')
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_login_rehashes_with_the_preferred_hasher(self):
+        response = self.client.post('/login/', {'username': 'rehash', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('code_challenge_method=S256', response.json()['auth_url'])
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, 'scrypt')
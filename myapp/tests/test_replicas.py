@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, router
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from myapp.middleware import PIN_COOKIE
+from myapp.models import Category
+from myapp.routers import primary_reads, replica_reads
+
+from .base import AppTestCase, make_appointment, make_doctor, make_user
+
+REPLICA = 'replica1'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_ROUTERS=['myapp.routers.ReplicaRouter'])
+class ReplicaRoutingTests(AppTestCase):
+    """
+    replica1 is a second connection to the test database, a mirror as
+    settings.py configures replicas. It sees only committed rows, so only
+    where each query runs is checked here. It is added at class set-up
+    because the test runner checks the declared databases against
+    DATABASES before any test runs.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        connections.settings[REPLICA] = {
+            **primary,
+            # Read-only, so a plain BEGIN: the test transaction the primary
+            # holds must not block the replica's
+            'OPTIONS': {**primary['OPTIONS'], 'transaction_mode': None},
+            'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+        }
+        cls.databases = {*cls.databases, REPLICA}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        del cls.databases
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor('drreplica').profile.user
+        self.patient = make_user('replicapatient')
+        self.other = make_user('otherpatient')
+
+    def queries(self, call):
+        """Run ``call`` and return the number of queries on (primary, replica)."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            call()
+        return len(primary), len(replica)
+
+    def get(self, path, client=None, **params):
+        response = (client or self.client).get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def book(self):
+        return self.client.post('/book-appointment/', {
+            'access_token': 'token', 'user_id': self.patient.pk, 'doctor_id': self.doctor.pk,
+            'date': '2030-01-07', 'start_time': '10:00',
+        })
+
+    def test_safe_requests_read_from_the_replica(self):
+        primary, replica = self.queries(lambda: self.get('/appointments/', user_id=self.patient.pk))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_unsafe_requests_never_touch_the_replica(self):
+        def write():
+            self.assertEqual(self.book().status_code, 201)
+            self.assertEqual(self.book().status_code, 409)
+            self.client.post('/login/', {'email': 'nobody@example.com', 'password': 'x'})
+            self.client.delete('/appointments/')
+
+        primary, replica = self.queries(write)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_write_pins_the_client_to_the_primary(self):
+        response = self.book()
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        primary, replica = self.queries(lambda: self.get('/appointments/', user_id=self.other.pk))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # A client without the cookie still reads from the replica
+        self.client.cookies.clear()
+        primary, replica = self.queries(lambda: self.get('/appointments/', user_id=self.other.pk))
+        self.assertEqual((primary, replica > 0), (0, True))
+
+    def test_write_pins_the_users_it_concerns(self):
+        with self.commit():
+            make_appointment(self.patient, self.doctor)
+
+        # Another client asking about either participant reads from the primary
+        for path, user in (('/appointments/', self.patient), ('/doc-appointments/', self.doctor)):
+            with self.subTest(path=path):
+                primary, replica = self.queries(lambda: self.get(path, user_id=user.pk))
+                self.assertGreater(primary, 0)
+                self.assertEqual(replica, 0)
+
+        primary, replica = self.queries(lambda: self.get('/appointments/', user_id=self.other.pk))
+        self.assertEqual((primary, replica > 0), (0, True))
+
+    def test_primary_reads_override_replica_reads(self):
+        def count(context):
+            with context:
+                Category.objects.count()
+
+        self.assertEqual(self.queries(lambda: count(replica_reads())), (0, 1))
+        with replica_reads():
+            self.assertEqual(self.queries(lambda: count(primary_reads())), (1, 0))
+        # Outside a request, reads stay on the primary
+        self.assertEqual(self.queries(Category.objects.count), (1, 0))
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        def read():
+            with mock.patch.object(connections[REPLICA], 'ensure_connection', side_effect=OperationalError):
+                self.get('/appointments/', user_id=self.patient.pk)
+
+        # The router skips the replica for REPLICA_RETRY_SECONDS afterwards
+        self.addCleanup(router.routers[0]._down_until.clear)
+        primary, replica = self.queries(read)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
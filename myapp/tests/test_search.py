@@ -0,0 +1,146 @@
+from unittest import mock
+
+from django.db.models import Q, QuerySet
+
+from myapp.models import Profile, prefix_q
+from myapp.search import BLOGPOST_INDEX, PROFILE_ADDRESS_INDEX, InProcessIndex, SearchIndex
+
+from .base import AppTestCase, make_doctor, make_post
+
+
+class LocationSearchTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.commit():
+            make_doctor('drpune', city='Pune', state='Maharashtra', pincode=411001)
+            make_doctor('drnagpur', city='  Navi   Mumbai ', state='Maharashtra', pincode=400703)
+            chennai = make_doctor('drchennai', city='Chennai', state='Tamil Nadu', pincode=600001)
+            chennai.profile.address = 'Anna Salai, Teynampet'
+            chennai.profile.save()
+
+    def matches(self, query):
+        return sorted(Profile.objects.in_location(query).values_list('user__username', flat=True))
+
+    def test_city_and_state_prefixes_ignore_case_and_spacing(self):
+        self.assertEqual(self.matches('pu'), ['drpune'])
+        self.assertEqual(self.matches('NAVI mum'), ['drnagpur'])
+        self.assertEqual(self.matches('maharashtra'), ['drnagpur', 'drpune'])
+        self.assertEqual(self.matches('tamil  nadu'), ['drchennai'])
+
+    def test_pincode_prefix(self):
+        self.assertEqual(self.matches('4'), ['drnagpur', 'drpune'])
+        self.assertEqual(self.matches('4110'), ['drpune'])
+        self.assertEqual(self.matches('411002'), [])
+
+    def test_address_word_prefixes_follow_writes(self):
+        self.assertEqual(self.matches('teyn'), ['drchennai'])
+        profile = Profile.objects.get(user__username='drchennai')
+        profile.address = 'Mount Road'
+        profile.save()
+        self.assertEqual(self.matches('teyn'), [])
+        self.assertEqual(self.matches('mount'), ['drchennai'])
+
+    def test_doctors_endpoint_filters_by_location(self):
+        response = self.client.get('/doctors/', {'location': 'chen'})
+        self.assertEqual([row['profile']['city'] for row in response.json()['doctors']], ['Chennai'])
+
+    def test_prefix_lookup_per_database(self):
+        self.assertEqual(prefix_q('city_normalized', 'pu', 'sqlite'),
+                         Q(city_normalized__gte='pu', city_normalized__lt='pu\U0010ffff'))
+        # A range depends on the collation there; LIKE uses the _like index
+        self.assertEqual(prefix_q('city_normalized', 'pu', 'postgresql'), Q(city_normalized__startswith='pu'))
+
+    @mock.patch.object(SearchIndex, 'uses_fts5', return_value=False)
+    def test_in_process_matches_past_the_id_limit(self, uses_fts5):
+        with mock.patch('myapp.search.FILTER_MAX_IDS', 1):
+            self.assertIsInstance(PROFILE_ADDRESS_INDEX.filter_q('mg road').children[0][1], QuerySet)
+            self.assertEqual(self.matches('mg ROA'), ['drnagpur', 'drpune'])
+            self.assertEqual(self.matches('teyn'), ['drchennai'])
+            self.assertEqual(self.matches('salai anna'), ['drchennai'])
+            self.assertEqual(self.matches('alai'), [])
+
+
+class SearchTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor('drsearch')
+
+    def search(self, query):
+        return [post['title'] for post in self.client.get('/blogposts/search/', {'q': query}).json()['blogposts']]
+
+    def test_table_comes_from_the_migration(self):
+        # Created and filled by 0009_search_tables, not on the first request
+        self.assertTrue(BLOGPOST_INDEX.uses_fts5())
+
+    def test_fts5_search_follows_writes(self):
+        with self.commit():
+            post = make_post(self.doctor, title='Healthy heart habits')
+            make_post(self.doctor, title='Hidden draft about hearts', draft=True)
+        self.assertEqual(self.search('hear'), ['Healthy heart habits'])
+
+        post.title = 'Sleeping well'
+        post.save()
+        self.assertEqual(self.search('heart'), [])
+        self.assertEqual(self.search('sleep'), ['Sleeping well'])
+
+        post.delete()
+        self.assertEqual(self.search('sleep'), [])
+
+
+@mock.patch.object(SearchIndex, 'uses_fts5', return_value=False)
+class InProcessSearchTests(AppTestCase):
+    """The fallback used on databases without FTS5."""
+
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_doctor('drsearch')
+        with self.commit():
+            self.post = make_post(self.doctor, title='Healthy heart habits')
+            make_post(self.doctor, title='Knee pain exercises')
+
+    def search(self, query):
+        return [post['title'] for post in self.client.get('/blogposts/search/', {'q': query}).json()['blogposts']]
+
+    def test_writes_are_applied_without_a_rebuild(self, uses_fts5):
+        self.assertEqual(self.search('heart'), ['Healthy heart habits'])
+        index = BLOGPOST_INDEX._memory
+
+        with self.commit():
+            self.post.title = 'Sleeping well'
+            self.post.save()
+            added = make_post(self.doctor, title='Heart rate zones')
+        with mock.patch.object(InProcessIndex, 'freeze') as freeze:
+            self.assertEqual(self.search('heart'), ['Heart rate zones'])
+            self.assertEqual(self.search('sleep'), ['Sleeping well'])
+        freeze.assert_not_called()
+        self.assertIs(BLOGPOST_INDEX._memory, index)
+
+        with self.commit():
+            added.delete()
+        self.assertEqual(self.search('heart'), [])
+        self.assertEqual(self.search('exer'), ['Knee pain exercises'])
+        self.assertIs(BLOGPOST_INDEX._memory, index)
+        # Emptied tokens are dropped and the rest stay sorted for prefix lookups
+        self.assertNotIn('heart', index.postings)
+        self.assertEqual(index.tokens, sorted(index.postings))
+
+    def test_rebuilds_when_the_change_log_is_missing(self, uses_fts5):
+        self.assertEqual(self.search('heart'), ['Healthy heart habits'])
+        index = BLOGPOST_INDEX._memory
+
+        with self.commit():
+            BLOGPOST_INDEX.rebuild()
+        self.assertEqual(self.search('heart'), ['Healthy heart habits'])
+        self.assertIsNot(BLOGPOST_INDEX._memory, index)
+
+    def test_rebuilds_after_too_many_changes(self, uses_fts5):
+        self.assertEqual(self.search('knee'), ['Knee pain exercises'])
+        index = BLOGPOST_INDEX._memory
+
+        with self.commit():
+            make_post(self.doctor, title='Knee surgery recovery')
+        with self.commit():
+            make_post(self.doctor, title='Knee braces')
+        with mock.patch('myapp.search.CATCH_UP_LIMIT', 1):
+            self.assertEqual(len(self.search('knee')), 3)
+        self.assertIsNot(BLOGPOST_INDEX._memory, index)
@@ -0,0 +1,23 @@
+from django.test import override_settings
+
+from .base import AppTestCase
+
+
+class LoginThrottleTests(AppTestCase):
+    def attempt(self, username='patient', address='203.0.113.5', **headers):
+        return self.client.post('/login/', {'username': username, 'password': 'wrong'},
+                                REMOTE_ADDR=address, **headers).status_code
+
+    @override_settings(LOGIN_THROTTLE_RATE='3/min', LOGIN_USERNAME_THROTTLE_RATE=None)
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        statuses = [self.attempt(f'user{n}', HTTP_X_FORWARDED_FOR=f'198.51.100.{n}') for n in range(4)]
+        self.assertEqual(statuses, [400, 400, 400, 429])
+        # Another client address has its own allowance
+        self.assertEqual(self.attempt(address='203.0.113.6'), 400)
+
+    @override_settings(LOGIN_THROTTLE_RATE=None, LOGIN_USERNAME_THROTTLE_RATE='2/min')
+    def test_username_is_limited_across_addresses(self):
+        statuses = [self.attempt(username, address=f'203.0.113.{n}')
+                    for n, username in enumerate(['patient', 'Patient', 'PATIENT'])]
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertEqual(self.attempt('someone-else'), 400)
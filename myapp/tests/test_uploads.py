@@ -0,0 +1,105 @@
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, override_settings
+from PIL import Image
+
+from myapp.images import generate_variants
+from myapp.models import BlogPost
+from myapp.storage import ContentAddressedStorage
+from myapp.views import CreateBlogPostView
+
+from .base import AppTestCase, make_doctor
+
+MB = 1024 * 1024
+
+
+def png(size=(40, 30), padding=0, name='upload.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'PNG')
+    # Bytes after the end of the PNG make the file large without making the
+    # image large; Pillow ignores them
+    return SimpleUploadedFile(name, buffer.getvalue() + os.urandom(padding), content_type='image/png')
+
+
+class UploadTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+        self.doctor = make_doctor('drupload')
+        self.path = f'/create-blog/?userId={self.doctor.profile.user_id}'
+
+    def upload(self, image, title='With an image'):
+        return self.client.post(self.path, {'title': title, 'summary': 'S', 'content': 'C', 'image': image})
+
+    @override_settings(UPLOAD_MAX_BYTES=MB)
+    def test_oversized_upload_is_refused(self):
+        response = self.upload(png(padding=2 * MB))
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(BlogPost.objects.exists())
+
+    @override_settings(IMAGE_MAX_DIMENSION=1000)
+    def test_oversized_dimensions_are_refused(self):
+        response = self.upload(png(size=(1200, 10)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1200x10', response.json()['image'][0])
+
+    def test_non_image_is_refused(self):
+        response = self.upload(SimpleUploadedFile('notes.png', b'not an image', content_type='image/png'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_identical_uploads_share_a_file(self):
+        image = png(padding=1000)
+        first = self.upload(SimpleUploadedFile('a.PNG', image.read(), content_type='image/png'), title='First')
+        image.seek(0)
+        second = self.upload(SimpleUploadedFile('b.png', image.read(), content_type='image/png'), title='Second')
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+
+        names = set(BlogPost.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        directory, filename = os.path.split(names.pop())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, directory)), [filename])
+        self.assertRegex(filename, r'^[0-9a-f]{64}\.png$')
+
+    def test_upload_is_streamed_to_disk(self):
+        request = RequestFactory().post(self.path, {'title': 'Big', 'summary': 'S', 'content': 'C',
+                                                    'image': png(padding=4 * MB)})
+        view = CreateBlogPostView.as_view()
+        tracemalloc.start()
+        try:
+            response = view(request)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            # What the request handler does once the response is sent
+            request.close()
+        self.assertEqual(response.status_code, 201)
+        # Chunks go straight to a temporary file; the whole upload never sits
+        # in memory at once
+        self.assertLess(peak, MB)
+
+    def test_variants_are_never_stored_under_a_second_name(self):
+        name = default_storage.save('blog_images/source.png', png(size=(300, 200)))
+        first = generate_variants(name, [64, 128])
+        # Another worker finished the same variants between the exists()
+        # check and the save()
+        with mock.patch.object(ContentAddressedStorage, 'exists', return_value=False):
+            second = generate_variants(name, [64, 128])
+        self.assertEqual(second, first)
+        directory = os.path.dirname(default_storage.path(first['webp']['64']))
+        self.assertEqual(sorted(os.listdir(directory)), ['128.jpeg', '128.webp', '64.jpeg', '64.webp'])
+
+        self.assertEqual(default_storage.save(first['webp']['64'], ContentFile(b'same')), first['webp']['64'])
+        self.assertEqual(len(os.listdir(directory)), 4)
@@ -0,0 +1,46 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """
+    LOGIN_THROTTLE_RATE login attempts per client address. Counted in the
+    shared cache, so the limit holds across workers; every attempt costs a
+    password hash, allowed or not. The address is REMOTE_ADDR, or the one
+    NUM_PROXIES proxies back in X-Forwarded-For (REST_FRAMEWORK setting).
+    """
+    scope = 'login'
+
+    @property
+    def cache(self):
+        # Looked up per request rather than bound at import, so it follows
+        # the CACHES setting
+        return caches['shared']
+
+    def get_rate(self):
+        return settings.LOGIN_THROTTLE_RATE
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(LoginRateThrottle):
+    """
+    LOGIN_USERNAME_THROTTLE_RATE login attempts per username, from any
+    address, against guessing one account's password from many of them.
+    """
+    scope = 'login-username'
+
+    def get_rate(self):
+        return settings.LOGIN_USERNAME_THROTTLE_RATE
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        # Hashed: usernames may hold characters cache keys cannot
+        ident = hashlib.sha256(username.casefold().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
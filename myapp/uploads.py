@@ -0,0 +1,87 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+# Room for the other form fields and multipart boundaries next to a file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = 'upload_too_large'
+
+    def __init__(self):
+        super().__init__(f'Uploads can be at most {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB.')
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every uploaded file to a temporary file, never to memory, and stop
+    reading the request as soon as a file goes over UPLOAD_MAX_BYTES. The
+    SHA-256 of the file is computed on the way through and kept on the
+    uploaded file as ``sha256`` for ContentAddressedStorage.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # A request whose declared size could only hold an oversized file is
+        # turned away before any of it is read
+        if content_length > settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            self.upload_interrupted()
+            raise UploadTooLarge()
+        self.hasher.update(raw_data)
+        super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+def check_image_header(file):
+    """
+    Reject files that are not images of an allowed format, or whose
+    dimensions exceed IMAGE_MAX_DIMENSION / IMAGE_MAX_PIXELS. Only the
+    header is read; the bitmap is never decoded.
+    """
+    position = file.tell()
+    try:
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise serializers.ValidationError('Upload a valid image.')
+    finally:
+        file.seek(position)
+
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise serializers.ValidationError(
+            f"Unsupported image format {image_format}; use one of {', '.join(sorted(ALLOWED_IMAGE_FORMATS))}."
+        )
+    if max(width, height) > settings.IMAGE_MAX_DIMENSION or width * height > settings.IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            f'Images can be at most {settings.IMAGE_MAX_DIMENSION}px on a side and '
+            f'{settings.IMAGE_MAX_PIXELS // 1_000_000} megapixels; this one is {width}x{height}.'
+        )
+
+
+class UploadedImageField(serializers.ImageField):
+    """An ImageField that checks format and dimensions from the header before Django's own image validation."""
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'read'):
+            check_image_header(data)
+        return super().to_internal_value(data)
@@ -1,5 +1,7 @@
 from django.urls import path
-from .views import RegisterUserView,get_all_categories,LoginView,GoogleCalendarCallbackView,LogoutView,get_all_blogposts,get_filtered_blogposts,get_filtered_doctors,UserDetailsView,AppointmentBookingView,PatientAppointmentsView,DocAppointmentsView,CreateBlogPostView,UserBlogPostsView
+from . import async_views
+from .metrics import metrics_view
+from .views import RegisterUserView,get_all_categories,LoginView,GoogleCalendarCallbackView,LogoutView,get_all_blogposts,get_filtered_blogposts,get_filtered_doctors,UserDetailsView,AppointmentBookingView,BulkAppointmentBookingView,PatientAppointmentsView,DocAppointmentsView,CreateBlogPostView,UserBlogPostsView,search_blogposts,get_doctor_availability
 
 urlpatterns = [
     path('register/', RegisterUserView.as_view(), name='register'),
@@ -8,12 +10,24 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
     path('auth/google/callback/', GoogleCalendarCallbackView.as_view(), name='google_calendar_callback'),
     path('blogposts/', get_all_blogposts, name='blogpost-list'),
+    path('blogposts/search/', search_blogposts, name='blogpost-search'),
     path('filtered_blogposts/', get_filtered_blogposts, name='filtered_blogposts'),
     path('doctors/', get_filtered_doctors, name='doctors-list'),
+    path('doctors/<int:doctor_id>/availability/', get_doctor_availability, name='doctor-availability'),
     path('user-details/', UserDetailsView.as_view(), name='user-details'),
     path('book-appointment/', AppointmentBookingView.as_view(), name='book-appointment'),
+    path('book-appointments/bulk/', BulkAppointmentBookingView.as_view(), name='book-appointments-bulk'),
     path('appointments/', PatientAppointmentsView.as_view(), name='appointments'),
     path('doc-appointments/', DocAppointmentsView.as_view(), name='doc-appointments'),
     path('create-blog/', CreateBlogPostView.as_view(), name='create-blog'),
     path('user-blogs/', UserBlogPostsView.as_view(), name='user-blogs'),
+    path('metrics', metrics_view, name='metrics'),
+
+    # Async versions of the read endpoints, for ASGI deployments
+    path('async/blogposts/', async_views.get_all_blogposts, name='async-blogpost-list'),
+    path('async/filtered_blogposts/', async_views.get_filtered_blogposts, name='async-filtered_blogposts'),
+    path('async/doctors/', async_views.get_filtered_doctors, name='async-doctors-list'),
+    path('async/user-details/', async_views.get_user_details, name='async-user-details'),
+    path('async/appointments/', async_views.get_patient_appointments, name='async-appointments'),
+    path('async/doc-appointments/', async_views.get_doctor_appointments, name='async-doc-appointments'),
 ]
\ No newline at end of file
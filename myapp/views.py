@@ -1,24 +1,37 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .serializers import DoctorSerializer, RegisterSerializer,CategorySerializer,LoginSerializer,BlogPostSerializer,UserDetailsSerializer, AppointmentDetailSerializer,BlogCreateSerializer
+from .serializers import DoctorSerializer, RegisterSerializer,LoginSerializer,BlogPostSerializer, AppointmentDetailSerializer,BlogCreateSerializer,AppointmentBookingSerializer
 from rest_framework.decorators import api_view
-from .models import Appointment, BlogPost, Category,Doctor,CustomUser
-from google_auth_oauthlib.flow import Flow
+from rest_framework.exceptions import ValidationError
+from .pagination import MAX_PAGE_SIZE, keyset_page, page_limit, paginate_feed, query_int
+from .cache import PAGE_PARAMS, cached_response, category_payload, last_modified_date, rendered_categories, user_details
+from .search import BLOGPOST_INDEX
+from .facets import blogpost_facets, doctor_facets
+from .google_calendar import enqueue_calendar_sync, enqueue_calendar_syncs, sync_tasks
+from .google_clients import authorization_url, oauth_flow
+from .metrics import serializer_data
+from .middleware import pin_users_to_primary
+from .throttles import LoginRateThrottle, LoginUsernameRateThrottle
+from .availability import SlotUnavailable, book_appointment, day_intervals, free_slots, lock_doctors, overlaps, requested_interval
+from .models import Appointment, BlogPost, Doctor,CustomUser,Profile
 from django.conf import settings
-from django.shortcuts import redirect
-import os
-from google.oauth2.credentials import Credentials as OAuthCredentials
-from googleapiclient.discovery import build
-
-from django.db.models import Q
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from django.db import transaction
+import logging
+import time
+from datetime import date
 from django.contrib.auth import login, logout
-from django.conf import settings
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+
+logger = logging.getLogger(__name__)
 
 
 class LoginView(APIView):
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
+
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
@@ -30,22 +43,8 @@ class LoginView(APIView):
             user_id = user.id
 
             is_patient = user.is_patient
-            flow = Flow.from_client_config(
-                {
-                    "web": {
-                        "client_id": os.environ["GOOGLE_CLIENT_ID"],
-                        "client_secret": os.environ["GOOGLE_CLIENT_SECRET"],
-                        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                        "token_uri": "https://oauth2.googleapis.com/token",
-                        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                        "redirect_uris": ["https://doc-patient-fe.vercel.app/auth/google/callback"]
-                    }
-                },
-                scopes=['https://www.googleapis.com/auth/calendar'],
-                redirect_uri='https://doc-patient-fe.vercel.app/auth/google/callback'
-            )
             # Generate the authorization URL
-            auth_url, _ = flow.authorization_url(prompt='consent')
+            auth_url, _ = authorization_url(prompt='consent')
             # You can add token generation logic here if you're using token-based authentication.
             return Response({"auth_url": auth_url,
                             "full_name": full_name,
@@ -58,20 +57,7 @@ class LoginView(APIView):
 class GoogleCalendarCallbackView(APIView):
     def get(self, request):
         code = request.GET.get('code')
-        flow = Flow.from_client_config(
-                {
-                    "web": {
-                        "client_id": os.environ["GOOGLE_CLIENT_ID"],
-                        "client_secret": os.environ["GOOGLE_CLIENT_SECRET"],
-                        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                        "token_uri": "https://oauth2.googleapis.com/token",
-                        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-                        "redirect_uris": ["https://doc-patient-fe.vercel.app/auth/google/callback"]
-                    }
-                },
-            scopes=['https://www.googleapis.com/auth/calendar'],
-            redirect_uri='https://doc-patient-fe.vercel.app/auth/google/callback'  
-        )
+        flow = oauth_flow()
         flow.fetch_token(code=code)
         credentials = flow.credentials
 
@@ -95,110 +81,154 @@ class LogoutView(APIView):
         logout(request)  
         return Response({"message": "User logged out successfully"}, status=status.HTTP_200_OK)
   
+BLOGPOST_ORDERING = ('-created_at', '-id')
+DOCTOR_ORDERING = ('id',)
+
+
 @api_view(['GET'])
 def get_all_categories(request):
-    categories = Category.objects.all()
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data)
-
+    # Served from the pre-rendered category cache; clients that send back the
+    # ETag get a 304 without the list being sent again.
+    payload, modified = rendered_categories()
+    last_modified = last_modified_date(modified)
+    not_modified = get_conditional_response(request, etag=payload.etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    response = HttpResponse(payload.body, content_type='application/json')
+    response['ETag'] = payload.etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+# Public feeds are cached per generation of the data they show; see
+# myapp.cache.cached_response and the signal handlers that bump them
+@cached_response('blogpost', 'category')
 @api_view(['GET'])
 def get_all_blogposts(request):
-    # Get pagination parameters
-    offset = int(request.query_params.get('offset', 0))
-    limit = int(request.query_params.get('limit', 4))
-    total_count = BlogPost.objects.filter(draft=False).count()
-    # Fetch the blog posts based on offset and limit
-    blogposts = BlogPost.objects.filter(draft=False).order_by('-created_at')[offset:offset + limit]
+    # Offset/limit by default, keyset pagination when a cursor is passed
+    blogposts, page_info = paginate_feed(request, BlogPost.objects.published().feed(), BLOGPOST_ORDERING, 4)
     serializer = BlogPostSerializer(blogposts, many=True)
 
     return Response({
-        'total_count': total_count,
-        'blogposts': serializer.data
+        **page_info,
+        'blogposts': serializer_data(serializer)
     })
 
 
+@cached_response('blogpost', 'category', params=(*PAGE_PARAMS, 'categories[]'))
 @api_view(['GET'])
 def get_filtered_blogposts(request):
-
-    offset = int(request.query_params.get('offset', 0))
-    limit = int(request.query_params.get('limit', 6))
-    
-
     category_ids = request.query_params.getlist('categories[]') 
     if category_ids:
-        blogposts = BlogPost.objects.filter(categories__id__in=category_ids, draft=False).distinct()
+        blogposts = BlogPost.objects.published().filter(categories__id__in=category_ids).distinct()
     else:
-        blogposts = BlogPost.objects.filter(draft=False)
-    total_count = blogposts.count()
-    blogposts = blogposts.order_by('-created_at')[offset:offset + limit]
+        blogposts = BlogPost.objects.published()
+    categories = category_payload().data
+    # Posts per category among the filtered ones, for the sidebar
+    category_counts = blogpost_facets(categories, blogposts if category_ids else None)
+    blogposts, page_info = paginate_feed(request, blogposts.feed(), BLOGPOST_ORDERING, 6)
     serializer = BlogPostSerializer(blogposts, many=True)
-    categories = Category.objects.all()
-    categories_serializer = CategorySerializer(categories, many=True)
 
     return Response({
-        'total_count': total_count,
-        'blogposts': serializer.data,
-        'categories': categories_serializer.data
+        **page_info,
+        'blogposts': serializer_data(serializer),
+        'categories': categories,
+        'category_counts': category_counts
     })
 
 @api_view(['GET'])
-def get_filtered_doctors(request):
-    offset = int(request.query_params.get('offset', 0))
-    limit = int(request.query_params.get('limit', 6))
+def search_blogposts(request):
+    query = request.query_params.get('q', '')
+    offset = query_int(request.query_params, 'offset', 0)
+    limit = page_limit(request.query_params, 6)
 
+    blogposts = BlogPost.objects.published()
+    category_ids = request.query_params.getlist('categories[]')
+    if category_ids:
+        blogposts = blogposts.filter(categories__id__in=category_ids).distinct()
+
+    # Ranked ids come straight from the search index, then the page is loaded
+    # through the feed queryset and put back in rank order
+    ranked_ids = BLOGPOST_INDEX.ranked(query, blogposts, limit, offset)
+    posts_by_id = BlogPost.objects.feed().in_bulk(ranked_ids)
+    serializer = BlogPostSerializer([posts_by_id[pk] for pk in ranked_ids if pk in posts_by_id], many=True)
+
+    return Response({
+        'total_count': BLOGPOST_INDEX.count(query, blogposts),
+        'blogposts': serializer_data(serializer)
+    })
+
+@cached_response('doctor', 'profile', 'user', 'category', params=(*PAGE_PARAMS, 'categories[]', 'location'))
+@api_view(['GET'])
+def get_filtered_doctors(request):
     location_query = request.query_params.get('location', '')
 
     category_ids = request.query_params.getlist('categories[]')
 
     # Start with all doctors
-    doctors = Doctor.objects.all()
+    doctors = Doctor.objects.for_listing()
 
     # Filter by categories if any are provided
     if category_ids:
         doctors = doctors.filter(categories__id__in=category_ids).distinct()
 
-    # Apply location filtering
+    # Apply location filtering through the indexed city/state/pincode
+    # columns and the address token index
     if location_query:
-        doctors = doctors.filter(
-            Q(profile__city__icontains=location_query) |
-            Q(profile__state__icontains=location_query) |
-            Q(profile__address__icontains=location_query)
-        )
+        doctors = doctors.filter(profile__in=Profile.objects.in_location(location_query).values('id'))
 
-    # Get total count before pagination
-    total_count = doctors.count()
+    # Category list comes from the shared, signal-invalidated cache, with
+    # the number of matching doctors in each
+    categories = category_payload().data
+    category_counts = doctor_facets(categories, doctors if category_ids or location_query else None)
 
-    # Apply ordering and pagination
-    doctors = doctors[offset:offset + limit]
+    # Apply ordering and pagination (offset/limit, or keyset when a cursor is passed)
+    doctors, page_info = paginate_feed(request, doctors, DOCTOR_ORDERING, 6)
 
     # Serialize doctor data
     serializer = DoctorSerializer(doctors, many=True)
 
-    # Get all categories and serialize
-    categories = Category.objects.all()
-    categories_serializer = CategorySerializer(categories, many=True)
-
     return Response({
-        'total_count': total_count,
-        'doctors': serializer.data,
-        'categories': categories_serializer.data
+        **page_info,
+        'doctors': serializer_data(serializer),
+        'categories': categories,
+        'category_counts': category_counts
     }, status=status.HTTP_200_OK)
 
 
 
+def parse_user_ids(value):
+    """The ids in a comma-separated ``user_ids`` param, or None if any is not a number."""
+    try:
+        return [int(user_id) for user_id in value.split(',') if user_id.strip()]
+    except ValueError:
+        return None
+
+
 class UserDetailsView(APIView):
+    """
+    ?user_id=<id> returns one user's details; ?user_ids=1,2,3 returns the
+    list of those that exist, in the order asked for, so a list of people
+    renders in one round trip. Both come from the per-user cache in
+    myapp.cache.user_details.
+    """
 
     def get(self, request, *args, **kwargs):
-        user_id = request.query_params.get('user_id')  # Get the user ID from query parameters
-
-        try:
-            user = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
+        if 'user_ids' in request.query_params:
+            user_ids = parse_user_ids(request.query_params['user_ids'])
+            if user_ids is None:
+                return Response({"user_ids": "A comma-separated list of user ids."}, status=status.HTTP_400_BAD_REQUEST)
+            if len(user_ids) > MAX_PAGE_SIZE:
+                return Response({"user_ids": f"At most {MAX_PAGE_SIZE} ids."}, status=status.HTTP_400_BAD_REQUEST)
+            details = user_details(user_ids)
+            return Response([details[user_id] for user_id in dict.fromkeys(user_ids) if user_id in details])
+
+        user_ids = parse_user_ids(request.query_params.get('user_id') or '')
+        details = user_details(user_ids) if user_ids and len(user_ids) == 1 else {}
+        if not details:
             return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        # Serialize user details based on their role (patient/doctor)
-        serializer = UserDetailsSerializer(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(details[user_ids[0]], status=status.HTTP_200_OK)
     
 
 class AppointmentBookingView(APIView):
@@ -207,54 +237,170 @@ class AppointmentBookingView(APIView):
         if not access_token :
             return Response({"message": "No access token found. Please log in via Google."}, status=status.HTTP_400_BAD_REQUEST)
 
+        started = time.perf_counter()
+        booking = AppointmentBookingSerializer(data=request.data)
+        if not booking.is_valid():
+            return Response(booking.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = booking.validated_data
+        users = CustomUser.objects.in_bulk([data['user_id'], data['doctor_id']])
+        missing = [key for key in ('user_id', 'doctor_id') if data[key] not in users]
+        if missing:
+            return Response({key: ["User not found."] for key in missing}, status=status.HTTP_400_BAD_REQUEST)
+        patient = users[data['user_id']]
+        doctor = users[data['doctor_id']]
+
+        # The appointment and its calendar sync task are committed
+        # together; the Google Calendar event is created afterwards by
+        # run_calendar_worker, outside the request. book_appointment
+        # rejects the slot if it overlaps another of the doctor's.
         try:
-            
-            credentials = Credentials(token=access_token)
-            patient_id=request.data.get('user_id')
-            patient = CustomUser.objects.get(id=patient_id) 
-            doctor_id = request.data.get('doctor_id')
-            date = request.data.get('date')
-            start_time = request.data.get('start_time')
-            end_time = request.data.get('end_time')
-
-            
-            doctor = CustomUser.objects.get(id=doctor_id)
-            appointment = Appointment.objects.create(
-                patient=patient,
-                doctor=doctor,
-                date=date,
-                start_time=start_time,
-                end_time=end_time,
-            )
-
-            # Now create the Google Calendar event
-            service = build('calendar', 'v3', credentials=credentials)
-            event = {
-                'summary': f"Appointment with Dr. {doctor.get_full_name()}",
-                'location': doctor.profile.doctor_profile.establishment_name,
-                'description': f"Patient: {patient.get_full_name()}",
-                'start': {
-                    'dateTime': f"{date}T{start_time}:00",
-                    'timeZone': 'Asia/Kolkata',  # Use the correct time zone
-                },
-                'end': {
-                    'dateTime': f"{date}T{end_time}:00",
-                    'timeZone': 'Asia/Kolkata',  # Use the correct time zone
-                },
-                'attendees': [
-                    {'email': patient.email},
-                    {'email': doctor.email},
-                ],
-            }
-            google_event = service.events().insert(calendarId='primary', body=event).execute()
-            appointment.google_event_link = google_event.get('htmlLink')
-            appointment.save()
-
-            return Response({"message":"Appointment created successfully"}, status=status.HTTP_201_CREATED)
-        
-        except Exception as e:
-            return Response({"message": f"Error: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
-        
+            with transaction.atomic():
+                appointment = book_appointment(
+                    patient,
+                    doctor,
+                    data['date'],
+                    data['start_time'],
+                    data.get('end_time'),
+                    calendar_sync_status=Appointment.SYNC_PENDING,
+                )
+                enqueue_calendar_sync(appointment, access_token)
+        except SlotUnavailable as e:
+            return Response({"message": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info('Booked appointment %s, calendar sync enqueued in %.1fms', appointment.pk, elapsed_ms)
+        response = Response({"message":"Appointment created successfully",
+                             "appointment_id": appointment.id,
+                             "calendar_sync_status": appointment.calendar_sync_status}, status=status.HTTP_201_CREATED)
+        response['Server-Timing'] = f'enqueue;dur={elapsed_ms:.1f}'
+        return response
+
+
+MAX_BULK_APPOINTMENTS = 500
+
+
+class BulkAppointmentBookingView(APIView):
+    def post(self, request):
+        access_token = request.data.get('access_token')
+        if not access_token:
+            return Response({"message": "No access token found. Please log in via Google."}, status=status.HTTP_400_BAD_REQUEST)
+        items = request.data.get('appointments')
+        if not isinstance(items, list) or not items:
+            return Response({"message": "appointments must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_BULK_APPOINTMENTS:
+            return Response({"message": f"At most {MAX_BULK_APPOINTMENTS} appointments per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every item, then resolve all referenced users in one query
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = AppointmentBookingSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index, "status": "invalid", "errors": serializer.errors}
+        user_ids = {data[key] for _, data in valid for key in ('user_id', 'doctor_id')}
+        existing = set(CustomUser.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+        to_create = []
+        with transaction.atomic():
+            # Check every item against the doctors' existing appointments and
+            # the items before it, under the doctors' booking locks
+            doctor_ids = {data['doctor_id'] for _, data in valid if data['doctor_id'] in existing}
+            lock_doctors(doctor_ids)
+            booked = day_intervals(doctor_ids, [data['date'] for _, data in valid])
+            for index, data in valid:
+                missing = [key for key in ('user_id', 'doctor_id') if data[key] not in existing]
+                if missing:
+                    results[index] = {"index": index, "status": "invalid",
+                                      "errors": {key: ["User not found."] for key in missing}}
+                    continue
+                start, end = requested_interval(data['start_time'], data.get('end_time'))
+                day = booked[(data['doctor_id'], data['date'])]
+                if overlaps(day, start, end):
+                    results[index] = {"index": index, "status": "conflict",
+                                      "errors": {"start_time": ["The doctor is already booked at that time."]}}
+                    continue
+                day.append((start, end))
+                to_create.append((index, Appointment(
+                    patient_id=data['user_id'],
+                    doctor_id=data['doctor_id'],
+                    date=data['date'],
+                    start_time=data['start_time'],
+                    end_time=data.get('end_time'),
+                    calendar_sync_status=Appointment.SYNC_PENDING,
+                )))
+
+            appointments = Appointment.objects.bulk_create([appointment for _, appointment in to_create])
+            tasks = enqueue_calendar_syncs(appointments, access_token)
+            # bulk_create sends no post_save, so pin the participants here
+            pin_users_to_primary(*{user_id for appointment in appointments
+                                   for user_id in (appointment.patient_id, appointment.doctor_id)})
+
+        if to_create:
+            # Push the events now through batch requests; anything that fails
+            # stays in the outbox for run_calendar_worker to retry
+            sync_statuses = sync_tasks(tasks)
+            for (index, appointment), task in zip(to_create, tasks):
+                results[index] = {
+                    "index": index,
+                    "status": "created",
+                    "appointment_id": appointment.id,
+                    "calendar_sync_status": sync_statuses[task.pk],
+                }
+
+        created = len(to_create)
+        if created == len(items):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({"created": created, "results": results}, status=response_status)
+
+
+MAX_AVAILABILITY_DAYS = 31
+
+
+@api_view(['GET'])
+def get_doctor_availability(request, doctor_id):
+    try:
+        start_date = date.fromisoformat(request.query_params.get('from', ''))
+        end_date = date.fromisoformat(request.query_params.get('to', '') or start_date.isoformat())
+    except ValueError:
+        return Response({"error": "from and to must be dates in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+    if end_date < start_date or (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+        return Response({"error": f"to must be on or after from, at most {MAX_AVAILABILITY_DAYS} days apart."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not CustomUser.objects.filter(id=doctor_id, is_doctor=True).exists():
+        return Response({"error": "Doctor not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        "doctor_id": doctor_id,
+        "slot_minutes": settings.APPOINTMENT_SLOT_MINUTES,
+        "days": free_slots(doctor_id, start_date, end_date)
+    }, status=status.HTTP_200_OK)
+
+
+APPOINTMENT_ORDERING = ('-date', '-start_time', '-id')
+
+
+def appointment_list_response(request, appointments):
+    # Without limit/cursor the full history is returned as a plain list, as
+    # before. With either one, a page is returned together with next_cursor.
+    limit = request.query_params.get('limit')
+    cursor = request.query_params.get('cursor')
+    if limit is None and cursor is None:
+        serializer = AppointmentDetailSerializer(appointments.order_by(*APPOINTMENT_ORDERING), many=True)
+        return Response(serializer_data(serializer), status=200)
+
+    limit = page_limit(request.query_params, 20)
+    page, next_cursor = keyset_page(appointments, APPOINTMENT_ORDERING, cursor, limit)
+    serializer = AppointmentDetailSerializer(page, many=True)
+    return Response({
+        'appointments': serializer_data(serializer),
+        'next_cursor': next_cursor
+    }, status=200)
 
 
 class PatientAppointmentsView(APIView):
@@ -264,13 +410,13 @@ class PatientAppointmentsView(APIView):
             return Response({"error": "User ID not provided."}, status=400)
 
         try:
+            user_id = query_int(request.query_params, 'user_id', None, minimum=1)
             # Fetch all appointments for the given patient (user)
-            appointments = Appointment.objects.filter(patient_id=user_id).order_by('-date')
-            serializer = AppointmentDetailSerializer(appointments, many=True)
-            return Response(serializer.data, status=200)
+            appointments = Appointment.objects.with_participants().filter(patient_id=user_id)
+            return appointment_list_response(request, appointments)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+        except ValidationError as e:
+            return Response(e.detail, status=400)
 
 
 class DocAppointmentsView(APIView):
@@ -280,13 +426,13 @@ class DocAppointmentsView(APIView):
             return Response({"error": "User ID not provided."}, status=400)
 
         try:
-            # Fetch all appointments for the given patient (user)
-            appointments = Appointment.objects.filter(doctor_id=user_id).order_by('-date')
-            serializer = AppointmentDetailSerializer(appointments, many=True)
-            return Response(serializer.data, status=200)
+            user_id = query_int(request.query_params, 'user_id', None, minimum=1)
+            # Fetch all appointments for the given doctor (user)
+            appointments = Appointment.objects.with_participants().filter(doctor_id=user_id)
+            return appointment_list_response(request, appointments)
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+        except ValidationError as e:
+            return Response(e.detail, status=400)
         
 
 class CreateBlogPostView(APIView):
@@ -305,7 +451,7 @@ class CreateBlogPostView(APIView):
         if serializer.is_valid():
             # Pass the author directly into save
             serializer.save(author=doctor)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serializer_data(serializer), status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -326,7 +472,7 @@ class UserBlogPostsView(APIView):
             return Response({"error": "Doctor profile not found for the provided userId"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get all blog posts authored by the doctor
-        all_posts = BlogPost.objects.filter(author=doctor)
+        all_posts = BlogPost.objects.feed().filter(author=doctor)
         
         # Separate drafts and published posts
         published_posts = all_posts.filter(draft=False)
@@ -338,6 +484,6 @@ class UserBlogPostsView(APIView):
         
         # Response with published and draft posts
         return Response({
-            "published_posts": published_serializer.data,
-            "draft_posts": draft_serializer.data
+            "published_posts": serializer_data(published_serializer),
+            "draft_posts": serializer_data(draft_serializer)
         }, status=status.HTTP_200_OK)
\ No newline at end of file